@@ -1,92 +1,17 @@
 # agents/content_generator.py
 import json
 import uuid
-import time
 import re
 from typing import List, Dict
-from dataclasses import dataclass
-import requests
-from .models import QuizQuestion
-import random
-from tenacity import retry, stop_after_attempt, wait_exponential
-
-class GeminiClient:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.base_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent'
-        self.last_request_time = 0
-        self.min_request_interval = 1.5  # Minimum 1.5 seconds between requests
-        
-    @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=2, min=4, max=60))
-    def generate(self, prompt: str, max_tokens: int = 2048) -> str:
-        """Generate text using Gemini AI API with rate limiting and retry logic"""
-        try:
-            # Rate limiting: ensure minimum interval between requests
-            current_time = time.time()
-            time_since_last = current_time - self.last_request_time
-            if time_since_last < self.min_request_interval:
-                sleep_time = self.min_request_interval - time_since_last
-                print(f"⏱️ Rate limiting: sleeping for {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-            
-            url = f"{self.base_url}?key={self.api_key}"
-            
-            payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "maxOutputTokens": max_tokens,
-                    "topP": 0.8,
-                    "topK": 40
-                }
-            }
-            
-            print(f"🤖 Sending request to Gemini AI...")
-            response = requests.post(
-                url, 
-                json=payload, 
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
-            
-            self.last_request_time = time.time()
-            
-            if response.status_code == 429:
-                print(f"⚠️ Rate limit hit (429), retrying with exponential backoff...")
-                raise requests.exceptions.RequestException("Rate limit exceeded")
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            if 'candidates' in result and len(result['candidates']) > 0:
-                if 'content' in result['candidates'][0]:
-                    if 'parts' in result['candidates'][0]['content']:
-                        return result['candidates'][0]['content']['parts'][0]['text']
-            
-            print(f"❌ Unexpected Gemini response format: {result}")
-            raise Exception("Invalid response format from Gemini")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Gemini request error: {e}")
-            raise Exception(f"Failed to connect to Gemini AI: {e}")
-        except Exception as e:
-            print(f"❌ Gemini error: {e}")
-            raise Exception(f"Gemini generation failed: {e}")
+from .models import QuizQuestion, QUIZ_QUESTIONS_SCHEMA
+from .gemini_client import get_gemini_client
+from .json_repair import parse_json
 
 class ContentGeneratorAgent:
     """AI Agent for generating educational content using Gemini AI"""
     
     def __init__(self, gemini_api_key: str):
-        self.gemini = GeminiClient(gemini_api_key)
+        self.gemini = get_gemini_client(gemini_api_key)
         self.agent_name = "ContentGenerator"
         self.system_context = """You are an expert educational content generator. 
         Your role is to create high-quality learning materials, quizzes, and analyze learning patterns for ANY subject."""
@@ -129,18 +54,8 @@ FORMAT (return exactly this structure with NO markdown):
 
 IMPORTANT: Return ONLY the JSON array without any markdown formatting, backticks, or additional text."""
             
-            response_text = self.gemini.generate(prompt, max_tokens=2048)
-            
-            if not response_text:
-                raise Exception("Empty response from Gemini AI")
-            
-            print(f"📥 Raw Gemini response: {response_text[:300]}...")
-            
-            # Clean the response
-            response_text = self._clean_json_response(response_text)
-            
-            # Parse JSON
-            questions_data = json.loads(response_text)
+            # Structured output: the response is decoded against the quiz schema
+            questions_data = self.gemini.generate_json(prompt, QUIZ_QUESTIONS_SCHEMA, max_tokens=2048, purpose='quiz')
             
             if not isinstance(questions_data, list):
                 raise ValueError("Response is not a JSON array")
@@ -215,7 +130,7 @@ Focus on making the animations educational and help explain the concept visually
 
 IMPORTANT: Do NOT use any markdown formatting or backticks in your response. Return only valid HTML code."""
 
-            response = self.gemini.generate(prompt, max_tokens=4000)
+            response = self.gemini.generate(prompt, max_tokens=4000, purpose='visual_example')
             
             if response and response.strip():
                 # Clean up the response to ensure it's valid HTML
@@ -277,18 +192,15 @@ For "History": ["chronology", "cause and effect", "primary sources", "analysis",
 
 Generate focus areas for "{subject}" now. Return ONLY the JSON array without markdown formatting:"""
             
-            response_text = self.gemini.generate(prompt, max_tokens=500)
+            response_text = self.gemini.generate(prompt, max_tokens=500, purpose='focus_areas')
             
             if not response_text:
                 raise Exception("Empty response from Gemini AI")
             
             print(f"📥 Raw Gemini response: {response_text}")
             
-            # Clean the response
-            response_text = self._clean_json_response(response_text)
-            
-            # Parse JSON
-            focus_areas = json.loads(response_text)
+            # Extract, repair and parse the JSON
+            focus_areas = parse_json(response_text, expect=list)
             
             if not isinstance(focus_areas, list):
                 raise ValueError("Response is not a JSON array")
@@ -334,12 +246,11 @@ Example format: ["topic1", "topic2", "topic3"]
 
 Return only the JSON array without any additional text or markdown formatting:"""
             
-            response = self.gemini.generate(prompt, max_tokens=500)
+            response = self.gemini.generate(prompt, max_tokens=500, purpose='weak_areas')
             
             # Try to extract JSON array
             try:
-                response = self._clean_json_response(response)
-                weak_areas = json.loads(response)
+                weak_areas = parse_json(response, expect=list)
                 return weak_areas if isinstance(weak_areas, list) else []
             except:
                 pass
@@ -349,92 +260,3 @@ Return only the JSON array without any additional text or markdown formatting:""
         except Exception as e:
             print(f"❌ Error analyzing weak areas: {e}")
             raise Exception(f"Failed to analyze weak areas: {e}")
-    
-    def _clean_json_response(self, response_text: str) -> str:
-        """Clean the Gemini response to extract valid JSON with better error handling"""
-        
-        if not response_text:
-            raise ValueError("Empty response text")
-        
-        # Remove markdown code blocks if present
-        response_text = re.sub(r'```json\s*', '', response_text, flags=re.IGNORECASE)
-        response_text = re.sub(r'```\s*', '', response_text)
-        
-        # Remove any leading/trailing whitespace
-        response_text = response_text.strip()
-        
-        # Replace problematic characters that cause JSON parsing errors
-        response_text = self._sanitize_json_string(response_text)
-        
-        # Find JSON array boundaries
-        start_idx = response_text.find('[')
-        end_idx = response_text.rfind(']')
-        
-        if start_idx != -1 and end_idx != -1 and start_idx < end_idx:
-            json_content = response_text[start_idx:end_idx + 1]
-        else:
-            # Find JSON object boundaries
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}')
-            
-            if start_idx != -1 and end_idx != -1 and start_idx < end_idx:
-                json_content = response_text[start_idx:end_idx + 1]
-                
-                # Try to wrap single object in array
-                try:
-                    obj = json.loads(json_content)
-                    json_content = json.dumps([obj])
-                except:
-                    pass
-            else:
-                raise ValueError("No valid JSON structure found in response")
-        
-        # Final sanitization
-        json_content = self._sanitize_json_string(json_content)
-        
-        return json_content
-    
-    def _sanitize_json_string(self, text: str) -> str:
-        """Sanitize string to remove problematic characters for JSON parsing"""
-        
-        # Replace common problematic characters
-        replacements = {
-            '\n': '\\n',
-            '\r': '\\r',
-            '\t': '\\t',
-            '\b': '\\b',
-            '\f': '\\f',
-            '"': '\\"',  # Only replace unescaped quotes
-            '\\': '\\\\',  # Escape backslashes
-        }
-        
-        # Remove control characters (ASCII 0-31 except whitespace)
-        text = ''.join(char for char in text if ord(char) >= 32 or char in '\t\n\r')
-        
-        # Fix unescaped quotes in JSON strings
-        # This is a simple approach - in production you might want more sophisticated JSON repair
-        lines = text.split('\n')
-        fixed_lines = []
-        
-        for line in lines:
-            # Skip lines that are not within JSON string values
-            if ':' in line and '"' in line:
-                # Find the value part after the colon
-                parts = line.split(':', 1)
-                if len(parts) == 2:
-                    key_part = parts[0]
-                    value_part = parts[1].strip()
-                    
-                    # If value starts and ends with quotes, fix internal quotes
-                    if value_part.startswith('"') and value_part.endswith('"'):
-                        # Extract the content between quotes
-                        content = value_part[1:-1]
-                        # Escape any unescaped quotes
-                        content = content.replace('\\"', '!!ESCAPED_QUOTE!!').replace('"', '\\"').replace('!!ESCAPED_QUOTE!!', '\\"')
-                        value_part = f'"{content}"'
-                    
-                    line = f"{key_part}:{value_part}"
-            
-            fixed_lines.append(line)
-        
-        return '\n'.join(fixed_lines)
\ No newline at end of file
@@ -1,16 +1,12 @@
-import json
 import uuid
-import time
 import re
 import sys
 import os
-from typing import List, Dict
-from dataclasses import dataclass
-import requests
-from .models import QuizQuestion
-import random
+import time
 import threading
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import List, Dict, Iterator, Optional
+from .models import QuizQuestion, QUIZ_QUESTIONS_SCHEMA
+from .json_repair import parse_json, JsonArrayStreamParser
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -21,8 +17,8 @@ class EnhancedContentGeneratorAgent:
     """Enhanced AI Agent with MongoDB MCP caching and quiz pre-generation"""
     
     def __init__(self, gemini_api_key: str):
-        from .content_generator import GeminiClient
-        self.gemini = GeminiClient(gemini_api_key)
+        from .gemini_client import get_gemini_client
+        self.gemini = get_gemini_client(gemini_api_key)
         self.agent_name = "EnhancedContentGenerator"
         self.system_context = """You are an expert educational content generator. 
         Your role is to create high-quality learning materials, quizzes, and analyze learning patterns for ANY subject."""
@@ -36,14 +32,18 @@ class EnhancedContentGeneratorAgent:
             print(f"📝 Getting quiz for resource {resource_id}: {topic} (difficulty: {difficulty})")
             
             # Step 1: Check if we have cached quiz for this specific resource
-            cached_resource_quiz = mongo_mcp.get_quiz_for_resource(resource_id, count)
+            cached_resource_quiz = mongo_mcp.get_quiz_for_resource(
+                resource_id, count, refresh=lambda: self._refresh_resource_quiz(resource_id, topic, difficulty, count)
+            )
             
             if cached_resource_quiz:
                 print(f"✅ Found cached quiz for resource {resource_id}")
                 return self._convert_to_quiz_questions(cached_resource_quiz, topic, difficulty)
             
             # Step 2: Check if we have cached quiz for this topic/difficulty combination
-            cached_topic_quiz = mongo_mcp.get_cached_quiz_questions(topic, difficulty, count)
+            cached_topic_quiz = mongo_mcp.get_cached_quiz_questions(
+                topic, difficulty, count, refresh=lambda: self._refresh_topic_quiz(topic, difficulty, count)
+            )
             
             if cached_topic_quiz:
                 print(f"✅ Found cached quiz for topic {topic}")
@@ -52,17 +52,28 @@ class EnhancedContentGeneratorAgent:
                 return self._convert_to_quiz_questions(cached_topic_quiz[:count], topic, difficulty)
             
             # Step 3: Generate new quiz with AI (this should be rare after initial caching)
-            print(f"🤖 Generating new quiz for {topic} (this may take a moment)")
-            ai_questions = self._generate_ai_questions_with_retries(topic, difficulty, count)
-            
-            if ai_questions:
+            def generate():
+                print(f"🤖 Generating new quiz for {topic} (this may take a moment)")
+                ai_questions = self._generate_ai_questions_with_retries(topic, difficulty, count)
+                
                 # Cache both for topic and specific resource
                 question_dicts = [self._question_to_dict(q) for q in ai_questions]
                 mongo_mcp.cache_quiz_questions(topic, difficulty, question_dicts)
                 mongo_mcp.cache_quiz_for_resource(resource_id, topic, difficulty, question_dicts)
                 
                 print(f"✅ Generated and cached {len(ai_questions)} questions")
-                return ai_questions
+                return question_dicts
+            
+            # Only the worker holding the lease calls Gemini; the others wait for its result
+            question_dicts = mongo_mcp.fill_with_lease(
+                mongo_mcp.fill_lease_key('resource_quizzes', resource_id),
+                lookup=lambda: mongo_mcp.get_quiz_for_resource(resource_id, count),
+                fill=generate,
+                stale_lookup=lambda: mongo_mcp.get_quiz_for_resource(resource_id, count, allow_stale=True)
+            )
+            
+            if question_dicts:
+                return self._convert_to_quiz_questions(question_dicts[:count], topic, difficulty)
             
             # If all fails, this should never happen with proper pre-generation
             raise Exception("Unable to generate quiz questions - please try again later")
@@ -84,15 +95,26 @@ class EnhancedContentGeneratorAgent:
                     print(f"✅ Quiz already cached for resource {resource_id}")
                     return
                 
-                # Generate with longer wait to avoid rate limiting
-                time.sleep(5)  # Longer delay for background generation
-                
-                ai_questions = self._generate_ai_questions_with_retries(topic, difficulty, 5)
+                # Another worker already generating this quiz will cache it for us
+                lease_key = mongo_mcp.fill_lease_key('resource_quizzes', resource_id)
+                token = mongo_mcp.acquire_fill_lease(lease_key)
+                if not token:
+                    print(f"⏭️ Quiz for resource {resource_id} is already being generated")
+                    return
                 
-                if ai_questions:
-                    question_dicts = [self._question_to_dict(q) for q in ai_questions]
-                    mongo_mcp.cache_quiz_for_resource(resource_id, topic, difficulty, question_dicts)
-                    print(f"✅ Pre-generated and cached {len(ai_questions)} questions for resource {resource_id}")
+                try:
+                    def generate():
+                        # The shared rate limiter paces this against foreground requests
+                        ai_questions = self._generate_ai_questions_with_retries(topic, difficulty, 5)
+                        
+                        if ai_questions:
+                            question_dicts = [self._question_to_dict(q) for q in ai_questions]
+                            mongo_mcp.cache_quiz_for_resource(resource_id, topic, difficulty, question_dicts)
+                            print(f"✅ Pre-generated and cached {len(ai_questions)} questions for resource {resource_id}")
+                    
+                    mongo_mcp.timed_fill(lease_key, generate)
+                finally:
+                    mongo_mcp.release_fill_lease(lease_key, token)
                 
             except Exception as e:
                 print(f"❌ Background quiz generation failed for {resource_id}: {e}")
@@ -109,17 +131,29 @@ class EnhancedContentGeneratorAgent:
             print(f"🎯 Generating {count} questions for topic: {topic}, difficulty: {difficulty}/5")
             
             # Check MCP cache first
-            cached_questions = mongo_mcp.get_cached_quiz_questions(topic, difficulty, count)
+            cached_questions = mongo_mcp.get_cached_quiz_questions(
+                topic, difficulty, count, refresh=lambda: self._refresh_topic_quiz(topic, difficulty, count)
+            )
             
             if cached_questions:
                 return self._convert_to_quiz_questions(cached_questions, topic, difficulty)
             
-            # Generate with AI
-            ai_questions = self._generate_ai_questions_with_retries(topic, difficulty, count)
-            if ai_questions:
+            def generate():
+                # Generate with AI, streaming; fall back to whole-response retries if the stream comes up short
+                question_dicts = [self._question_to_dict(q) for q in self._stream_with_fallback(topic, difficulty, count)]
                 # Cache the results
-                mongo_mcp.cache_quiz_questions(topic, difficulty, [self._question_to_dict(q) for q in ai_questions])
-                return ai_questions
+                mongo_mcp.cache_quiz_questions(topic, difficulty, question_dicts)
+                return question_dicts
+            
+            # Only the worker holding the lease calls Gemini; the others wait for its result
+            question_dicts = mongo_mcp.fill_with_lease(
+                mongo_mcp.fill_lease_key('quiz_cache', topic, difficulty),
+                lookup=lambda: mongo_mcp.get_cached_quiz_questions(topic, difficulty, count),
+                fill=generate,
+                stale_lookup=lambda: mongo_mcp.get_cached_quiz_questions(topic, difficulty, count, allow_stale=True)
+            )
+            if question_dicts:
+                return self._convert_to_quiz_questions(question_dicts[:count], topic, difficulty)
             
             # If AI fails, raise exception
             raise Exception("Failed to generate quiz questions")
@@ -128,6 +162,167 @@ class EnhancedContentGeneratorAgent:
             print(f"❌ Error in enhanced quiz generation: {e}")
             raise Exception(f"Failed to generate quiz questions for {topic}: {e}")
     
+    def stream_quiz_questions(self, topic: str, difficulty: int, count: int = 5) -> Iterator[QuizQuestion]:
+        """Yield quiz questions one at a time, each as soon as it is available (cache, then streamed AI)"""
+        
+        cached_questions = mongo_mcp.get_cached_quiz_questions(
+            topic, difficulty, count, refresh=lambda: self._refresh_topic_quiz(topic, difficulty, count)
+        )
+        if cached_questions:
+            yield from self._convert_to_quiz_questions(cached_questions, topic, difficulty)
+            return
+        
+        # Only the worker holding the lease streams from Gemini; the others wait for its result
+        lease_key = mongo_mcp.fill_lease_key('quiz_cache', topic, difficulty)
+        token = mongo_mcp.acquire_fill_lease(lease_key)
+        if not token:
+            cached_questions = mongo_mcp.wait_for_fill(
+                lease_key,
+                lookup=lambda: mongo_mcp.get_cached_quiz_questions(topic, difficulty, count),
+                stale_lookup=lambda: mongo_mcp.get_cached_quiz_questions(topic, difficulty, count, allow_stale=True)
+            )
+            if cached_questions:
+                yield from self._convert_to_quiz_questions(cached_questions[:count], topic, difficulty)
+                return
+            token = mongo_mcp.acquire_fill_lease(lease_key)
+        
+        started = time.perf_counter()
+        filled = False
+        try:
+            questions = []
+            try:
+                for question in self._stream_ai_questions(topic, difficulty, count):
+                    questions.append(question)
+                    yield question
+            except Exception as e:
+                print(f"❌ Streaming quiz generation failed: {e}")
+            
+            # Top up with only the missing questions, skipping any that repeat one already yielded;
+            # a second round bypasses the response cache, which would hand back the same repeats
+            seen = {question.question.strip().lower() for question in questions}
+            for round_number in range(2):
+                if len(questions) >= count:
+                    break
+                try:
+                    top_up = self._generate_ai_questions_with_retries(
+                        topic, difficulty, count - len(questions), cache=False if round_number else None
+                    )
+                except Exception as e:
+                    print(f"❌ Quiz top-up round {round_number + 1} failed: {e}")
+                    continue
+                for question in top_up:
+                    text = question.question.strip().lower()
+                    if text in seen:
+                        continue
+                    seen.add(text)
+                    questions.append(question)
+                    yield question
+            
+            if not questions:
+                raise Exception(f"Failed to generate quiz questions for {topic}")
+            
+            # A short quiz is still served, but never cached over an entry that could satisfy `count`
+            if len(questions) < count:
+                print(f"⚠️ Only {len(questions)}/{count} distinct questions generated for {topic}, not caching")
+            else:
+                mongo_mcp.cache_quiz_questions(topic, difficulty, [self._question_to_dict(q) for q in questions])
+                filled = True
+        finally:
+            mongo_mcp.record_fill('quiz_cache', started, failed=not filled)
+            if token:
+                mongo_mcp.release_fill_lease(lease_key, token)
+    
+    def _refresh_topic_quiz(self, topic: str, difficulty: int, count: int):
+        """Regenerate a stale topic quiz (runs in the background)"""
+        # Bypass the response cache, which could hand back the same stale answer
+        questions = self._generate_ai_questions_with_retries(topic, difficulty, count, cache=False)
+        mongo_mcp.cache_quiz_questions(topic, difficulty, [self._question_to_dict(q) for q in questions])
+    
+    def _refresh_resource_quiz(self, resource_id: str, topic: str, difficulty: int, count: int):
+        """Regenerate a stale resource quiz (runs in the background)"""
+        questions = self._generate_ai_questions_with_retries(topic, difficulty, count, cache=False)
+        mongo_mcp.cache_quiz_for_resource(resource_id, topic, difficulty, [self._question_to_dict(q) for q in questions])
+    
+    def _stream_with_fallback(self, topic: str, difficulty: int, count: int) -> List[QuizQuestion]:
+        try:
+            questions = list(self._stream_ai_questions(topic, difficulty, count))
+            if len(questions) >= count:
+                return questions
+            print(f"⚠️ Streamed only {len(questions)}/{count} valid questions, retrying without streaming")
+        except Exception as e:
+            print(f"❌ Streaming quiz generation failed: {e}")
+        
+        return self._generate_ai_questions_with_retries(topic, difficulty, count)
+    
+    def _stream_ai_questions(self, topic: str, difficulty: int, count: int) -> Iterator[QuizQuestion]:
+        """Stream quiz generation and yield each question as its JSON object closes.
+
+        The stream is closed as soon as `count` valid questions have been parsed,
+        so no tokens are paid for after that.
+        """
+        
+        stream = self.gemini.stream_generate(
+            self._quiz_prompt(topic, difficulty, count),
+            max_tokens=2048, purpose='quiz', response_schema=QUIZ_QUESTIONS_SCHEMA
+        )
+        parser = JsonArrayStreamParser()
+        produced = 0
+        
+        try:
+            for chunk in stream:
+                for q_data in parser.feed(chunk):
+                    question = self._build_quiz_question(q_data, topic, difficulty)
+                    if question:
+                        produced += 1
+                        print(f"📨 Streamed question {produced}/{count} for {topic}")
+                        yield question
+                        if produced >= count:
+                            return
+                if parser.done:
+                    return
+        finally:
+            stream.close()
+    
+    def _quiz_prompt(self, topic: str, difficulty: int, count: int) -> str:
+        return f"""Create exactly {count} multiple choice questions about "{topic}" at difficulty level {difficulty} out of 5.
+
+Return ONLY a valid JSON array. Each question must have exactly 4 options.
+
+Example format:
+[{{"question": "What is X?", "options": ["Option A", "Option B", "Option C", "Option D"], "correct_answer": "Option A", "topic": "{topic}"}}]
+
+Generate {count} questions for {topic} now. Return ONLY the JSON array:"""
+    
+    def _build_quiz_question(self, q_data: Dict, topic: str, difficulty: int) -> Optional[QuizQuestion]:
+        """Turn one decoded question into a QuizQuestion, or None if it is unusable"""
+        
+        if not isinstance(q_data, dict) or not all(field in q_data for field in ['question', 'options', 'correct_answer']):
+            return None
+        
+        # A multiple choice question needs at least two non-empty options and a non-empty question
+        options = q_data['options']
+        if not isinstance(options, list):
+            return None
+        options = [str(option).strip() for option in options if isinstance(option, (str, int, float)) and str(option).strip()][:4]
+        correct_answer = str(q_data['correct_answer']).strip()
+        if len(options) < 2 or not correct_answer or not str(q_data['question']).strip():
+            return None
+        
+        # Ensure correct answer is in options
+        if correct_answer not in options:
+            # Replace first option with correct answer
+            options[0] = correct_answer
+        
+        return QuizQuestion(
+            id=str(uuid.uuid4()),
+            question=str(q_data['question']).strip(),
+            options=options,
+            correct_answer=correct_answer,
+            topic=q_data.get('topic', topic),
+            difficulty_level=difficulty,
+            resource_id=""
+        )
+    
     def generate_custom_focus_areas(self, subject: str) -> List[str]:
         """Generate custom focus areas with MCP caching"""
         
@@ -135,16 +330,28 @@ class EnhancedContentGeneratorAgent:
             print(f"🎯 Generating focus areas for subject: {subject}")
             
             # Check cache first
-            cached_areas = mongo_mcp.get_cached_focus_areas(subject)
+            cached_areas = mongo_mcp.get_cached_focus_areas(
+                subject, refresh=lambda: mongo_mcp.cache_focus_areas(subject, self._generate_ai_focus_areas(subject, cache=False))
+            )
             if cached_areas:
                 return cached_areas
             
-            # Generate with AI
-            ai_areas = self._generate_ai_focus_areas(subject)
-            if ai_areas:
+            def generate():
+                # Generate with AI
+                ai_areas = self._generate_ai_focus_areas(subject)
                 mongo_mcp.cache_focus_areas(subject, ai_areas)
                 return ai_areas
             
+            # Only the worker holding the lease calls Gemini; the others wait for its result
+            ai_areas = mongo_mcp.fill_with_lease(
+                mongo_mcp.fill_lease_key('focus_areas_cache', subject),
+                lookup=lambda: mongo_mcp.get_cached_focus_areas(subject),
+                fill=generate,
+                stale_lookup=lambda: mongo_mcp.get_cached_focus_areas(subject, allow_stale=True)
+            )
+            if ai_areas:
+                return ai_areas
+            
             # If AI fails, raise exception
             raise Exception("Failed to generate focus areas")
             
@@ -152,66 +359,36 @@ class EnhancedContentGeneratorAgent:
             print(f"❌ Error generating focus areas: {e}")
             raise Exception(f"Failed to generate focus areas for {subject}: {e}")
     
-    def _generate_ai_questions_with_retries(self, topic: str, difficulty: int, count: int) -> List[QuizQuestion]:
-        """Generate questions using AI with exponential backoff and retries"""
+    def _generate_ai_questions_with_retries(self, topic: str, difficulty: int, count: int,
+                                            cache: Optional[bool] = None) -> List[QuizQuestion]:
+        """Generate questions using AI structured output, retrying unusable responses"""
         
         max_retries = 3
-        base_delay = 5  # Start with 5 second delay
         
         for attempt in range(max_retries):
             try:
                 if attempt > 0:
-                    # Exponential backoff: 5s, 15s, 45s
-                    delay = base_delay * (3 ** attempt)
-                    print(f"⏳ Retry attempt {attempt + 1}/{max_retries}, waiting {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    # Initial delay to prevent rate limiting
-                    time.sleep(2)
+                    # Transport errors and 429s are already backed off inside the Gemini client,
+                    # so a response with too few valid questions is retried straight away
+                    print(f"🔁 Retry attempt {attempt + 1}/{max_retries}")
                 
-                prompt = f"""Create exactly {count} multiple choice questions about "{topic}" at difficulty level {difficulty} out of 5.
-
-Return ONLY a valid JSON array. Each question must have exactly 4 options.
-
-Example format:
-[{{"question": "What is X?", "options": ["Option A", "Option B", "Option C", "Option D"], "correct_answer": "Option A", "topic": "{topic}"}}]
-
-Generate {count} questions for {topic} now. Return ONLY the JSON array:"""
+                prompt = self._quiz_prompt(topic, difficulty, count)
+                questions_data = self.gemini.generate_json(prompt, QUIZ_QUESTIONS_SCHEMA, max_tokens=2048, purpose='quiz', cache=cache)
                 
-                response_text = self.gemini.generate(prompt, max_tokens=2048)
-                
-                if response_text:
-                    json_content = self._robust_json_extraction(response_text)
-                    questions_data = json.loads(json_content)
+                if isinstance(questions_data, list) and len(questions_data) >= count:
+                    questions = []
+                    for q_data in questions_data[:count]:
+                        question = self._build_quiz_question(q_data, topic, difficulty)
+                        if question:
+                            questions.append(question)
                     
-                    if isinstance(questions_data, list) and len(questions_data) >= count:
-                        questions = []
-                        for q_data in questions_data[:count]:
-                            if all(field in q_data for field in ['question', 'options', 'correct_answer']):
-                                # Ensure correct answer is in options
-                                options = q_data['options'][:4]
-                                correct_answer = q_data['correct_answer']
-                                
-                                if correct_answer not in options:
-                                    # Replace first option with correct answer
-                                    options[0] = correct_answer
-                                
-                                question = QuizQuestion(
-                                    id=str(uuid.uuid4()),
-                                    question=q_data['question'],
-                                    options=options,
-                                    correct_answer=correct_answer,
-                                    topic=q_data.get('topic', topic),
-                                    difficulty_level=difficulty,
-                                    resource_id=""
-                                )
-                                questions.append(question)
-                        
-                        if len(questions) >= count:
-                            print(f"✅ Successfully generated {len(questions)} questions on attempt {attempt + 1}")
-                            return questions[:count]
+                    if len(questions) >= count:
+                        print(f"✅ Successfully generated {len(questions)} questions on attempt {attempt + 1}")
+                        return questions[:count]
                 
                 print(f"⚠️ Attempt {attempt + 1} failed to generate sufficient questions")
+                # Don't let the response cache hand the same unusable answer to the next attempt
+                self.gemini.invalidate_cached_response(prompt, 2048, QUIZ_QUESTIONS_SCHEMA)
                 
             except Exception as e:
                 print(f"❌ AI question generation attempt {attempt + 1} failed: {e}")
@@ -220,12 +397,10 @@ Generate {count} questions for {topic} now. Return ONLY the JSON array:"""
         
         raise Exception("Failed to generate valid questions after all retry attempts")
     
-    def _generate_ai_focus_areas(self, subject: str) -> List[str]:
+    def _generate_ai_focus_areas(self, subject: str, cache: Optional[bool] = None) -> List[str]:
         """Generate focus areas using AI with robust JSON handling"""
         
         try:
-            time.sleep(3)  # Rate limiting
-            
             prompt = f"""Generate exactly 6 key focus areas for the subject "{subject}".
 
 Return ONLY a JSON array of strings. Each area should be 1-3 words.
@@ -234,16 +409,13 @@ Example: ["area1", "area2", "area3", "area4", "area5", "area6"]
 
 Generate focus areas for "{subject}" now. Return ONLY the JSON array:"""
             
-            response = self.gemini.generate(prompt, max_tokens=300)
+            response = self.gemini.generate(prompt, max_tokens=300, purpose='focus_areas', cache=cache)
             
             if response:
                 print(f"🔍 Raw focus areas response: {response[:200]}...")
                 
-                # Clean and extract JSON with robust handling
-                cleaned_response = self._robust_json_extraction(response)
-                print(f"🧹 Cleaned response: {cleaned_response}")
-                
-                areas = json.loads(cleaned_response)
+                # Extract, repair and parse the JSON
+                areas = parse_json(response, expect=list)
                 
                 if isinstance(areas, list) and len(areas) >= 5:
                     # Clean and validate each area
@@ -263,110 +435,13 @@ Generate focus areas for "{subject}" now. Return ONLY the JSON array:"""
             
             raise Exception("Empty response from AI")
             
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             print(f"❌ JSON decode error in focus areas: {e}")
             raise Exception(f"AI response format error: {e}")
         except Exception as e:
             print(f"❌ AI focus area generation failed: {e}")
             raise Exception(f"AI focus area generation failed: {e}")
 
-    def _robust_json_extraction(self, response: str) -> str:
-        """Robust JSON extraction with comprehensive cleanup"""
-        
-        if not response or not response.strip():
-            raise ValueError("Empty response")
-        
-        print(f"🔍 Original response length: {len(response)}")
-        
-        # Remove markdown formatting
-        response = re.sub(r'```json\s*', '', response, flags=re.IGNORECASE)
-        response = re.sub(r'```\s*', '', response)
-        response = response.strip()
-        
-        # Find JSON array or object
-        json_start = -1
-        json_end = -1
-        
-        # Look for array first
-        array_start = response.find('[')
-        array_end = response.rfind(']')
-        
-        # Look for object
-        obj_start = response.find('{')
-        obj_end = response.rfind('}')
-        
-        # Prefer array over object
-        if array_start != -1 and array_end != -1 and array_start < array_end:
-            json_start = array_start
-            json_end = array_end + 1
-        elif obj_start != -1 and obj_end != -1 and obj_start < obj_end:
-            json_start = obj_start
-            json_end = obj_end + 1
-        else:
-            raise ValueError("No valid JSON structure found")
-        
-        json_content = response[json_start:json_end]
-        
-        # Comprehensive cleanup
-        json_content = self._comprehensive_json_cleanup(json_content)
-        
-        print(f"🧹 Final JSON length: {len(json_content)}")
-        return json_content
-    
-    def _comprehensive_json_cleanup(self, content: str) -> str:
-        """Comprehensive JSON cleanup to handle all escape issues"""
-        
-        # Step 1: Remove control characters except \n, \r, \t
-        content = ''.join(char for char in content if ord(char) >= 32 or char in '\n\r\t')
-        
-        # Step 2: Fix escape sequences - only keep valid JSON escapes
-        # Valid JSON escapes: \" \\ \/ \b \f \n \r \t \uXXXX
-        def fix_escapes(text):
-            # Replace problematic escapes with the character itself
-            # Keep only valid JSON escape sequences
-            result = ""
-            i = 0
-            while i < len(text):
-                if text[i] == '\\' and i + 1 < len(text):
-                    next_char = text[i + 1]
-                    if next_char in '"\\/:bfnrt':
-                        # Valid escape, keep it
-                        result += text[i:i+2]
-                        i += 2
-                    elif next_char == 'u' and i + 5 < len(text):
-                        # Unicode escape, keep it
-                        result += text[i:i+6]
-                        i += 6
-                    else:
-                        # Invalid escape, just add the character
-                        result += next_char
-                        i += 2
-                else:
-                    result += text[i]
-                    i += 1
-            return result
-        
-        content = fix_escapes(content)
-        
-        # Step 3: Handle actual newlines in string values
-        # Split by quotes to identify string values vs structure
-        parts = content.split('"')
-        for i in range(1, len(parts), 2):  # Every odd index is inside quotes
-            # Replace actual newlines with escaped newlines
-            parts[i] = parts[i].replace('\n', '\\n')
-            parts[i] = parts[i].replace('\r', '\\r')
-            parts[i] = parts[i].replace('\t', '\\t')
-        
-        content = '"'.join(parts)
-        
-        # Step 4: Fix trailing commas
-        content = re.sub(r',(\s*[}\]])', r'\1', content)
-        
-        # Step 5: Clean up whitespace
-        content = re.sub(r'\s+', ' ', content)
-        
-        return content.strip()
-
     def _convert_to_quiz_questions(self, cached_questions: List[Dict], topic: str, difficulty: int) -> List[QuizQuestion]:
         """Convert cached questions to QuizQuestion objects"""
         
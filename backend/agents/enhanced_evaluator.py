@@ -1,7 +1,7 @@
 # backend/agents/enhanced_evaluator.py
 import sys
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from .models import QuizQuestion
 
 # Add the backend directory to path for imports
@@ -13,8 +13,8 @@ class EnhancedEvaluatorAgent:
     """Enhanced evaluator with MongoDB MCP caching"""
     
     def __init__(self, gemini_api_key: str):
-        from .content_generator import GeminiClient
-        self.gemini = GeminiClient(gemini_api_key)
+        from .gemini_client import get_gemini_client
+        self.gemini = get_gemini_client(gemini_api_key)
         self.agent_name = "EnhancedEvaluator"
         
         print("✅ Enhanced Evaluator with MCP caching initialized")
@@ -27,7 +27,8 @@ class EnhancedEvaluatorAgent:
         try:
             # Try to get cached feedback
             cached_feedback = mongo_mcp.get_cached_feedback(
-                question.question, user_answer, question.correct_answer
+                question.question, user_answer, question.correct_answer,
+                refresh=lambda: self._refresh_feedback(question, user_answer, is_correct)
             )
             
             if cached_feedback:
@@ -46,21 +47,57 @@ class EnhancedEvaluatorAgent:
         except Exception as e:
             print(f"❌ Error in enhanced evaluation: {e}")
             # Return basic feedback if everything fails
-            return {
-                'is_correct': is_correct,
-                'feedback': f"Your answer is {'correct' if is_correct else 'incorrect'}. The correct answer is {question.correct_answer}.",
-                'topic': question.topic,
-                'score': 100 if is_correct else 0
-            }
+            return self._basic_feedback(question, is_correct)
     
-    def _generate_ai_feedback(self, question: QuizQuestion, user_answer: str, is_correct: bool) -> Dict[str, Any]:
-        """Generate feedback using AI"""
+    def evaluate_quiz_responses(self, responses: List[Tuple[QuizQuestion, str]]) -> List[Dict[str, Any]]:
+        """Evaluate a whole quiz at once, generating all uncached feedback concurrently"""
         
-        try:
-            import time
-            time.sleep(1)  # Rate limiting protection
+        results: List[Dict[str, Any]] = [None] * len(responses)
+        pending = []
+        
+        for i, (question, user_answer) in enumerate(responses):
+            is_correct = user_answer.strip().lower() == question.correct_answer.strip().lower()
+            try:
+                cached_feedback = mongo_mcp.get_cached_feedback(
+                    question.question, user_answer, question.correct_answer,
+                    refresh=lambda q=question, a=user_answer, c=is_correct: self._refresh_feedback(q, a, c)
+                )
+            except Exception as e:
+                print(f"❌ Error reading cached feedback: {e}")
+                cached_feedback = None
+            
+            if cached_feedback:
+                results[i] = cached_feedback
+            else:
+                pending.append((i, question, user_answer, is_correct))
+        
+        if pending:
+            print(f"🤖 Generating feedback for {len(pending)} answers concurrently")
+            prompts = [self._feedback_prompt(q, answer, correct) for _, q, answer, correct in pending]
+            responses_text = self.gemini.generate_many(prompts, max_tokens=150, purpose='feedback')
             
-            prompt = f"""Provide brief educational feedback for this quiz response:
+            for (i, question, user_answer, is_correct), response in zip(pending, responses_text):
+                if isinstance(response, Exception):
+                    print(f"❌ AI feedback generation failed: {response}")
+                    results[i] = self._basic_feedback(question, is_correct)
+                    continue
+                
+                feedback_result = self._feedback_result(question, is_correct, response)
+                mongo_mcp.cache_feedback(
+                    question.question, user_answer, question.correct_answer, feedback_result
+                )
+                results[i] = feedback_result
+        
+        return results
+    
+    def _refresh_feedback(self, question: QuizQuestion, user_answer: str, is_correct: bool):
+        """Regenerate stale cached feedback (runs in the background)"""
+        # Bypass the response cache, which could hand back the same stale answer
+        feedback_result = self._generate_ai_feedback(question, user_answer, is_correct, cache=False)
+        mongo_mcp.cache_feedback(question.question, user_answer, question.correct_answer, feedback_result)
+    
+    def _feedback_prompt(self, question: QuizQuestion, user_answer: str, is_correct: bool) -> str:
+        return f"""Provide brief educational feedback for this quiz response:
 
 Question: {question.question}
 Correct Answer: {question.correct_answer}
@@ -68,16 +105,33 @@ User Answer: {user_answer}
 Result: {'CORRECT' if is_correct else 'INCORRECT'}
 
 Write 1-2 sentences of encouraging, educational feedback. Keep it brief and positive."""
-            
-            response = self.gemini.generate(prompt, max_tokens=150)
-            feedback_text = response.strip() if response else f"Your answer is {'correct' if is_correct else 'incorrect'}."
-            
-            return {
-                'is_correct': is_correct,
-                'feedback': feedback_text,
-                'topic': question.topic,
-                'score': 100 if is_correct else 0
-            }
+    
+    def _feedback_result(self, question: QuizQuestion, is_correct: bool, response: str) -> Dict[str, Any]:
+        feedback_text = response.strip() if response else f"Your answer is {'correct' if is_correct else 'incorrect'}."
+        
+        return {
+            'is_correct': is_correct,
+            'feedback': feedback_text,
+            'topic': question.topic,
+            'score': 100 if is_correct else 0
+        }
+    
+    def _basic_feedback(self, question: QuizQuestion, is_correct: bool) -> Dict[str, Any]:
+        return {
+            'is_correct': is_correct,
+            'feedback': f"Your answer is {'correct' if is_correct else 'incorrect'}. The correct answer is {question.correct_answer}.",
+            'topic': question.topic,
+            'score': 100 if is_correct else 0
+        }
+    
+    def _generate_ai_feedback(self, question: QuizQuestion, user_answer: str, is_correct: bool,
+                              cache: Optional[bool] = None) -> Dict[str, Any]:
+        """Generate feedback using AI"""
+        
+        try:
+            prompt = self._feedback_prompt(question, user_answer, is_correct)
+            response = self.gemini.generate(prompt, max_tokens=150, purpose='feedback', cache=cache)
+            return self._feedback_result(question, is_correct, response)
             
         except Exception as e:
             print(f"❌ AI feedback generation failed: {e}")
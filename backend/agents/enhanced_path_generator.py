@@ -1,24 +1,37 @@
 # backend/agents/enhanced_path_generator.py
 import sys
 import os
-from typing import List
-from datetime import datetime
-import json
-import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+from datetime import datetime, timedelta
 
 # Add the backend directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from .content_generator import GeminiClient
+from .gemini_client import get_gemini_client
 from .learning_content_generator import LearningContentGenerator
-from .models import LearnerProfile, LearningResource
+from .models import LearnerProfile
+from .json_repair import parse_json
 from mcp_server.mongo_mcp import mongo_mcp
 
+# Resources generated while the learner waits; the rest of the path is materialized on demand
+EAGER_RESOURCES = int(os.getenv('PATH_EAGER_RESOURCES', '1'))
+# How many resources ahead of the learner are generated in the background
+PREFETCH_LOOKAHEAD = int(os.getenv('PATH_PREFETCH_LOOKAHEAD', '2'))
+# A 'generating' claim older than this is assumed abandoned
+GENERATION_STALE_SECONDS = 300
+# What callers are told to wait before asking again for a resource that is still being generated
+MATERIALIZE_RETRY_AFTER_SECONDS = 5
+
+# Shared by all paths so background prefetching stays bounded under load
+_prefetch_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PATH_PREFETCH_WORKERS', '4')))
+
 class EnhancedPathGeneratorAgent:
     """Enhanced Path Generator with quiz pre-generation"""
     
     def __init__(self, gemini_api_key: str):
-        self.gemini = GeminiClient(gemini_api_key)
+        self.gemini = get_gemini_client(gemini_api_key)
         self.content_generator = LearningContentGenerator(gemini_api_key)
         self.agent_name = "EnhancedPathGenerator"
         self.system_context = """You are an AI learning path optimization specialist. 
@@ -26,8 +39,9 @@ class EnhancedPathGeneratorAgent:
         
         print("✅ Enhanced Path Generator with quiz pre-generation initialized")
         
-    def generate_learning_path_with_content(self, learner_profile: LearnerProfile, db) -> List[str]:
-        """Generate personalized learning path with content and pre-generate quizzes"""
+    def generate_learning_path_with_content(self, learner_profile: LearnerProfile, db,
+                                            progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> List[str]:
+        """Create the path skeleton and generate only its first resource(s); the rest are materialized on demand"""
         
         print(f"🛤️ Generating enhanced learning path for: {learner_profile.name}")
         print(f"Subject: {learner_profile.subject}, Style: {learner_profile.learning_style}")
@@ -36,53 +50,170 @@ class EnhancedPathGeneratorAgent:
             # Generate learning sequence topics using AI
             topics = self._generate_topic_sequence(learner_profile)
             
-            all_resource_ids = []
+            # Plan every topic/resource slot up front and store them as pending resources
+            slots = self.content_generator.plan_learning_sequences(learner_profile, topics, num_resources=2)
+            resource_docs = [self._skeleton_resource_doc(slot, learner_profile) for slot in slots]
+            if resource_docs:
+                db.learning_resources.insert_many([dict(doc) for doc in resource_docs])
             
-            # Generate content for each topic
-            for topic in topics:
-                # Generate learning resources for this topic
-                learning_contents = self.content_generator.generate_learning_sequence(
-                    learner_profile=learner_profile,
-                    topic=topic,
-                    num_resources=2  # 2 resources per topic
-                )
+            all_resource_ids = [doc['id'] for doc in resource_docs]
+            eager_count = min(EAGER_RESOURCES, len(slots))
+            
+            if progress_callback:
+                progress_callback('topics', {
+                    'topics': topics,
+                    'resources_total': len(slots),
+                    # Skeleton resources stay pending until the learner gets near them
+                    'resources_skeleton': len(slots) - eager_count
+                })
+            
+            def save_content(position: int, content):
+                # Fill in each eager slot as soon as it is generated
+                self._store_content(all_resource_ids[position], content, db)
                 
-                # Save generated content to database and pre-generate quizzes
-                for content in learning_contents:
-                    resource_doc = {
-                        'id': content.id,
+                if progress_callback:
+                    progress_callback('resource', {
+                        'resource_id': all_resource_ids[position],
                         'title': content.title,
-                        'type': content.type,
-                        'content': content.content,
-                        'summary': content.summary,
-                        'difficulty_level': content.difficulty_level,
-                        'learning_style': content.learning_style,
                         'topic': content.topic,
-                        'estimated_duration': content.estimated_duration,
-                        'prerequisites': content.prerequisites,
-                        'learning_objectives': content.learning_objectives,
-                        'created_at': datetime.utcnow(),
-                        'learner_id': learner_profile.id,
-                        'status': 'ready',
-                        'quiz_pre_generated': False  # Flag to track quiz generation
-                    }
-                    
-                    # Insert into database
-                    db.learning_resources.insert_one(resource_doc)
-                    all_resource_ids.append(content.id)
-                    
-                    # Trigger background quiz pre-generation
-                    self._trigger_quiz_pre_generation(content.id, content.topic, content.difficulty_level)
-                    
-                    print(f"✅ Generated resource: {content.title}")
+                        'position': position
+                    })
             
-            print(f"✅ Generated {len(all_resource_ids)} learning resources with quiz pre-generation")
+            # Only the first resource(s) are generated while the learner waits
+            self.content_generator.generate_slots(slots[:eager_count], on_content=save_content)
+            
+            print(f"✅ Planned {len(all_resource_ids)} learning resources, generated {eager_count} eagerly")
             return all_resource_ids
             
         except Exception as e:
             print(f"❌ Error generating enhanced learning path: {e}")
             raise Exception(f"Failed to generate learning path: {e}")
     
+    def materialize_resource(self, resource_id: str, db) -> Optional[Dict[str, Any]]:
+        """Return a resource, generating its content first if it is still a pending slot.
+
+        If another worker is already generating it, the placeholder is returned
+        right away; check it with is_pending and retry later.
+        """
+        
+        resource = db.learning_resources.find_one({'id': resource_id}, {'_id': 0})
+        if not resource or resource.get('status', 'ready') == 'ready':
+            return resource
+        
+        # Claim the slot; a 'generating' claim that went stale (crashed worker) can be taken over
+        claimed = db.learning_resources.find_one_and_update(
+            {
+                'id': resource_id,
+                '$or': [
+                    {'status': 'pending'},
+                    {'status': 'generating',
+                     'generation_started_at': {'$lt': datetime.utcnow() - timedelta(seconds=GENERATION_STALE_SECONDS)}}
+                ]
+            },
+            {'$set': {'status': 'generating', 'generation_started_at': datetime.utcnow()}}
+        )
+        
+        if not claimed:
+            # Someone else is generating it; the caller retries instead of holding a request open
+            print(f"⏳ Resource {resource_id} is still being generated elsewhere")
+            return resource
+        
+        print(f"🛠️ Materializing resource {resource_id}: {claimed['topic']}")
+        try:
+            content = self.content_generator.generate_content(claimed['slot'])
+        except Exception:
+            # Release the slot so a later request can retry it
+            db.learning_resources.update_one(
+                {'id': resource_id}, {'$set': {'status': 'pending'}}
+            )
+            raise
+        self._store_content(resource_id, content, db)
+        return db.learning_resources.find_one({'id': resource_id}, {'_id': 0})
+    
+    @staticmethod
+    def is_pending(resource: Optional[Dict[str, Any]]) -> bool:
+        """Whether a resource is a placeholder whose content has not been generated yet"""
+        return bool(resource) and resource.get('status', 'ready') != 'ready'
+    
+    def prefetch_after(self, resource_id: str, db):
+        """Materialize the resources following `resource_id` in its path in the background"""
+        
+        learning_path = db.learning_paths.find_one({'resources': resource_id}, {'resources': 1})
+        if learning_path:
+            position = learning_path['resources'].index(resource_id)
+            self.prefetch_from(learning_path['resources'], position + 1, db)
+    
+    def prefetch_from(self, resource_ids: List[str], position: int, db):
+        """Materialize the pending resources at `position` and the lookahead window after it"""
+        
+        window = resource_ids[position:position + PREFETCH_LOOKAHEAD]
+        if not window:
+            return
+        
+        pending_ids = [
+            doc['id'] for doc in db.learning_resources.find(
+                {'id': {'$in': window}, 'status': 'pending'}, {'id': 1}
+            )
+        ]
+        
+        for pending_id in pending_ids:
+            print(f"🔮 Prefetching resource {pending_id}")
+            _prefetch_executor.submit(self._prefetch_one, pending_id, db)
+    
+    def _prefetch_one(self, resource_id: str, db):
+        try:
+            self.materialize_resource(resource_id, db)
+        except Exception as e:
+            print(f"❌ Prefetch failed for resource {resource_id}: {e}")
+    
+    def _skeleton_resource_doc(self, slot: Dict[str, Any], learner_profile: LearnerProfile) -> Dict[str, Any]:
+        """A pending resource: enough to place it in the path, with the slot kept for later generation"""
+        return {
+            'id': str(uuid.uuid4()),
+            'title': f"{slot['topic']} - Part {slot['sequence_position']}",
+            'type': slot['resource_type'],
+            'content': '',
+            'summary': '',
+            'difficulty_level': slot['difficulty'],
+            'learning_style': slot['learning_style'],
+            'topic': slot['topic'],
+            'estimated_duration': 0,
+            'prerequisites': [],
+            'learning_objectives': [],
+            'created_at': datetime.utcnow(),
+            'learner_id': learner_profile.id,
+            'status': 'pending',
+            'slot': slot,
+            'quiz_pre_generated': False  # Flag to track quiz generation
+        }
+    
+    def _store_content(self, resource_id: str, content, db):
+        """Fill a slot with generated content and pre-generate its quiz"""
+        
+        db.learning_resources.update_one(
+            {'id': resource_id},
+            {'$set': {
+                'title': content.title,
+                'type': content.type,
+                'content': content.content,
+                'summary': content.summary,
+                'difficulty_level': content.difficulty_level,
+                'learning_style': content.learning_style,
+                'topic': content.topic,
+                'estimated_duration': content.estimated_duration,
+                'prerequisites': content.prerequisites,
+                'learning_objectives': content.learning_objectives,
+                'youtube_videos': content.youtube_videos,
+                'generated_at': datetime.utcnow(),
+                'status': 'ready'
+            }}
+        )
+        
+        # Trigger background quiz pre-generation
+        self._trigger_quiz_pre_generation(resource_id, content.topic, content.difficulty_level)
+        
+        print(f"✅ Generated resource: {content.title}")
+    
     def _trigger_quiz_pre_generation(self, resource_id: str, topic: str, difficulty: int):
         """Trigger background quiz pre-generation for a resource"""
         
@@ -123,6 +254,26 @@ class EnhancedPathGeneratorAgent:
     def _generate_topic_sequence(self, learner_profile: LearnerProfile) -> List[str]:
         """Generate sequence of topics to cover based on learner profile"""
         
+        try:
+            # Learners with the same subject, level, weak areas and style share a sequence
+            cached_topics = mongo_mcp.get_cached_topic_sequence(
+                learner_profile.subject, learner_profile.knowledge_level,
+                learner_profile.weak_areas, learner_profile.learning_style,
+                # Bypass the response cache, which could hand back the same stale answer
+                refresh=lambda: self._request_topic_sequence(learner_profile, cache=False)
+            )
+            if cached_topics:
+                return cached_topics
+            
+            return self._request_topic_sequence(learner_profile)
+            
+        except Exception as e:
+            print(f"❌ Error generating topic sequence: {e}")
+            raise Exception(f"Failed to generate topic sequence: {e}")
+    
+    def _request_topic_sequence(self, learner_profile: LearnerProfile, cache: Optional[bool] = None) -> List[str]:
+        """Ask Gemini for a topic sequence and cache it"""
+        
         try:
             prompt = f"""{self.system_context}
 
@@ -146,17 +297,20 @@ Return only a JSON array of topic names:
 
 Generate the topic sequence now:"""
             
-            response = self.gemini.generate(prompt, max_tokens=500)
+            response = self.gemini.generate(prompt, max_tokens=500, purpose='topic_sequence', cache=cache)
             
             # Extract JSON array from response
-            json_match = re.search(r'\[.*?\]', response, re.DOTALL)
-            if json_match:
-                topics = json.loads(json_match.group())
-                if isinstance(topics, list) and len(topics) >= 3:
-                    return topics[:5]  # Limit to 5 topics
+            topics = parse_json(response, expect=list)
+            if isinstance(topics, list) and len(topics) >= 3:
+                topics = topics[:5]  # Limit to 5 topics
+                mongo_mcp.cache_topic_sequence(
+                    learner_profile.subject, learner_profile.knowledge_level,
+                    learner_profile.weak_areas, learner_profile.learning_style, topics
+                )
+                return topics
             
             raise Exception("Failed to generate topic sequence from Gemini")
             
         except Exception as e:
-            print(f"❌ Error generating topic sequence: {e}")
-            raise Exception(f"Failed to generate topic sequence: {e}")
\ No newline at end of file
+            print(f"❌ Error requesting topic sequence: {e}")
+            raise Exception(f"Topic sequence request failed: {e}")
\ No newline at end of file
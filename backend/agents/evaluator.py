@@ -1,13 +1,13 @@
 # agents/evaluator.py
 from typing import Dict, List, Any
-from .content_generator import GeminiClient
+from .gemini_client import get_gemini_client
 from .models import QuizQuestion
 
 class EvaluatorAgent:
     """AI Agent for evaluating quiz responses and providing feedback using Gemini AI"""
     
     def __init__(self, gemini_api_key: str):
-        self.gemini = GeminiClient(gemini_api_key)
+        self.gemini = get_gemini_client(gemini_api_key)
         self.agent_name = "QuizEvaluator"
         self.system_context = """You are an educational assessment expert. 
         Your role is to evaluate quiz responses and provide constructive, encouraging feedback."""
@@ -35,7 +35,7 @@ Write helpful, encouraging feedback (2-3 sentences) that:
 
 Keep the tone positive and educational. Return only the feedback text without any additional formatting:"""
             
-            response = self.gemini.generate(prompt, max_tokens=300)
+            response = self.gemini.generate(prompt, max_tokens=300, purpose='feedback')
             feedback = response.strip() if response else f"Your answer is {'correct' if is_correct else 'incorrect'}."
             
         except Exception as e:
@@ -85,7 +85,7 @@ Write an encouraging 1-2 sentence recommendation that:
 
 Return only the recommendation text without any additional formatting:"""
             
-            response = self.gemini.generate(prompt, max_tokens=200)
+            response = self.gemini.generate(prompt, max_tokens=200, purpose='recommendation')
             recommendation = response.strip() if response else (
                 'Great job! Keep up the good work!' if average_score >= 70 else 'Keep practicing to improve your understanding!'
             )
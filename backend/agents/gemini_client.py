@@ -0,0 +1,466 @@
+# agents/gemini_client.py
+import os
+import json
+import asyncio
+import threading
+import weakref
+from typing import Dict, List, Optional, Any, Iterator, Callable
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import retry, stop_after_attempt, wait_exponential
+from .rate_limiter import gemini_rate_limiter, estimate_tokens
+from .json_repair import parse_json
+from .response_cache import llm_response_cache, response_cache_key, RESPONSE_CACHE_ENABLED
+from .singleflight import gemini_singleflight
+
+# aiohttp is optional: without it, or with an injected session, agenerate runs the sync transport in an executor
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+GEMINI_API_HOST = 'https://generativelanguage.googleapis.com'
+GEMINI_MODEL = 'gemini-1.5-flash'
+REQUEST_TIMEOUT = 30
+
+# Keep-alive pool shared by every agent and background thread in the process
+POOL_MAXSIZE = int(os.getenv('GEMINI_POOL_MAXSIZE', '20'))
+WARM_CONNECTIONS = int(os.getenv('GEMINI_WARM_CONNECTIONS', '2'))
+
+# Maximum in-flight agenerate calls per event loop
+MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+
+# Minimum pause applied to the shared limiter when Gemini answers 429
+RATE_LIMIT_PAUSE_SECONDS = 5
+
+def _build_session(pool_maxsize: int) -> requests.Session:
+    """Create a requests session backed by a keep-alive connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=False)
+    session.mount('https://', adapter)
+    session.headers.update({'Content-Type': 'application/json'})
+    return session
+
+_shared_session = _build_session(POOL_MAXSIZE)
+
+def _retry_after_seconds(headers) -> float:
+    """Read a numeric Retry-After header, ignoring the HTTP-date form"""
+    try:
+        return float(headers.get('Retry-After', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+class GeminiRateLimitError(requests.exceptions.RequestException):
+    """Gemini answered 429 Too Many Requests"""
+
+# Structured-output outcomes per purpose, to see how many responses needed repair or were wasted
+_parse_stats: Dict[str, Dict[str, int]] = {}
+_parse_stats_lock = threading.Lock()
+
+def _record_parse(purpose: str, outcome: str):
+    with _parse_stats_lock:
+        stats = _parse_stats.setdefault(purpose, {'parsed': 0, 'repaired': 0, 'failed': 0})
+        stats[outcome] += 1
+
+def get_parse_stats() -> Dict[str, Dict[str, int]]:
+    """Get structured-output parse outcomes (parsed, repaired, failed) by purpose"""
+    with _parse_stats_lock:
+        return {purpose: dict(stats) for purpose, stats in _parse_stats.items()}
+
+class _AsyncState:
+    """Per-event-loop concurrency semaphore and HTTP session used by agenerate"""
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        self.http_session = None
+        if aiohttp is not None:
+            self.http_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                headers={'Content-Type': 'application/json'}
+            )
+
+# Keyed weakly by event loop so loops created by asyncio.run() don't leak state
+_async_states = weakref.WeakKeyDictionary()
+_async_states_lock = threading.Lock()
+
+def _get_async_state() -> _AsyncState:
+    loop = asyncio.get_running_loop()
+    with _async_states_lock:
+        state = _async_states.get(loop)
+        if state is None:
+            state = _AsyncState()
+            _async_states[loop] = state
+        return state
+
+async def close_async_session():
+    """Close the async HTTP session bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _async_states_lock:
+        state = _async_states.pop(loop, None)
+    if state and state.http_session is not None:
+        await state.http_session.close()
+
+_ASYNC_HTTP_ERRORS = (requests.exceptions.RequestException, asyncio.TimeoutError)
+if aiohttp is not None:
+    _ASYNC_HTTP_ERRORS += (aiohttp.ClientError,)
+
+class GeminiClient:
+    def __init__(self, api_key: str, session: Optional[requests.Session] = None):
+        self.api_key = api_key
+        self.base_url = f'{GEMINI_API_HOST}/v1beta/models/{GEMINI_MODEL}:generateContent'
+        self.stream_url = f'{GEMINI_API_HOST}/v1beta/models/{GEMINI_MODEL}:streamGenerateContent'
+        self.session = session or _shared_session
+        # An injected transport (e.g. a test double) must also carry agenerate's requests
+        self._owns_transport = session is None
+        self.rate_limiter = gemini_rate_limiter
+        self.response_cache = llm_response_cache
+        self.singleflight = gemini_singleflight
+
+    def warm_up(self, connections: int = WARM_CONNECTIONS) -> int:
+        """Open pooled connections ahead of the first LLM call so TCP+TLS handshakes are paid at startup"""
+
+        warmed = []
+
+        def open_connection():
+            try:
+                # Any response means the socket and TLS session are now pooled
+                self.session.head(GEMINI_API_HOST, timeout=5)
+                warmed.append(True)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Gemini connection warm-up failed: {e}")
+
+        threads = [threading.Thread(target=open_connection) for _ in range(max(1, connections))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=6)
+
+        print(f"🔥 Warmed {len(warmed)} Gemini connection(s)")
+        return len(warmed)
+
+    def _build_payload(self, prompt: str, max_tokens: int, response_schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        payload = {
+            "contents": [
+                {
+                    "parts": [
+                        {
+                            "text": prompt
+                        }
+                    ]
+                }
+            ],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": max_tokens,
+                "topP": 0.8,
+                "topK": 40
+            }
+        }
+
+        if response_schema is not None:
+            # Structured output: Gemini constrains decoding to JSON matching the schema
+            payload["generationConfig"]["responseMimeType"] = "application/json"
+            payload["generationConfig"]["responseSchema"] = response_schema
+
+        return payload
+
+    def _on_rate_limited(self, headers):
+        """Hold back every caller, not just this one, until the quota recovers"""
+        self.rate_limiter.pause(max(_retry_after_seconds(headers), RATE_LIMIT_PAUSE_SECONDS))
+        print(f"⚠️ Rate limit hit (429), retrying with exponential backoff...")
+        raise GeminiRateLimitError("Rate limit exceeded")
+
+    def _post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a request over the pooled session and return the decoded JSON body"""
+        response = self.session.post(url, json=payload, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code == 429:
+            self._on_rate_limited(response.headers)
+
+        response.raise_for_status()
+        return response.json()
+
+    def _extract_text(self, result: Dict[str, Any], reserved_tokens: int, purpose: str) -> str:
+        """Record real token usage and pull the generated text out of a Gemini response"""
+        usage = result.get('usageMetadata', {})
+        if 'totalTokenCount' in usage:
+            self.rate_limiter.record_usage(reserved_tokens, usage['totalTokenCount'], purpose)
+
+        if 'candidates' in result and len(result['candidates']) > 0:
+            if 'content' in result['candidates'][0]:
+                if 'parts' in result['candidates'][0]['content']:
+                    return result['candidates'][0]['content']['parts'][0]['text']
+
+        print(f"❌ Unexpected Gemini response format: {result}")
+        raise Exception("Invalid response format from Gemini")
+
+    def _cache_key(self, payload: Dict[str, Any]) -> str:
+        return response_cache_key(GEMINI_MODEL, payload['contents'][0]['parts'][0]['text'], payload['generationConfig'])
+
+    def invalidate_cached_response(self, prompt: str, max_tokens: int = 2048,
+                                   response_schema: Optional[Dict[str, Any]] = None):
+        """Forget the cached response to a request whose output the caller rejected"""
+        self.response_cache.invalidate(self._cache_key(self._build_payload(prompt, max_tokens, response_schema)))
+
+    @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=2, min=4, max=60))
+    def generate(self, prompt: str, max_tokens: int = 2048, purpose: str = 'general',
+                 response_schema: Optional[Dict[str, Any]] = None, cache: Optional[bool] = None) -> str:
+        """Generate text using Gemini AI API with rate limiting and retry logic.
+
+        Identical requests are answered from the response cache, or share one
+        upstream call while in flight, unless `cache` is False (it defaults to
+        GEMINI_RESPONSE_CACHE).
+        """
+        try:
+            url = f"{self.base_url}?key={self.api_key}"
+            payload = self._build_payload(prompt, max_tokens, response_schema)
+
+            use_cache = RESPONSE_CACHE_ENABLED if cache is None else cache
+            if not use_cache:
+                return self._request_text(url, payload, prompt, max_tokens, purpose)
+
+            key = self._cache_key(payload)
+            cached = self.response_cache.get(key, self._refresher(key, payload, prompt, max_tokens, purpose))
+            if cached is not None:
+                print(f"💾 Using cached Gemini response ({purpose})")
+                return cached
+
+            def fetch():
+                text = self._request_text(url, payload, prompt, max_tokens, purpose)
+                self.response_cache.put(key, text, GEMINI_MODEL, purpose)
+                return text
+
+            # Concurrent identical requests wait on one upstream call
+            return self.singleflight.do(key, fetch)
+
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Gemini request error: {e}")
+            raise Exception(f"Failed to connect to Gemini AI: {e}")
+        except Exception as e:
+            print(f"❌ Gemini error: {e}")
+            raise Exception(f"Gemini generation failed: {e}")
+
+    def _refresher(self, key: str, payload: Dict[str, Any], prompt: str, max_tokens: int, purpose: str) -> Callable[[], None]:
+        """Background re-fetch that replaces a stale cached response"""
+        url = f"{self.base_url}?key={self.api_key}"
+
+        def refresh():
+            text = self._request_text(url, payload, prompt, max_tokens, purpose)
+            self.response_cache.put(key, text, GEMINI_MODEL, purpose)
+
+        return refresh
+
+    def _request_text(self, url: str, payload: Dict[str, Any], prompt: str, max_tokens: int, purpose: str) -> str:
+        # Rate limiting: wait for room in the process-wide RPM/TPM budget
+        reserved_tokens = estimate_tokens(prompt, max_tokens)
+        self.rate_limiter.acquire(reserved_tokens, purpose)
+
+        print(f"🤖 Sending request to Gemini AI...")
+        result = self._post(url, payload)
+
+        return self._extract_text(result, reserved_tokens, purpose)
+
+    @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=2, min=4, max=60))
+    async def agenerate(self, prompt: str, max_tokens: int = 2048, purpose: str = 'general',
+                        response_schema: Optional[Dict[str, Any]] = None, cache: Optional[bool] = None) -> str:
+        """Async counterpart of generate with the same cache, coalescing, limiter and retries"""
+        loop = asyncio.get_running_loop()
+
+        try:
+            url = f"{self.base_url}?key={self.api_key}"
+            payload = self._build_payload(prompt, max_tokens, response_schema)
+
+            use_cache = RESPONSE_CACHE_ENABLED if cache is None else cache
+            if not use_cache:
+                return await self._arequest_text(url, payload, prompt, max_tokens, purpose)
+
+            key = self._cache_key(payload)
+            # The MongoDB tier blocks, so it is consulted off the event loop
+            cached = await loop.run_in_executor(
+                None, self.response_cache.get, key, self._refresher(key, payload, prompt, max_tokens, purpose)
+            )
+            if cached is not None:
+                print(f"💾 Using cached Gemini response ({purpose})")
+                return cached
+
+            async def fetch():
+                text = await self._arequest_text(url, payload, prompt, max_tokens, purpose)
+                await loop.run_in_executor(None, self.response_cache.put, key, text, GEMINI_MODEL, purpose)
+                return text
+
+            return await self.singleflight.ado(key, fetch)
+
+        except _ASYNC_HTTP_ERRORS as e:
+            print(f"❌ Gemini request error: {e}")
+            raise Exception(f"Failed to connect to Gemini AI: {e}")
+        except Exception as e:
+            print(f"❌ Gemini error: {e}")
+            raise Exception(f"Gemini generation failed: {e}")
+
+    async def _arequest_text(self, url: str, payload: Dict[str, Any], prompt: str, max_tokens: int, purpose: str) -> str:
+        # Bounded per event loop, so a large gather doesn't open unbounded connections
+        state = _get_async_state()
+
+        async with state.semaphore:
+            reserved_tokens = estimate_tokens(prompt, max_tokens)
+            await self.rate_limiter.aacquire(reserved_tokens, purpose)
+
+            print(f"🤖 Sending async request to Gemini AI...")
+            if self._owns_transport and state.http_session is not None:
+                async with state.http_session.post(url, json=payload) as response:
+                    if response.status == 429:
+                        self._on_rate_limited(response.headers)
+                    response.raise_for_status()
+                    result = await response.json()
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(None, self._post, url, payload)
+
+            return self._extract_text(result, reserved_tokens, purpose)
+
+    def stream_generate(self, prompt: str, max_tokens: int = 2048, purpose: str = 'general',
+                        response_schema: Optional[Dict[str, Any]] = None, cache: Optional[bool] = None) -> Iterator[str]:
+        """Yield generated text chunks as Gemini streams them (Server-Sent Events).
+
+        Closing the generator early closes the connection, which stops generation
+        and the tokens billed for it. Only streams read to the end are cached;
+        a cached response is yielded as a single chunk. Concurrent identical
+        streams share one upstream connection.
+        """
+        url = f"{self.stream_url}?alt=sse&key={self.api_key}"
+        payload = self._build_payload(prompt, max_tokens, response_schema)
+
+        use_cache = RESPONSE_CACHE_ENABLED if cache is None else cache
+        if not use_cache:
+            yield from self._stream_text(url, payload, prompt, max_tokens, purpose)
+            return
+
+        key = self._cache_key(payload)
+        cached = self.response_cache.get(key, self._refresher(key, payload, prompt, max_tokens, purpose))
+        if cached is not None:
+            print(f"💾 Using cached Gemini response ({purpose})")
+            yield cached
+            return
+
+        yield from self.singleflight.stream(
+            key, lambda: self._stream_text(url, payload, prompt, max_tokens, purpose, cache_key=key)
+        )
+
+    def _stream_text(self, url: str, payload: Dict[str, Any], prompt: str, max_tokens: int, purpose: str,
+                     cache_key: Optional[str] = None) -> Iterator[str]:
+        reserved_tokens = estimate_tokens(prompt, max_tokens)
+        self.rate_limiter.acquire(reserved_tokens, purpose)
+
+        print(f"🤖 Streaming request to Gemini AI...")
+        try:
+            response = self.session.post(url, json=payload, timeout=REQUEST_TIMEOUT, stream=True)
+            if response.status_code == 429:
+                response.close()
+                self._on_rate_limited(response.headers)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Gemini request error: {e}")
+            raise Exception(f"Failed to connect to Gemini AI: {e}")
+
+        usage = {}
+        chunks = []
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                event = json.loads(line[len('data:'):])
+                # Usage metadata is cumulative, so the last one seen is the total
+                usage = event.get('usageMetadata', usage)
+                for candidate in event.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            chunks.append(part['text'])
+                            yield part['text']
+
+            if cache_key and chunks:
+                self.response_cache.put(cache_key, ''.join(chunks), GEMINI_MODEL, purpose)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Gemini stream error: {e}")
+            raise Exception(f"Gemini stream interrupted: {e}")
+        finally:
+            response.close()
+            if 'totalTokenCount' in usage:
+                self.rate_limiter.record_usage(reserved_tokens, usage['totalTokenCount'], purpose)
+
+    def generate_json(self, prompt: str, schema: Dict[str, Any], max_tokens: int = 2048, purpose: str = 'general',
+                      cache: Optional[bool] = None) -> Any:
+        """Generate a JSON value constrained to `schema` and return it decoded.
+
+        Responses cut off by the token limit are repaired rather than re-requested;
+        a response that still cannot be parsed raises ValueError.
+        """
+        response = self.generate(prompt, max_tokens=max_tokens, purpose=purpose, response_schema=schema, cache=cache)
+
+        try:
+            value = json.loads(response)
+            _record_parse(purpose, 'parsed')
+            return value
+        except json.JSONDecodeError:
+            pass
+
+        try:
+            value = parse_json(response, expect=list if schema.get('type') == 'ARRAY' else dict)
+            _record_parse(purpose, 'repaired')
+            print(f"🩹 Repaired malformed structured output ({purpose})")
+            return value
+        except ValueError as e:
+            _record_parse(purpose, 'failed')
+            print(f"❌ Unparseable structured output ({purpose}): {e}")
+            self.invalidate_cached_response(prompt, max_tokens, schema)
+            raise ValueError(f"Gemini returned invalid JSON for {purpose}: {e}")
+
+    def generate_many(self, prompts: List[str], max_tokens: int = 2048, purpose: str = 'general') -> List[Any]:
+        """Run several prompts concurrently from synchronous code.
+
+        Results keep the order of `prompts`; a prompt that failed after all
+        retries comes back as its exception instead of a string. Async callers
+        should gather agenerate themselves; this raises RuntimeError inside a
+        running event loop.
+        """
+
+        async def run_all():
+            try:
+                return await asyncio.gather(
+                    *(self.agenerate(prompt, max_tokens, purpose) for prompt in prompts),
+                    return_exceptions=True
+                )
+            finally:
+                await close_async_session()
+
+        if not prompts:
+            return []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run_all())
+        raise RuntimeError("generate_many can't run inside an event loop; await agenerate with asyncio.gather instead")
+
+# Process-wide registry: one client per API key, all sharing the pooled session
+_clients: Dict[str, GeminiClient] = {}
+_clients_lock = threading.Lock()
+
+def get_gemini_client(api_key: str) -> GeminiClient:
+    """Return the shared GeminiClient for this API key, creating it on first use"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = GeminiClient(api_key)
+            _clients[api_key] = client
+        return client
+
+def warm_up_gemini_clients() -> int:
+    """Pre-warm the shared connection pool for every registered client"""
+    with _clients_lock:
+        clients = list(_clients.values())
+
+    if not clients:
+        return 0
+
+    # All clients share one session, so warming one warms the pool for all
+    return clients[0].warm_up()
@@ -0,0 +1,290 @@
+# agents/json_repair.py
+import re
+import json
+import time
+from typing import Any, List, Optional
+
+# Runs of characters that need no attention, so the scanner jumps over them in one step
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]+')
+_STRUCTURE_RUN = re.compile(r'[^"{}\[\],\x00-\x08\x0b\x0c\x0e-\x1f]+')
+
+# What may follow a quote that really closes a string, and what may follow the comma after it
+_AFTER_QUOTE = re.compile(r'\s*(.?)', re.DOTALL)
+_VALUE_START = re.compile(r'\s*(?:["{\[\]}\-\d]|true\b|false\b|null\b|$)')
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+
+# Streaming scanner runs: the input is well-formed JSON (structured output), so only
+# quotes, backslashes and brackets change state
+_STREAM_STRING_RUN = re.compile(r'[^"\\]+')
+_STREAM_STRUCTURE_RUN = re.compile(r'[^"{}\[\],]+')
+
+_SIMPLE_ESCAPES = frozenset('"\\/bfnrt')
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+_PAIRS = {'{': '}', '[': ']'}
+_OPENERS = {list: '[', dict: '{'}
+
+def extract_json(text: str, expect: Optional[type] = None) -> str:
+    """Locate the first JSON value in LLM output and return it repaired, in a single linear pass.
+
+    `expect` (list or dict) picks which kind of value to look for; by default
+    whichever of `[` or `{` comes first. Surrounding prose and markdown fences
+    are ignored. Inside strings, invalid escapes keep their backslash, raw
+    control characters are escaped and stray quotes are escaped; trailing
+    commas are dropped and a value truncated by the token limit is closed.
+    """
+
+    if not text or not text.strip():
+        raise ValueError("Empty response")
+
+    start = _find_start(text, expect)
+    if start == -1:
+        raise ValueError("No valid JSON structure found")
+
+    out = []
+    append = out.append
+    stack = []
+    in_string = False
+    pending_comma = None  # index in `out` of a comma that a closer would make trailing
+    i = start
+    n = len(text)
+
+    while i < n:
+        if in_string:
+            match = _STRING_RUN.match(text, i)
+            if match:
+                append(match.group())
+                i = match.end()
+                continue
+
+            ch = text[i]
+            if ch == '"':
+                if _closes_string(text, i + 1):
+                    append('"')
+                    in_string = False
+                else:
+                    # A quote inside the text that the model forgot to escape
+                    append('\\"')
+                i += 1
+            elif ch == '\\':
+                nxt = text[i + 1] if i + 1 < n else ''
+                if nxt in _SIMPLE_ESCAPES:
+                    append(text[i:i + 2])
+                    i += 2
+                elif nxt == 'u' and _HEX4.match(text, i + 2):
+                    append(text[i:i + 6])
+                    i += 6
+                elif nxt == "'":
+                    append("'")
+                    i += 2
+                else:
+                    # Keep the backslash as literal text (e.g. LaTeX or regex in a lesson)
+                    append('\\\\')
+                    i += 1
+            else:
+                append(_CONTROL_ESCAPES.get(ch) or '\\u%04x' % ord(ch))
+                i += 1
+            continue
+
+        match = _STRUCTURE_RUN.match(text, i)
+        if match:
+            run = match.group()
+            append(run)
+            if not run.isspace():
+                pending_comma = None
+            i = match.end()
+            continue
+
+        ch = text[i]
+        if ch == '"':
+            append('"')
+            in_string = True
+            pending_comma = None
+        elif ch in _PAIRS:
+            append(ch)
+            stack.append(ch)
+            pending_comma = None
+        elif ch in '}]':
+            if pending_comma is not None:
+                out[pending_comma] = ''
+                pending_comma = None
+            if stack:
+                # A mismatched closer is replaced by the one the structure needs
+                append(_PAIRS[stack.pop()])
+                if not stack:
+                    break
+        elif ch == ',':
+            pending_comma = len(out)
+            append(',')
+        # Other control characters between tokens are dropped
+        i += 1
+
+    # Close a value the model was cut off in the middle of
+    if in_string:
+        append('"')
+    if pending_comma is not None:
+        out[pending_comma] = ''
+    while stack:
+        append(_PAIRS[stack.pop()])
+
+    return ''.join(out)
+
+def parse_json(text: str, expect: Optional[type] = None) -> Any:
+    """Extract, repair and decode the JSON value in LLM output.
+
+    With expect=list a lone object is wrapped in a list. Raises ValueError
+    (json.JSONDecodeError included) when no usable JSON is found.
+    """
+    value = json.loads(extract_json(text, expect))
+    if expect is list and isinstance(value, dict):
+        return [value]
+    return value
+
+class JsonArrayStreamParser:
+    """Incrementally parse a streamed top-level JSON array.
+
+    feed() takes text chunks as they arrive and returns every array element that
+    closed within them, decoded, so callers can act on the first element long
+    before the array is complete. Each character is scanned once across all chunks.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._started = False
+        self._depth = 0  # nesting below the top-level array
+        self._in_string = False
+        self._escaped = False
+        self._in_element = False
+        self._pieces: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk and return the elements completed by it"""
+        items = []
+        i = 0
+        n = len(chunk)
+
+        if not self._started:
+            i = chunk.find('[')
+            if i == -1:
+                return items
+            self._started = True
+            i += 1
+
+        element_start = i if self._in_element else None
+
+        while i < n and not self.done:
+            ch = chunk[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    i += 1
+                    continue
+                match = _STREAM_STRING_RUN.match(chunk, i)
+                if match:
+                    i = match.end()
+                    continue
+                if ch == '\\':
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                i += 1
+                continue
+
+            match = _STREAM_STRUCTURE_RUN.match(chunk, i)
+            if match:
+                if not self._in_element and not match.group().isspace():
+                    # A scalar element begins at its first non-space character
+                    element_start = i + len(match.group()) - len(match.group().lstrip())
+                    self._in_element = True
+                i = match.end()
+                continue
+
+            if not self._in_element and ch in '"{[':
+                element_start = i
+                self._in_element = True
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth > 0:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._finish_element(chunk[element_start:i + 1], items)
+                        element_start = None
+                else:
+                    # End of the top-level array
+                    if self._in_element:
+                        self._finish_element(chunk[element_start:i], items)
+                        element_start = None
+                    self.done = True
+            elif ch == ',' and self._depth == 0 and self._in_element:
+                self._finish_element(chunk[element_start:i], items)
+                element_start = None
+            i += 1
+
+        if self._in_element and element_start is not None:
+            self._pieces.append(chunk[element_start:i])
+
+        return items
+
+    def _finish_element(self, tail: str, items: List[Any]):
+        self._pieces.append(tail)
+        text = ''.join(self._pieces).strip()
+        self._pieces = []
+        self._in_element = False
+
+        try:
+            items.append(json.loads(text, strict=False))
+        except ValueError:
+            try:
+                items.append(parse_json(text))
+            except ValueError as e:
+                print(f"⚠️ Skipping malformed streamed JSON element: {e}")
+
+def _find_start(text: str, expect: Optional[type]) -> int:
+    if expect in _OPENERS:
+        start = text.find(_OPENERS[expect])
+        # Callers expecting a list also accept a single object
+        if start == -1 and expect is list:
+            start = text.find('{')
+        return start
+
+    starts = [pos for pos in (text.find('['), text.find('{')) if pos != -1]
+    return min(starts) if starts else -1
+
+def _closes_string(text: str, pos: int) -> bool:
+    """Decide whether the quote just before `pos` ends the string, from what follows it"""
+    match = _AFTER_QUOTE.match(text, pos)
+    follower = match.group(1)
+    if follower in ('', '}', ']', ':'):
+        return True
+    if follower == ',':
+        return _VALUE_START.match(text, match.end()) is not None
+    return False
+
+def benchmark(paragraphs: int = 200, repeat: int = 20):
+    """Time extract_json on a lesson-sized response containing every repair case"""
+
+    paragraph = 'Line with a "quoted" word, a \\d regex escape and a raw\nnewline.\t'
+    body = ' '.join([paragraph] * paragraphs)
+    response = (
+        'Here is the lesson:\n```json\n'
+        '{"title": "Benchmark", "content": "' + body + '", '
+        '"learning_objectives": ["one", "two",], "estimated_duration": 20,}\n```'
+    )
+
+    parse_json(response, expect=dict)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse_json(response, expect=dict)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    print(f"⏱️ parse_json: {len(response):,} chars in {elapsed * 1000:.2f} ms "
+          f"({len(response) / elapsed / 1e6:.1f} M chars/s)")
+    return elapsed
+
+if __name__ == '__main__':
+    for size in (50, 200, 800):
+        benchmark(paragraphs=size)
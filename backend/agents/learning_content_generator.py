@@ -1,16 +1,16 @@
 # agents/learning_content_generator.py
-import json
 import uuid
-import re
 import sys
 import os
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Callable
 
 # Add the parent directory to the path so we can import services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from .content_generator import GeminiClient
-from .models import LearningContent
+from .gemini_client import get_gemini_client
+from .models import LearningContent, LEARNING_CONTENT_SCHEMA
+from mcp_server.mongo_mcp import mongo_mcp
 
 # Import YouTube service
 try:
@@ -19,11 +19,17 @@ except ImportError:
     print("⚠️ YouTube service not available, videos will be disabled")
     YouTubeService = None
 
+# Upper bound on resources generated at once for one learning path
+CONTENT_MAX_WORKERS = int(os.getenv('CONTENT_MAX_WORKERS', '6'))
+
+# Distinct lessons generated per (topic, difficulty, style, type) before learners start sharing them
+CONTENT_VARIANTS = int(os.getenv('CONTENT_VARIANTS', '3'))
+
 class LearningContentGenerator:
     """AI Agent for generating actual learning content using Gemini AI"""
     
     def __init__(self, gemini_api_key: str):
-        self.gemini = GeminiClient(gemini_api_key)
+        self.gemini = get_gemini_client(gemini_api_key)
         self.youtube_service = YouTubeService() if YouTubeService else None
         self.agent_name = "LearningContentGenerator"
         self.system_context = """You are an expert educational content creator and curriculum designer. 
@@ -34,29 +40,80 @@ class LearningContentGenerator:
         
         print(f"📚 Generating learning sequence for {topic} - {learner_profile.learning_style} learner")
         
-        # Define resource types based on learning style
-        resource_types = self._get_resource_types_for_style(learner_profile.learning_style)
-        
         learning_contents = []
         
-        for i in range(num_resources):
-            difficulty = min(5, learner_profile.knowledge_level + (i // 2))  # Gradual progression
-            resource_type = resource_types[i % len(resource_types)]
-            
-            content = self._generate_single_content(
-                topic=topic,
-                resource_type=resource_type,
-                difficulty=difficulty,
-                learning_style=learner_profile.learning_style,
-                sequence_position=i + 1,
-                total_sequence=num_resources
-            )
+        for slot in self._plan_sequence(learner_profile, topic, num_resources):
+            content = self._generate_single_content(**slot)
             
             if content:
                 learning_contents.append(content)
         
         return learning_contents
     
+    def plan_learning_sequences(self, learner_profile, topics: List[str], num_resources: int = 2) -> List[Dict[str, Any]]:
+        """Plan the resource slots of a whole path without generating any content"""
+        
+        slots = []
+        for topic in topics:
+            slots.extend(self._plan_sequence(learner_profile, topic, num_resources))
+        return slots
+    
+    def generate_content(self, slot: Dict[str, Any]) -> LearningContent:
+        """Generate the content for one planned slot"""
+        return self._generate_single_content(**slot)
+    
+    def generate_slots(self, slots: List[Dict[str, Any]],
+                       on_content: Optional[Callable[[int, LearningContent], None]] = None) -> List[LearningContent]:
+        """Generate planned slots concurrently, keeping slot order and skipping failed slots"""
+        
+        def generate_slot(slot) -> Optional[LearningContent]:
+            try:
+                return self._generate_single_content(**slot)
+            except Exception as e:
+                # Partial success: one failed resource must not sink the whole path
+                print(f"⚠️ Skipping resource {slot['sequence_position']} for {slot['topic']}: {e}")
+                return None
+        
+        results: List[Optional[LearningContent]] = [None] * len(slots)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(CONTENT_MAX_WORKERS, len(slots)))) as executor:
+            futures = {executor.submit(generate_slot, slot): i for i, slot in enumerate(slots)}
+            
+            for future in as_completed(futures):
+                # Slot index keeps path order no matter which resource finishes first
+                i = futures[future]
+                results[i] = future.result()
+                
+                if results[i] and on_content:
+                    on_content(i, results[i])
+        
+        learning_contents = [content for content in results if content]
+        
+        if slots and not learning_contents:
+            raise Exception("Failed to generate any learning content")
+        
+        print(f"✅ Generated {len(learning_contents)}/{len(slots)} resources")
+        return learning_contents
+    
+    def _plan_sequence(self, learner_profile, topic: str, num_resources: int) -> List[Dict[str, Any]]:
+        """Describe each resource slot of a topic's sequence as _generate_single_content arguments"""
+        
+        # Define resource types based on learning style
+        resource_types = self._get_resource_types_for_style(learner_profile.learning_style)
+        
+        slots = []
+        for i in range(num_resources):
+            slots.append({
+                'topic': topic,
+                'resource_type': resource_types[i % len(resource_types)],
+                'difficulty': min(5, learner_profile.knowledge_level + (i // 2)),  # Gradual progression
+                'learning_style': learner_profile.learning_style,
+                'sequence_position': i + 1,
+                'total_sequence': num_resources
+            })
+        
+        return slots
+    
     def _get_resource_types_for_style(self, learning_style: str) -> List[str]:
         """Get preferred resource types for learning style"""
         
@@ -70,6 +127,46 @@ class LearningContentGenerator:
         return style_preferences.get(learning_style, ['lesson', 'tutorial', 'guide', 'practice'])
     
     def _generate_single_content(self, topic: str, resource_type: str, difficulty: int, learning_style: str, sequence_position: int, total_sequence: int) -> LearningContent:
+        """Get a single piece of learning content, reusing another learner's lesson when the pool is full"""
+        
+        # Pooled lessons are shared by every position with this key, so position stays out of the lesson itself
+        slot = (topic, resource_type, difficulty, learning_style)
+        cached = mongo_mcp.get_cached_content(
+            topic, difficulty, learning_style, resource_type, min_variants=CONTENT_VARIANTS,
+            # A stale pool gets a fresh variant in the background, rotating out its oldest
+            refresh=lambda: self._generate_and_cache_content(*slot)
+        )
+        if cached:
+            # Clone the cached lesson into a new resource
+            return LearningContent(
+                id=str(uuid.uuid4()),
+                type=resource_type,
+                difficulty_level=difficulty,
+                learning_style=learning_style,
+                topic=topic,
+                prerequisites=[],
+                **cached
+            )
+        
+        return self._generate_and_cache_content(*slot)
+    
+    def _generate_and_cache_content(self, topic: str, resource_type: str, difficulty: int, learning_style: str) -> LearningContent:
+        """Generate a new lesson and add it to the content variant pool"""
+        
+        learning_content = self._generate_ai_content(topic, resource_type, difficulty, learning_style)
+        
+        mongo_mcp.cache_content(topic, difficulty, learning_style, resource_type, {
+            'title': learning_content.title,
+            'content': learning_content.content,
+            'summary': learning_content.summary,
+            'estimated_duration': learning_content.estimated_duration,
+            'learning_objectives': learning_content.learning_objectives,
+            'youtube_videos': learning_content.youtube_videos
+        }, max_variants=CONTENT_VARIANTS)
+        
+        return learning_content
+    
+    def _generate_ai_content(self, topic: str, resource_type: str, difficulty: int, learning_style: str) -> LearningContent:
         """Generate a single piece of learning content using Gemini AI"""
         
         try:
@@ -80,139 +177,45 @@ Return ONLY a valid JSON object with this structure:
 
 Topic: {topic}
 Difficulty: {difficulty}/5
-Position: {sequence_position} of {total_sequence}
+Format: {resource_type.replace('_', ' ')}
 
 Generate the JSON object now:"""
 
-            response = self.gemini.generate(prompt, max_tokens=3000)
+            # Structured output: the response is decoded against the lesson schema
+            try:
+                # Not response-cached: identical prompts must still yield distinct lesson variants
+                content_data = self.gemini.generate_json(prompt, LEARNING_CONTENT_SCHEMA, max_tokens=3000, purpose='lesson', cache=False)
+            except ValueError as e:
+                raise Exception(f"Invalid JSON from Gemini: {e}")
             
-            # Clean and parse JSON response
-            json_content = self._robust_extract_json(response)
+            learning_content = LearningContent(
+                id=str(uuid.uuid4()),
+                title=content_data.get('title', f"{topic} - {resource_type.replace('_', ' ').title()}"),
+                type=resource_type,
+                content=content_data.get('content', f'Content about {topic}'),
+                summary=content_data.get('summary', f'Learn about {topic}'),
+                difficulty_level=difficulty,
+                learning_style=learning_style,
+                topic=topic,
+                estimated_duration=content_data.get('estimated_duration', 20),
+                prerequisites=[],
+                learning_objectives=content_data.get('learning_objectives', [f'Understand {topic}']),
+                youtube_videos=[]
+            )
             
-            if json_content:
+            # Add YouTube videos for visual learners
+            if learning_style == 'visual' and self.youtube_service:
+                print(f"🎥 Searching YouTube videos for: {topic}")
                 try:
-                    content_data = json.loads(json_content)
-                except json.JSONDecodeError as e:
-                    print(f"❌ JSON decode error: {e}")
-                    print(f"❌ Failed JSON content: {json_content}")
-                    raise Exception(f"Invalid JSON from Gemini: {e}")
-                
-                learning_content = LearningContent(
-                    id=str(uuid.uuid4()),
-                    title=content_data.get('title', f'{topic} - Part {sequence_position}'),
-                    type=resource_type,
-                    content=content_data.get('content', f'Content about {topic}'),
-                    summary=content_data.get('summary', f'Learn about {topic}'),
-                    difficulty_level=difficulty,
-                    learning_style=learning_style,
-                    topic=topic,
-                    estimated_duration=content_data.get('estimated_duration', 20),
-                    prerequisites=[],
-                    learning_objectives=content_data.get('learning_objectives', [f'Understand {topic}']),
-                    youtube_videos=[]
-                )
-                
-                # Add YouTube videos for visual learners
-                if learning_style == 'visual' and self.youtube_service:
-                    print(f"🎥 Searching YouTube videos for: {topic}")
-                    try:
-                        youtube_videos = self.youtube_service.search_videos(topic, max_results=3)
-                        learning_content.youtube_videos = youtube_videos
-                        print(f"📺 Added {len(youtube_videos)} YouTube videos")
-                    except Exception as e:
-                        print(f"⚠️ YouTube search failed: {e}")
-                        learning_content.youtube_videos = []
-                
-                return learning_content
-            else:
-                raise Exception("Failed to extract JSON from Gemini response")
+                    youtube_videos = self.youtube_service.search_videos(topic, max_results=3)
+                    learning_content.youtube_videos = youtube_videos
+                    print(f"📺 Added {len(youtube_videos)} YouTube videos")
+                except Exception as e:
+                    print(f"⚠️ YouTube search failed: {e}")
+                    learning_content.youtube_videos = []
+            
+            return learning_content
                 
         except Exception as e:
             print(f"❌ Error generating content for {topic}: {e}")
-            raise Exception(f"Failed to generate content for {topic}: {e}")
-
-    def _robust_extract_json(self, response: str) -> str:
-        """Robust JSON extraction with comprehensive cleanup"""
-        
-        if not response or not response.strip():
-            return None
-        
-        # Remove markdown code blocks
-        response = re.sub(r'```json\s*', '', response, flags=re.IGNORECASE)
-        response = re.sub(r'```\s*', '', response)
-        response = response.strip()
-        
-        # Find JSON object boundaries using brace matching
-        start_idx = response.find('{')
-        if start_idx == -1:
-            return None
-        
-        # Find matching closing brace
-        brace_count = 0
-        end_idx = -1
-        
-        for i in range(start_idx, len(response)):
-            if response[i] == '{':
-                brace_count += 1
-            elif response[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_idx = i
-                    break
-        
-        if end_idx == -1:
-            return None
-        
-        json_content = response[start_idx:end_idx + 1]
-        
-        # Comprehensive cleanup
-        json_content = self._comprehensive_json_fix(json_content)
-        
-        return json_content
-    
-    def _comprehensive_json_fix(self, content: str) -> str:
-        """Comprehensive JSON fixing with escape character handling"""
-        
-        # Remove control characters except essential ones
-        content = ''.join(char for char in content if ord(char) >= 32 or char in '\n\r\t')
-        
-        # Fix escape sequences systematically
-        def clean_escapes(text):
-            result = ""
-            i = 0
-            while i < len(text):
-                if text[i] == '\\' and i + 1 < len(text):
-                    next_char = text[i + 1]
-                    # Only keep valid JSON escape sequences
-                    if next_char in '"\\/:bfnrt':
-                        result += text[i:i+2]
-                        i += 2
-                    elif next_char == 'u' and i + 5 < len(text) and all(c in '0123456789abcdefABCDEF' for c in text[i+2:i+6]):
-                        result += text[i:i+6]
-                        i += 6
-                    else:
-                        # Invalid escape, just add the character
-                        result += next_char
-                        i += 2
-                else:
-                    result += text[i]
-                    i += 1
-            return result
-        
-        content = clean_escapes(content)
-        
-        # Handle newlines within string values
-        # Split on quotes and only process content inside quotes
-        parts = content.split('"')
-        for i in range(1, len(parts), 2):  # Odd indices are string content
-            parts[i] = parts[i].replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
-        
-        content = '"'.join(parts)
-        
-        # Remove trailing commas before closing brackets/braces
-        content = re.sub(r',(\s*[}\]])', r'\1', content)
-        
-        # Clean up excessive whitespace
-        content = re.sub(r'\s+', ' ', content)
-        
-        return content.strip()
\ No newline at end of file
+            raise Exception(f"Failed to generate content for {topic}: {e}")
\ No newline at end of file
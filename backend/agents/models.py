@@ -57,4 +57,33 @@ class LearningContent:
     estimated_duration: int  # in minutes
     prerequisites: List[str]
     learning_objectives: List[str]
-    youtube_videos: List[Dict[str, str]] = field(default_factory=list)  # YouTube videos for visual learners
\ No newline at end of file
+    youtube_videos: List[Dict[str, str]] = field(default_factory=list)  # YouTube videos for visual learners
+
+# Gemini response schemas (OpenAPI subset) for structured output
+QUIZ_QUESTIONS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "question": {"type": "STRING"},
+            "options": {"type": "ARRAY", "items": {"type": "STRING"}, "minItems": 4, "maxItems": 4},
+            "correct_answer": {"type": "STRING"},
+            "topic": {"type": "STRING"}
+        },
+        "required": ["question", "options", "correct_answer"],
+        "propertyOrdering": ["question", "options", "correct_answer", "topic"]
+    }
+}
+
+LEARNING_CONTENT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "content": {"type": "STRING"},
+        "summary": {"type": "STRING"},
+        "learning_objectives": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "estimated_duration": {"type": "INTEGER"}
+    },
+    "required": ["title", "content", "summary", "learning_objectives", "estimated_duration"],
+    "propertyOrdering": ["title", "content", "summary", "learning_objectives", "estimated_duration"]
+}
\ No newline at end of file
@@ -2,7 +2,7 @@
 import uuid
 import threading
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 from dataclasses import asdict
 from .content_generator import ContentGeneratorAgent
 from .path_generator import PathGeneratorAgent
@@ -18,10 +18,28 @@ class AgentOrchestrator:
         self.evaluator_agent = EvaluatorAgent(gemini_api_key)
         print("✅ Initialized AI Agent Orchestrator with Gemini AI")
     
-    def process_new_learner(self, profile_data: Dict, db) -> Dict[str, Any]:
-        """Process new learner with AI-generated content only"""
+    def process_new_learner(self, profile_data: Dict, db,
+                            progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                            profile_id: Optional[str] = None) -> Dict[str, Any]:
+        """Process new learner with AI-generated content only.
+
+        Pass the profile_id of an earlier, interrupted attempt to retry it without
+        creating a second profile or path.
+        """
         
         try:
+            # A previous attempt got as far as saving the path: nothing left to do
+            if profile_id:
+                existing_path = db.learning_paths.find_one({'learner_id': profile_id})
+                if existing_path:
+                    print(f"♻️ Learner {profile_id} already has learning path {existing_path['id']}")
+                    return {
+                        'profile_id': profile_id,
+                        'path_id': existing_path['id'],
+                        'total_resources': len(existing_path['resources']),
+                        'status': 'completed'
+                    }
+            
             # Ensure knowledge_level is an integer
             knowledge_level = profile_data.get('knowledge_level', 1)
             if isinstance(knowledge_level, str):
@@ -44,7 +62,7 @@ class AgentOrchestrator:
             
             # Create learner profile
             profile = LearnerProfile(
-                id=str(uuid.uuid4()),
+                id=profile_id or str(uuid.uuid4()),
                 name=str(profile_data['name']),
                 learning_style=str(profile_data['learning_style']),
                 knowledge_level=knowledge_level,
@@ -53,12 +71,21 @@ class AgentOrchestrator:
                 created_at=datetime.utcnow()
             )
             
-            # Save profile to database
-            db.learner_profiles.insert_one(asdict(profile))
+            # Save profile to database (replacing the one from an interrupted attempt)
+            db.learner_profiles.replace_one({'id': profile.id}, asdict(profile), upsert=True)
+            if profile_id:
+                # Resources from the interrupted attempt are regenerated below
+                removed = db.learning_resources.delete_many({'learner_id': profile.id}).deleted_count
+                print(f"♻️ Retrying learner {profile.id}, removed {removed} partial resources")
             print(f"✅ Created learner profile: {profile.id} for subject: {subject}")
             
+            if progress_callback:
+                progress_callback('profile', {'profile_id': profile.id})
+            
             # Generate learning path with AI-generated content
-            resource_ids = self.path_agent.generate_learning_path_with_content(profile, db)
+            resource_ids = self.path_agent.generate_learning_path_with_content(
+                profile, db, progress_callback=progress_callback
+            )
             
             # Create learning path
             learning_path = LearningPath(
@@ -71,8 +98,8 @@ class AgentOrchestrator:
                 updated_at=datetime.utcnow()
             )
             
-            # Save learning path
-            db.learning_paths.insert_one(asdict(learning_path))
+            # Save learning path (one per learner, even if a retry races a slow first attempt)
+            db.learning_paths.replace_one({'learner_id': profile.id}, asdict(learning_path), upsert=True)
             print(f"✅ Created learning path: {learning_path.id}")
             
             return {
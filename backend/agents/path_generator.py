@@ -1,23 +1,23 @@
 # agents/path_generator.py
-from typing import List
+from typing import List, Dict, Any, Callable, Optional
 from datetime import datetime
-import json
-import re
-from .content_generator import GeminiClient
+from .gemini_client import get_gemini_client
 from .learning_content_generator import LearningContentGenerator
 from .models import LearnerProfile, LearningResource
+from .json_repair import parse_json
 
 class PathGeneratorAgent:
     """AI Agent for generating personalized learning paths with dynamic content"""
     
     def __init__(self, gemini_api_key: str):
-        self.gemini = GeminiClient(gemini_api_key)
+        self.gemini = get_gemini_client(gemini_api_key)
         self.content_generator = LearningContentGenerator(gemini_api_key)
         self.agent_name = "PathGenerator"
         self.system_context = """You are an AI learning path optimization specialist. 
         Your role is to create optimal learning sequences based on learner profiles for ANY subject."""
         
-    def generate_learning_path_with_content(self, learner_profile: LearnerProfile, db) -> List[str]:
+    def generate_learning_path_with_content(self, learner_profile: LearnerProfile, db,
+                                            progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> List[str]:
         """Generate personalized learning path with dynamically created content"""
         
         print(f"🛤️ Generating learning path with content for: {learner_profile.name}")
@@ -28,6 +28,9 @@ class PathGeneratorAgent:
             # Generate learning sequence topics using AI
             topics = self._generate_topic_sequence(learner_profile)
             
+            if progress_callback:
+                progress_callback('topics', {'topics': topics, 'resources_total': len(topics) * 2})
+            
             all_resource_ids = []
             
             # Generate content for each topic
@@ -62,6 +65,14 @@ class PathGeneratorAgent:
                     db.learning_resources.insert_one(resource_doc)
                     all_resource_ids.append(content.id)
                     
+                    if progress_callback:
+                        progress_callback('resource', {
+                            'resource_id': content.id,
+                            'title': content.title,
+                            'topic': content.topic,
+                            'position': len(all_resource_ids) - 1
+                        })
+                    
                     print(f"✅ Generated resource: {content.title}")
             
             print(f"✅ Generated {len(all_resource_ids)} learning resources")
@@ -97,14 +108,12 @@ Return only a JSON array of topic names:
 
 Generate the topic sequence now:"""
             
-            response = self.gemini.generate(prompt, max_tokens=500)
+            response = self.gemini.generate(prompt, max_tokens=500, purpose='topic_sequence')
             
             # Extract JSON array from response
-            json_match = re.search(r'\[.*?\]', response, re.DOTALL)
-            if json_match:
-                topics = json.loads(json_match.group())
-                if isinstance(topics, list) and len(topics) >= 3:
-                    return topics[:5]  # Limit to 5 topics
+            topics = parse_json(response, expect=list)
+            if isinstance(topics, list) and len(topics) >= 3:
+                return topics[:5]  # Limit to 5 topics
             
             raise Exception("Failed to generate topic sequence from Gemini")
             
@@ -0,0 +1,122 @@
+# agents/rate_limiter.py
+import os
+import asyncio
+import time
+import threading
+from typing import Dict, Any
+
+class TokenBucketRateLimiter:
+    """Thread-safe token bucket enforcing requests-per-minute and tokens-per-minute budgets.
+
+    Callers reserve capacity up front and are told exactly how long to wait, so
+    every agent and background thread in the process draws from one quota.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_rate = requests_per_minute / 60.0
+        self._token_rate = tokens_per_minute / 60.0
+
+        # Bucket levels may go negative: that debt is what later callers wait out
+        self._request_level = float(requests_per_minute)
+        self._token_level = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self._total_requests = 0
+        self._waited_requests = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._wait_by_purpose: Dict[str, float] = {}
+        self._tokens_by_purpose: Dict[str, int] = {}
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_level = min(self.requests_per_minute, self._request_level + elapsed * self._request_rate)
+        self._token_level = min(self.tokens_per_minute, self._token_level + elapsed * self._token_rate)
+
+    def reserve(self, tokens: int, purpose: str = 'general') -> float:
+        """Reserve one request and `tokens` tokens; return the seconds the caller must wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            # A single oversized request must still be able to go through eventually
+            tokens = min(tokens, self.tokens_per_minute)
+            self._request_level -= 1
+            self._token_level -= tokens
+
+            wait = max(
+                0.0,
+                self._paused_until - now,
+                -self._request_level / self._request_rate,
+                -self._token_level / self._token_rate
+            )
+
+            self._total_requests += 1
+            self._tokens_by_purpose[purpose] = self._tokens_by_purpose.get(purpose, 0) + tokens
+            if wait > 0:
+                self._waited_requests += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+                self._wait_by_purpose[purpose] = self._wait_by_purpose.get(purpose, 0.0) + wait
+
+            return wait
+
+    def acquire(self, tokens: int, purpose: str = 'general') -> float:
+        """Block until the request fits in the shared budget; return the time waited"""
+        wait = self.reserve(tokens, purpose)
+        if wait > 0:
+            print(f"⏱️ Rate limiting ({purpose}): waiting {wait:.2f} seconds")
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int, purpose: str = 'general') -> float:
+        """Async counterpart of acquire that waits without blocking the event loop"""
+        wait = self.reserve(tokens, purpose)
+        if wait > 0:
+            print(f"⏱️ Rate limiting ({purpose}): waiting {wait:.2f} seconds")
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_usage(self, reserved_tokens: int, actual_tokens: int, purpose: str = 'general'):
+        """Correct the token bucket once the real token count of a request is known"""
+        delta = actual_tokens - min(reserved_tokens, self.tokens_per_minute)
+        if delta == 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._token_level -= delta
+            self._tokens_by_purpose[purpose] = self._tokens_by_purpose.get(purpose, 0) + delta
+
+    def pause(self, seconds: float):
+        """Hold every caller back after the API reports the quota is exhausted (HTTP 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter configuration and how long callers have waited on it"""
+        with self._lock:
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'total_requests': self._total_requests,
+                'waited_requests': self._waited_requests,
+                'total_wait_seconds': round(self._total_wait, 3),
+                'max_wait_seconds': round(self._max_wait, 3),
+                'wait_seconds_by_purpose': {k: round(v, 3) for k, v in self._wait_by_purpose.items()},
+                'tokens_by_purpose': dict(self._tokens_by_purpose)
+            }
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token estimate for a request: ~4 characters per prompt token plus the output budget"""
+    return len(prompt) // 4 + max_tokens
+
+# Global instance shared by every Gemini client and thread in the process
+gemini_rate_limiter = TokenBucketRateLimiter(
+    requests_per_minute=int(os.getenv('GEMINI_RPM', '15')),
+    tokens_per_minute=int(os.getenv('GEMINI_TPM', '1000000'))
+)
@@ -0,0 +1,113 @@
+# agents/response_cache.py
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server.mongo_mcp import mongo_mcp, CACHE_TTLS
+
+# Cache every Gemini response unless a caller opts out
+RESPONSE_CACHE_ENABLED = os.getenv('GEMINI_RESPONSE_CACHE', 'true').lower() == 'true'
+# In-process tier budget, measured in UTF-8 bytes of cached responses
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('GEMINI_RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# In-process entries are served until the soft TTL, then MongoDB decides whether to serve stale and refresh
+RESPONSE_CACHE_MEMORY_TTL_SECONDS = CACHE_TTLS['llm_response_cache'][0] * 3600
+
+def response_cache_key(model: str, prompt: str, generation_config: Dict[str, Any]) -> str:
+    """Content address of a request: identical model, prompt and config give the same key"""
+    material = json.dumps(
+        {'model': model, 'prompt': prompt, 'generationConfig': generation_config},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+class LLMResponseCache:
+    """Two-tier cache of Gemini responses: in-process LRU bounded by bytes, then MongoDB"""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._memory_hits = 0
+        self._mongo_hits = 0
+        self._misses = 0
+
+    def get(self, key: str, refresh: Optional[Callable[[], Any]] = None) -> Optional[str]:
+        """Return the cached response for `key`, promoting MongoDB hits into memory.
+
+        A stale MongoDB hit is still returned, with refresh() queued to replace it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < RESPONSE_CACHE_MEMORY_TTL_SECONDS:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return entry[0]
+
+        response = mongo_mcp.get_cached_llm_response(key, refresh)
+        if response is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._mongo_hits += 1
+        self._remember(key, response)
+        return response
+
+    def put(self, key: str, response: str, model: str, purpose: str):
+        """Store a response in both tiers"""
+        self._remember(key, response)
+        mongo_mcp.cache_llm_response(key, model, purpose, response)
+
+    def invalidate(self, key: str):
+        """Drop a response the caller found unusable, so it is not served again"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[0].encode('utf-8'))
+        mongo_mcp.delete_cached_llm_response(key)
+
+    def _remember(self, key: str, response: str):
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0].encode('utf-8'))
+
+            self._entries[key] = (response, time.monotonic())
+            self._bytes += size
+
+            # Evict least recently used entries until back under budget
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[0].encode('utf-8'))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counts per tier and in-process memory use"""
+        with self._lock:
+            lookups = self._memory_hits + self._mongo_hits + self._misses
+            return {
+                'enabled': RESPONSE_CACHE_ENABLED,
+                'memory_entries': len(self._entries),
+                'memory_bytes': self._bytes,
+                'memory_max_bytes': self.max_bytes,
+                'memory_hits': self._memory_hits,
+                'mongo_hits': self._mongo_hits,
+                'misses': self._misses,
+                'hit_ratio': round((self._memory_hits + self._mongo_hits) / lookups, 3) if lookups else 0.0
+            }
+
+# Global instance shared by every Gemini client in the process
+llm_response_cache = LLMResponseCache()
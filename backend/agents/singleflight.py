@@ -0,0 +1,147 @@
+# agents/singleflight.py
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Awaitable, Iterator, Tuple
+
+# Longest a follower waits for the next chunk of a shared stream
+STREAM_FOLLOW_TIMEOUT = 60
+
+class SharedStream:
+    """Chunks of one upstream stream, replayed to every caller that made the same request"""
+
+    def __init__(self):
+        self._chunks = []
+        self._done = False
+        self._error = None
+        self._changed = threading.Condition()
+
+    def publish(self, chunk: str):
+        with self._changed:
+            self._chunks.append(chunk)
+            self._changed.notify_all()
+
+    def finish(self, error: Exception = None):
+        with self._changed:
+            self._done = True
+            self._error = error
+            self._changed.notify_all()
+
+    def replay(self) -> Iterator[str]:
+        """Yield every chunk the leader has received so far, then the rest as they arrive"""
+        position = 0
+        while True:
+            with self._changed:
+                while position >= len(self._chunks) and not self._done:
+                    if not self._changed.wait(STREAM_FOLLOW_TIMEOUT):
+                        raise Exception("Timed out waiting for shared Gemini stream")
+                if position < len(self._chunks):
+                    chunk = self._chunks[position]
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            position += 1
+            yield chunk
+
+class SingleFlight:
+    """Coalesces concurrent identical calls so only one of them does the work.
+
+    The first caller for a key (the leader) runs the call; callers arriving while
+    it is in flight wait for and share its result, or its exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._streams: Dict[str, SharedStream] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+
+    def _claim(self, registry: Dict[str, Any], key: str, factory) -> Tuple[Any, bool]:
+        with self._lock:
+            call = registry.get(key)
+            if call is not None:
+                self._followers += 1
+                return call, False
+            call = factory()
+            registry[key] = call
+            self._leaders += 1
+            return call, True
+
+    def _release(self, registry: Dict[str, Any], key: str, call):
+        with self._lock:
+            if registry.get(key) is call:
+                del registry[key]
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() once for all concurrent callers with the same key"""
+        future, leader = self._claim(self._calls, key, Future)
+        if not leader:
+            print(f"🔗 Waiting on an identical in-flight request")
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(self._calls, key, future)
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of do; shares results with sync callers and other event loops"""
+        future, leader = self._claim(self._calls, key, Future)
+        if not leader:
+            print(f"🔗 Waiting on an identical in-flight request")
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(self._calls, key, future)
+
+    def stream(self, key: str, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Iterate fn() once for all concurrent callers, replaying its chunks to followers.
+
+        If the leader stops reading early, followers stop at the same point.
+        """
+        shared, leader = self._claim(self._streams, key, SharedStream)
+        if not leader:
+            print(f"🔗 Following an identical in-flight stream")
+            yield from shared.replay()
+            return
+
+        error = None
+        upstream = fn()
+        try:
+            for chunk in upstream:
+                shared.publish(chunk)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Closing the upstream generator closes its connection when the leader stops early
+            upstream.close()
+            shared.finish(error)
+            self._release(self._streams, key, shared)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get how many calls went upstream and how many were coalesced onto them"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls) + len(self._streams),
+                'upstream_calls': self._leaders,
+                'coalesced_calls': self._followers
+            }
+
+# Global instance shared by every Gemini client in the process
+gemini_singleflight = SingleFlight()
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import os
 from pymongo import MongoClient
@@ -8,6 +8,7 @@ from dataclasses import asdict
 from dotenv import load_dotenv
 import requests
 import re
+import json
 from urllib.parse import quote_plus
 import sys
 
@@ -16,6 +17,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import MCP
 from mcp_server.mongo_mcp import mongo_mcp
+from mcp_server.indexes import ensure_indexes, index_report, ENSURE_INDEXES_ON_STARTUP
 
 # Import agents
 from agents import (
@@ -29,8 +31,13 @@ from agents import (
 
 # Import enhanced agents
 from agents.enhanced_content_generator import EnhancedContentGeneratorAgent
+from agents.gemini_client import warm_up_gemini_clients, get_parse_stats
+from agents.response_cache import llm_response_cache
+from agents.singleflight import gemini_singleflight
+from agents.rate_limiter import gemini_rate_limiter
+from services.learner_jobs import LearnerJobQueue
 from agents.enhanced_evaluator import EnhancedEvaluatorAgent
-from agents.enhanced_path_generator import EnhancedPathGeneratorAgent
+from agents.enhanced_path_generator import EnhancedPathGeneratorAgent, MATERIALIZE_RETRY_AFTER_SECONDS
 
 # Load environment variables
 load_dotenv()
@@ -74,6 +81,24 @@ except Exception as e:
     print(f"❌ Failed to initialize enhanced agents: {e}")
     exit(1)
 
+# Pre-warm the shared Gemini connection pool so the first LLM calls skip the TCP+TLS handshake
+warm_up_gemini_clients()
+
+# Learner creation runs on background workers draining a Mongo-backed job queue
+learner_jobs = LearnerJobQueue(db, orchestrator)
+learner_jobs.start()
+
+# One-shot: re-key cache entries written under an older cache-key scheme (a single lookup once done)
+mongo_mcp.migrate_cache_keys()
+
+# Entries written before expires_at existed get one, so the TTL indexes expire them too
+mongo_mcp.backfill_cache_expiry()
+
+# Create any missing indexes after re-keying, since cache_key is indexed unique
+# (also available as `python -m mcp_server.indexes [ensure|report]`)
+if ENSURE_INDEXES_ON_STARTUP:
+    ensure_indexes(db)
+
 @app.route('/api/youtube/search', methods=['POST'])
 def search_youtube():
    try:
@@ -263,8 +288,14 @@ def create_learner():
        print(f"📝 Processing data with subject: {subject}")
        
        try:
-           result = orchestrator.process_new_learner(processed_data, db)
-           return jsonify({'success': True, 'data': result})
+           # Generation takes minutes, so hand it to a worker and return the job id right away
+           job_id = learner_jobs.enqueue(processed_data)
+           return jsonify({
+               'success': True,
+               'job_id': job_id,
+               'status': 'queued',
+               'status_url': f'/api/learner/jobs/{job_id}'
+           }), 202
        except Exception as e:
            return jsonify({'success': False, 'error': f'Failed to create learner: {str(e)}'}), 500
        
@@ -275,6 +306,42 @@ def create_learner():
        return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/learner/jobs/<job_id>', methods=['GET'])
+def get_learner_job(job_id):
+   try:
+       job = learner_jobs.get_job(job_id)
+       if not job:
+           return jsonify({'success': False, 'error': 'Job not found'}), 404
+       
+       return jsonify({'success': True, 'job': job})
+       
+   except Exception as e:
+       print(f"❌ Error getting learner job: {e}")
+       return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/learner/jobs/<job_id>/stream', methods=['GET'])
+def stream_learner_job(job_id):
+   """Server-Sent Events: push each generated resource to the client as soon as it is ready"""
+   
+   def event_stream():
+       try:
+           for event, data in learner_jobs.iter_job_events(job_id):
+               if event == 'keepalive':
+                   yield ": keep-alive\n\n"
+               else:
+                   yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+       except Exception as e:
+           print(f"❌ Error streaming learner job {job_id}: {e}")
+           yield f"event: failed\ndata: {json.dumps({'error': str(e)})}\n\n"
+   
+   return Response(
+       stream_with_context(event_stream()),
+       mimetype='text/event-stream',
+       headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+   )
+
+
 # backend/app.py
 # Update the generate_custom_focus_areas endpoint
 
@@ -364,6 +431,49 @@ def conduct_pretest(learner_id):
     except Exception as e:
         print(f"❌ Error conducting pretest: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/learner/<learner_id>/pretest/stream', methods=['GET'])
+def stream_pretest(learner_id):
+   """Server-Sent Events: push each pretest question as soon as it has been generated"""
+   
+   learner_profile = db.learner_profiles.find_one({'id': learner_id})
+   if not learner_profile:
+       return jsonify({'success': False, 'error': 'Learner profile not found'}), 404
+   
+   actual_subject = learner_profile.get('subject', request.args.get('subject', 'general'))
+   print(f"🧪 Streaming pretest for learner: {learner_id}, subject: {actual_subject}")
+   
+   def event_stream():
+       questions = []
+       try:
+           for question in enhanced_content_agent.stream_quiz_questions(topic=actual_subject, difficulty=2, count=5):
+               questions.append(asdict(question))
+               yield f"event: question\ndata: {json.dumps({**questions[-1], 'index': len(questions) - 1})}\n\n"
+           
+           # Create pretest record once every question is known
+           pretest_id = str(uuid.uuid4())
+           db.pretests.insert_one({
+               'id': pretest_id,
+               'learner_id': learner_id,
+               'subject': actual_subject,
+               'questions': questions,
+               'created_at': datetime.utcnow(),
+               'status': 'active',
+               'source': 'enhanced_stream'
+           })
+           
+           print(f"✅ Streamed pretest with {len(questions)} questions")
+           yield f"event: completed\ndata: {json.dumps({'pretest_id': pretest_id, 'total_questions': len(questions)})}\n\n"
+           
+       except Exception as e:
+           print(f"❌ Error streaming pretest: {e}")
+           yield f"event: failed\ndata: {json.dumps({'error': 'Pretest temporarily unavailable. Please try again in a moment.'})}\n\n"
+   
+   return Response(
+       stream_with_context(event_stream()),
+       mimetype='text/event-stream',
+       headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+   )
     
 
 
@@ -380,16 +490,11 @@ def submit_pretest(pretest_id):
        if not pretest:
            return jsonify({'success': False, 'error': 'Pretest not found'}), 404
        
-       # Evaluate answers using enhanced evaluator
-       results = []
-       for question in pretest['questions']:
-           user_answer = answers.get(question['id'], '')
-           
-           result = enhanced_evaluator_agent.evaluate_quiz_response(
-               QuizQuestion(**question),
-               user_answer
-           )
-           results.append(result)
+       # Evaluate answers using enhanced evaluator (uncached feedback is generated concurrently)
+       results = enhanced_evaluator_agent.evaluate_quiz_responses([
+           (QuizQuestion(**question), answers.get(question['id'], ''))
+           for question in pretest['questions']
+       ])
        
        # Generate overall feedback
        overall_feedback = enhanced_evaluator_agent.generate_overall_feedback(results)
@@ -437,7 +542,9 @@ def get_learning_path(learner_id):
        current_resource = None
        if learning_path['current_position'] < len(learning_path['resources']):
            current_resource_id = learning_path['resources'][learning_path['current_position']]
-           current_resource = db.learning_resources.find_one({'id': current_resource_id}, {'_id': 0})
+           # Generates the resource now if it is still pending, then warms up the ones after it
+           current_resource = enhanced_path_agent.materialize_resource(current_resource_id, db)
+           enhanced_path_agent.prefetch_from(learning_path['resources'], learning_path['current_position'] + 1, db)
        
        # Calculate progress
        total_resources = len(learning_path['resources'])
@@ -453,6 +560,7 @@ def get_learning_path(learner_id):
                'completed_resources': completed_resources,
                'completion_percentage': completion_percentage,
                'current_resource': current_resource,
+               'current_resource_pending': enhanced_path_agent.is_pending(current_resource),
                'all_resources': learning_path['resources'],
                'progress': learning_path.get('progress', {})
            }
@@ -511,10 +619,26 @@ def get_resource(resource_id):
    try:
        print(f"📚 Getting resource: {resource_id}")
        
-       resource = db.learning_resources.find_one({'id': resource_id}, {'_id': 0})
+       # Pending resources in the path are generated on first access
+       resource = enhanced_path_agent.materialize_resource(resource_id, db)
        if not resource:
            return jsonify({'success': False, 'error': 'Resource not found'}), 404
        
+       # Keep the next resources in the learner's path ready ahead of time
+       enhanced_path_agent.prefetch_after(resource_id, db)
+       
+       # Still being generated by another worker: tell the client to come back shortly
+       if enhanced_path_agent.is_pending(resource):
+           response = jsonify({
+               'success': False,
+               'pending': True,
+               'status': resource['status'],
+               'retry_after': MATERIALIZE_RETRY_AFTER_SECONDS,
+               'error': 'Resource is still being generated'
+           })
+           response.headers['Retry-After'] = str(MATERIALIZE_RETRY_AFTER_SECONDS)
+           return response, 202
+       
        # Ensure youtube_videos field exists
        if 'youtube_videos' not in resource:
            resource['youtube_videos'] = []
@@ -597,16 +721,11 @@ def submit_quiz(quiz_id):
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        # Evaluate answers using enhanced evaluator with caching
-        results = []
-        for question in quiz['questions']:
-            user_answer = answers.get(question['id'], '')
-            
-            result = enhanced_evaluator_agent.evaluate_quiz_response(
-                QuizQuestion(**question),
-                user_answer
-            )
-            results.append(result)
+        # Evaluate answers using enhanced evaluator with caching (uncached feedback is generated concurrently)
+        results = enhanced_evaluator_agent.evaluate_quiz_responses([
+            (QuizQuestion(**question), answers.get(question['id'], ''))
+            for question in quiz['questions']
+        ])
         
         # Generate overall feedback
         overall_feedback = enhanced_evaluator_agent.generate_overall_feedback(results)
@@ -641,6 +760,8 @@ def submit_quiz(quiz_id):
                         'updated_at': datetime.utcnow()
                     }}
                 )
+                # Start generating the learner's next resources before they ask for them
+                enhanced_path_agent.prefetch_from(learning_path['resources'], new_position, db)
         
         print(f"✅ Quiz submitted successfully with {overall_feedback.get('average_score', 0):.1f}% score")
         
@@ -927,7 +1048,11 @@ def health_check():
        'auth_enabled': False,
        'public_access': True,
        'mcp_cache_enabled': True,
-       'cache_stats': cache_stats
+       'cache_stats': cache_stats,
+       'rate_limiter': gemini_rate_limiter.get_stats(),
+       'structured_output': get_parse_stats(),
+       'response_cache': llm_response_cache.get_stats(),
+       'request_coalescing': gemini_singleflight.get_stats()
    })
 
 def test_gemini_connection():
@@ -936,9 +1061,10 @@ def test_gemini_connection():
            print("❌ Gemini API key not configured")
            return False
            
-       from agents.content_generator import GeminiClient
-       gemini = GeminiClient(GEMINI_API_KEY)
-       response = gemini.generate("Test prompt: Say hello", max_tokens=10)
+       from agents.gemini_client import get_gemini_client
+       gemini = get_gemini_client(GEMINI_API_KEY)
+       # Never answered from the response cache: this checks Gemini is actually reachable
+       response = gemini.generate("Test prompt: Say hello", max_tokens=10, purpose='health_check', cache=False)
        print(f"✅ Gemini AI connection successful")
        return True
    except Exception as e:
@@ -951,14 +1077,21 @@ def setup_enhanced_background_tasks():
     import threading
     import time
     
+    # With Mongo storage, expired cache entries are deleted by TTL indexes (see mcp_server/indexes.py);
+    # other storage backends need a cleanup task
     def cache_cleanup_task():
+        """Delete expired cache entries"""
         while True:
             try:
                 time.sleep(3600)  # Run every hour
                 mongo_mcp.clear_expired_cache()
-                print("🧹 Completed automatic cache cleanup")
             except Exception as e:
-                print(f"❌ Cache cleanup error: {e}")
+                print(f"❌ Cache cleanup task error: {e}")
+    
+    if not mongo_mcp.storage.expires_entries:
+        cleanup_thread = threading.Thread(target=cache_cleanup_task)
+        cleanup_thread.daemon = True
+        cleanup_thread.start()
     
     def quiz_pre_generation_task():
         """Pre-generate quizzes for resources that don't have them"""
@@ -985,15 +1118,12 @@ def setup_enhanced_background_tasks():
                                 resource['difficulty_level']
                             )
                         
-                        # Mark as processed
+                        # Mark as processed (pacing is handled by the shared Gemini rate limiter)
                         db.learning_resources.update_one(
                             {'id': resource['id']},
                             {'$set': {'quiz_pre_generated': True}}
                         )
                         
-                        # Add delay between generations
-                        time.sleep(10)
-                        
                     except Exception as e:
                         print(f"❌ Error pre-generating quiz for {resource['id']}: {e}")
                 
@@ -1003,16 +1133,11 @@ def setup_enhanced_background_tasks():
             except Exception as e:
                 print(f"❌ Quiz pre-generation task error: {e}")
     
-    # Start both background tasks
-    cleanup_thread = threading.Thread(target=cache_cleanup_task)
-    cleanup_thread.daemon = True
-    cleanup_thread.start()
-    
     quiz_thread = threading.Thread(target=quiz_pre_generation_task)
     quiz_thread.daemon = True
     quiz_thread.start()
     
-    print("✅ Enhanced background tasks started (cache cleanup + quiz pre-generation)")
+    print("✅ Enhanced background tasks started (quiz pre-generation)")
 
 
 # Add MCP cache management endpoints
@@ -1020,7 +1145,8 @@ def setup_enhanced_background_tasks():
 def get_cache_stats():
     try:
         print("📊 Getting enhanced MCP cache statistics")
-        stats = mongo_mcp.get_cache_stats()
+        # ?refresh=true recomputes the collection figures instead of serving the recent snapshot
+        stats = mongo_mcp.get_cache_stats(refresh=request.args.get('refresh', '').lower() == 'true')
         
         # Add additional insights
         cache_health = {
@@ -1044,6 +1170,45 @@ def get_cache_stats():
         print(f"❌ Error getting cache stats: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
     
+@app.route('/api/admin/cache/metrics', methods=['GET'])
+def get_cache_metrics():
+    try:
+        print("📈 Getting MCP cache operation metrics")
+        
+        return jsonify({
+            'success': True,
+            # Per cache: local_hit / hit / stale_hit / miss / fill / fill_failure counts and latencies
+            'operations': mongo_mcp.metrics.get_stats(),
+            'hit_ratios': mongo_mcp.cache_stats.get_hit_ratios(),
+            'timestamp': datetime.utcnow().isoformat()
+        })
+        
+    except Exception as e:
+        print(f"❌ Error getting cache metrics: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Scraped per worker process; the counters live in each process
+    return Response(mongo_mcp.metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
+    
+@app.route('/api/admin/indexes', methods=['GET'])
+def get_index_report():
+    try:
+        print("🗂️ Checking database indexes")
+        report = index_report(db)
+        
+        return jsonify({
+            'success': True,
+            'healthy': not any(entry['missing'] for entry in report.values()),
+            'indexes': report,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+        
+    except Exception as e:
+        print(f"❌ Error checking indexes: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
 
 @app.route('/api/admin/cache/populate', methods=['POST'])
 def populate_cache():
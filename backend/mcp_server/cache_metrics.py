@@ -0,0 +1,116 @@
+# backend/mcp_server/cache_metrics.py
+import bisect
+import threading
+from typing import Dict, Any, List, Tuple
+
+# Latency bucket upper bounds in seconds: sub-millisecond L1 hits up to Gemini-backed fills
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# What a cache operation can end in. local_hit is served from the in-process L1, hit and
+# stale_hit from MongoDB (stale_hit also queues a background refresh). fill and fill_failure
+# time regenerating an entry after a miss or for a refresh.
+OUTCOMES = ('local_hit', 'hit', 'stale_hit', 'miss', 'fill', 'fill_failure')
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, exportable in Prometheus' cumulative form"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, observations at or below it) per bucket, ending with +Inf"""
+        running = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            running += count
+            result.append((str(bound), running))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (the largest bound for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+class CacheMetrics:
+    """Per-cache, per-outcome operation counts and latencies for this process"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, cache_name: str, outcome: str, seconds: float):
+        """Record one operation on a cache and how long it took"""
+        with self._lock:
+            histogram = self._histograms.get((cache_name, outcome))
+            if histogram is None:
+                histogram = self._histograms[(cache_name, outcome)] = LatencyHistogram()
+            histogram.observe(max(seconds, 0.0))
+
+    def counts(self, cache_name: str) -> Dict[str, int]:
+        with self._lock:
+            return {outcome: self._histograms[(cache_name, outcome)].count
+                    for outcome in OUTCOMES if (cache_name, outcome) in self._histograms}
+
+    def hit_ratio(self, cache_name: str) -> Dict[str, Any]:
+        """Lookups served (from any tier, stale or not) against lookups that missed"""
+        counts = self.counts(cache_name)
+        hits = counts.get('local_hit', 0) + counts.get('hit', 0) + counts.get('stale_hit', 0)
+        misses = counts.get('miss', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0.0
+        }
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Count and latency summary per cache and outcome"""
+        with self._lock:
+            stats = {}
+            for (cache_name, outcome), histogram in sorted(self._histograms.items()):
+                stats.setdefault(cache_name, {})[outcome] = {
+                    'count': histogram.count,
+                    'avg_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else 0.0,
+                    'p50_ms': round(histogram.quantile(0.5) * 1000, 2),
+                    'p95_ms': round(histogram.quantile(0.95) * 1000, 2),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 2)
+                }
+            return stats
+
+    def prometheus_text(self) -> str:
+        """Every series in the Prometheus text exposition format"""
+        with self._lock:
+            series = sorted(self._histograms.items())
+            lines = [
+                '# HELP mcp_cache_operations_total Cache operations by cache and outcome.',
+                '# TYPE mcp_cache_operations_total counter'
+            ]
+            for (cache_name, outcome), histogram in series:
+                lines.append(f'mcp_cache_operations_total{{cache="{cache_name}",outcome="{outcome}"}} {histogram.count}')
+
+            lines += [
+                '# HELP mcp_cache_operation_seconds Cache operation latency by cache and outcome.',
+                '# TYPE mcp_cache_operation_seconds histogram'
+            ]
+            for (cache_name, outcome), histogram in series:
+                labels = f'cache="{cache_name}",outcome="{outcome}"'
+                for bound, count in histogram.cumulative():
+                    lines.append(f'mcp_cache_operation_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'mcp_cache_operation_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'mcp_cache_operation_seconds_count{{{labels}}} {histogram.count}')
+
+            return '\n'.join(lines) + '\n'
@@ -0,0 +1,136 @@
+# backend/mcp_server/cache_quotas.py
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Optional, Tuple
+from mcp_server.storage import CacheStorage
+
+# (max documents, max bytes) per bounded cache. Entries past either bound are evicted
+# least-frequently-used first (usage_count), least recently used among equals (last_used_at).
+# Entries younger than EVICTION_GRACE_SECONDS are never evicted: they haven't had a chance to be used yet
+CACHE_QUOTAS: Dict[str, Tuple[int, int]] = {
+    'quiz_cache': (
+        int(os.getenv('MCP_QUIZ_CACHE_MAX_ENTRIES', '20000')),
+        int(os.getenv('MCP_QUIZ_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    ),
+    'resource_quizzes': (
+        int(os.getenv('MCP_RESOURCE_QUIZZES_MAX_ENTRIES', '20000')),
+        int(os.getenv('MCP_RESOURCE_QUIZZES_MAX_BYTES', str(256 * 1024 * 1024)))
+    ),
+    'feedback_cache': (
+        int(os.getenv('MCP_FEEDBACK_CACHE_MAX_ENTRIES', '50000')),
+        int(os.getenv('MCP_FEEDBACK_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+    )
+}
+
+# Eviction runs in small batches so it never turns into a large delete sweep
+EVICTION_BATCH_SIZE = int(os.getenv('MCP_EVICTION_BATCH_SIZE', '100'))
+# New entries are kept at least this long, so quota pressure doesn't evict the fills it just paid for
+EVICTION_GRACE_SECONDS = int(os.getenv('MCP_EVICTION_GRACE_SECONDS', '300'))
+# How often quotas are checked even without writes
+EVICTION_INTERVAL_SECONDS = float(os.getenv('MCP_EVICTION_INTERVAL_SECONDS', '60'))
+
+class CacheQuotaEnforcer:
+    """Keeps bounded caches under their entry-count and byte quotas, evicting one small batch at a time.
+
+    Writes to a bounded cache wake the background thread; each pass evicts at most
+    one batch per collection, so a cache far over quota converges over several passes.
+    """
+
+    def __init__(self, storage: CacheStorage,
+                 on_evict: Optional[Callable[[str, str], None]] = None,
+                 quotas: Dict[str, Tuple[int, int]] = CACHE_QUOTAS,
+                 batch_size: int = EVICTION_BATCH_SIZE, interval_seconds: float = EVICTION_INTERVAL_SECONDS,
+                 grace_seconds: int = EVICTION_GRACE_SECONDS):
+        self.storage = storage
+        self.on_evict = on_evict
+        self.quotas = quotas
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._evicted: Dict[str, int] = {}
+        self._last_usage: Dict[str, Dict[str, Any]] = {}
+
+    def note_write(self, collection_name: str):
+        """Called after a write to a cache; schedules a quota check if the cache is bounded"""
+        if collection_name not in self.quotas:
+            return
+        self._ensure_started()
+        self._wakeup.set()
+
+    def enforce(self) -> Dict[str, int]:
+        """Evict at most one batch from each bounded cache that is over quota"""
+        evicted = {}
+        for collection_name in self.quotas:
+            try:
+                count = self._evict_batch(collection_name)
+                if count:
+                    evicted[collection_name] = count
+            except Exception as e:
+                print(f"❌ Error enforcing {collection_name} quota: {e}")
+        return evicted
+
+    def _evict_batch(self, collection_name: str) -> int:
+        max_entries, max_bytes = self.quotas[collection_name]
+
+        entries, size = self.storage.size(collection_name)
+        average = size / entries if entries else 0
+        with self._lock:
+            self._last_usage[collection_name] = {'entries': entries, 'bytes': size, 'checked_at': datetime.utcnow().isoformat()}
+
+        over_entries = max(0, entries - max_entries)
+        over_bytes = int((size - max_bytes) / average) + 1 if size > max_bytes and average else 0
+        to_evict = min(max(over_entries, over_bytes), self.batch_size)
+        if not to_evict:
+            return 0
+
+        created_before = datetime.utcnow() - timedelta(seconds=self.grace_seconds)
+        evicted = self.storage.evict(collection_name, to_evict, created_before)
+        if not evicted:
+            return 0
+
+        if self.on_evict:
+            for key in evicted:
+                self.on_evict(collection_name, key)
+
+        with self._lock:
+            self._evicted[collection_name] = self._evicted.get(collection_name, 0) + len(evicted)
+        print(f"🗑️ Evicted {len(evicted)} least-used {collection_name} entries ({entries} entries, {size} bytes before)")
+        return len(evicted)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='cache-eviction', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval_seconds)
+            self._wakeup.clear()
+            try:
+                evicted = self.enforce()
+                # Still over quota: come straight back for the next batch
+                if evicted:
+                    self._wakeup.set()
+            except Exception as e:
+                print(f"❌ Cache eviction error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get each bounded cache's quota, last measured size and how much has been evicted"""
+        with self._lock:
+            return {
+                collection_name: {
+                    'max_entries': max_entries,
+                    'max_bytes': max_bytes,
+                    'evicted': self._evicted.get(collection_name, 0),
+                    **self._last_usage.get(collection_name, {})
+                }
+                for collection_name, (max_entries, max_bytes) in self.quotas.items()
+            }
@@ -0,0 +1,85 @@
+# backend/mcp_server/cache_stats.py
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from mcp_server.cache_metrics import CacheMetrics
+from mcp_server.storage import CacheStorage
+
+# How long a computed stats snapshot is served before the collections are read again
+CACHE_STATS_TTL_SECONDS = float(os.getenv('MCP_CACHE_STATS_TTL_SECONDS', '30'))
+
+# Cache collection -> (entry count key, hit total key) in the stats get_cache_stats has always returned
+CACHE_STAT_KEYS = {
+    'quiz_cache': ('quiz_questions', 'quiz_cache_hits'),
+    'resource_quizzes': ('resource_quizzes', 'resource_quiz_hits'),
+    'feedback_cache': ('feedback_entries', 'feedback_hits'),
+    'focus_areas_cache': ('focus_areas', 'focus_areas_hits'),
+    'topic_sequences_cache': ('topic_sequences', 'topic_sequences_hits'),
+    'content_cache': ('content_entries', 'content_hits'),
+    'llm_response_cache': ('llm_responses', 'llm_response_hits')
+}
+
+class CacheStats:
+    """Cache statistics from estimated counts and one summary pass per collection ($facet on Mongo), memoized for a short while.
+
+    Hit ratios come live from the process's CacheMetrics; the collection figures
+    are at most ttl_seconds old.
+    """
+
+    def __init__(self, storage: CacheStorage, soft_ttl_hours: Dict[str, int], metrics: CacheMetrics,
+                 ttl_seconds: float = CACHE_STATS_TTL_SECONDS):
+        self.storage = storage
+        self.soft_ttl_hours = soft_ttl_hours
+        self.metrics = metrics
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_at = 0.0
+        self._snapshot_lock = threading.Lock()
+
+    def snapshot(self, force: bool = False) -> Dict[str, Any]:
+        """Collection statistics, recomputed at most once per ttl_seconds however many callers ask"""
+        with self._snapshot_lock:
+            age = time.monotonic() - self._snapshot_at
+            if force or self._snapshot is None or age >= self.ttl_seconds:
+                self._snapshot = self._collect()
+                self._snapshot_at = time.monotonic()
+                age = 0.0
+
+            return {**self._snapshot, 'snapshot_age_seconds': round(age, 1), 'hit_ratios': self.get_hit_ratios()}
+
+    def get_hit_ratios(self) -> Dict[str, Dict[str, Any]]:
+        """Hits and misses per cache since this process started"""
+        return {cache_name: self.metrics.hit_ratio(cache_name) for cache_name in CACHE_STAT_KEYS}
+
+    def _collect(self) -> Dict[str, Any]:
+        stats = {}
+        utilization = {}
+        collections = {}
+        now = datetime.utcnow()
+
+        for cache_name, (count_key, hits_key) in CACHE_STAT_KEYS.items():
+            details = self._collection_stats(cache_name, now - timedelta(hours=self.soft_ttl_hours[cache_name]))
+            stats[count_key] = details['entries']
+            utilization[hits_key] = details['total_usage']
+            collections[cache_name] = details
+
+        stats['total_cache_size'] = sum(details['entries'] for details in collections.values())
+        stats['cache_utilization'] = utilization
+        stats['collections'] = collections
+        stats['generated_at'] = now.isoformat()
+        return stats
+
+    def _collection_stats(self, cache_name: str, stale_before: datetime) -> Dict[str, int]:
+        """Estimated entry count, then usage and staleness from a single pass"""
+        details = {'entries': 0, 'total_usage': 0, 'stale_entries': 0}
+
+        try:
+            details['entries'] = self.storage.estimated_count(cache_name)
+            details.update(self.storage.summarize(cache_name, stale_before))
+
+        except Exception as e:
+            print(f"❌ Error collecting {cache_name} stats: {e}")
+
+        return details
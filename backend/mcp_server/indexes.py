@@ -0,0 +1,204 @@
+# backend/mcp_server/indexes.py
+import os
+import sys
+from typing import Dict, Any, List, Tuple
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+# Every index the app relies on, per collection: (keys, options).
+# Lookups by id are unique; the rest serve the filters and sorts the app runs.
+INDEXES: Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]] = {
+    # App collections
+    'learner_profiles': [
+        ([('id', ASCENDING)], {'unique': True}),
+        ([('created_at', ASCENDING)], {}),  # Recent sign-ups on the admin dashboard
+    ],
+    'learning_paths': [
+        ([('learner_id', ASCENDING)], {}),
+        ([('resources', ASCENDING)], {}),  # Finding the path a resource belongs to, for prefetch
+    ],
+    'learning_resources': [
+        ([('id', ASCENDING)], {'unique': True}),
+        ([('learner_id', ASCENDING)], {}),
+        ([('status', ASCENDING), ('quiz_pre_generated', ASCENDING)], {}),  # Quiz pre-generation sweep
+    ],
+    'quizzes': [
+        ([('id', ASCENDING)], {'unique': True}),
+        ([('resource_id', ASCENDING)], {}),
+    ],
+    'pretests': [
+        ([('id', ASCENDING)], {'unique': True}),
+        ([('learner_id', ASCENDING)], {}),
+    ],
+    'quiz_submissions': [
+        ([('learner_id', ASCENDING)], {}),
+        ([('submitted_at', ASCENDING)], {}),
+    ],
+    'learner_jobs': [
+        ([('id', ASCENDING)], {'unique': True}),
+        ([('status', ASCENDING), ('created_at', ASCENDING)], {}),  # Claiming the oldest queued job
+    ],
+
+    # MongoMCP caches: one document per cache_key. expires_at holds each entry's hard TTL
+    # (CACHE_TTLS), so MongoDB's TTL monitor deletes it continuously with no app-side sweeps
+    'quiz_cache': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+        ([('usage_count', ASCENDING), ('last_used_at', ASCENDING)], {}),  # Eviction order (EVICTION_SORT in storage/mongo.py)
+    ],
+    'resource_quizzes': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+        ([('usage_count', ASCENDING), ('last_used_at', ASCENDING)], {}),  # Eviction order (EVICTION_SORT in storage/mongo.py)
+    ],
+    'feedback_cache': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+        ([('usage_count', ASCENDING), ('last_used_at', ASCENDING)], {}),  # Eviction order (EVICTION_SORT in storage/mongo.py)
+    ],
+    'focus_areas_cache': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+    ],
+    'topic_sequences_cache': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+    ],
+    'content_cache': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+    ],
+    'llm_response_cache': [
+        ([('cache_key', ASCENDING)], {'unique': True}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+    ],
+    'cache_leases': [
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),  # Leases whose holder crashed
+    ],
+}
+
+# Indexes from earlier declarations that ensure_indexes drops: the caches used to be swept by created_at
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    collection_name: ['created_at_1']
+    for collection_name in ('quiz_cache', 'resource_quizzes', 'feedback_cache', 'focus_areas_cache',
+                            'topic_sequences_cache', 'content_cache', 'llm_response_cache')
+}
+
+# Create missing indexes when the app starts (the CLI always can)
+ENSURE_INDEXES_ON_STARTUP = os.getenv('DB_ENSURE_INDEXES', 'true').lower() == 'true'
+
+def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create every declared index that doesn't exist yet and drop retired ones. Safe to run repeatedly.
+
+    An existing index whose TTL differs from its declaration is rebuilt; one that
+    differs in uniqueness is reported, not replaced.
+    """
+    created = {}
+
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        existing = _existing_indexes(collection)
+
+        for keys, info in existing.items():
+            if info['name'] in RETIRED_INDEXES.get(collection_name, []):
+                collection.drop_index(info['name'])
+                print(f"🗑️ Dropped retired index {collection_name}.{info['name']}")
+
+        for keys, options in indexes:
+            current = existing.get(tuple(keys))
+            if current is not None:
+                if bool(current.get('unique')) != bool(options.get('unique')):
+                    print(f"⚠️ {collection_name} index {current['name']} differs from its declaration {options}, leaving it")
+                    continue
+                if current.get('expireAfterSeconds') == options.get('expireAfterSeconds'):
+                    continue
+                # A plain index can't be turned into a TTL index in place
+                collection.drop_index(current['name'])
+                print(f"🔁 Rebuilding {collection_name}.{current['name']} with {options}")
+
+            try:
+                name = collection.create_index(keys, **options)
+                created.setdefault(collection_name, []).append(name)
+                print(f"🗂️ Created index {collection_name}.{name}")
+            except OperationFailure as e:
+                # e.g. duplicates already stored under a key declared unique
+                print(f"❌ Could not create index on {collection_name} {keys}: {e}")
+
+    if not created:
+        print("✅ All declared indexes present")
+    return created
+
+def index_report(db) -> Dict[str, Dict[str, Any]]:
+    """Compare live indexes with the declarations: missing, undeclared, and unused since the server started"""
+    report = {}
+
+    for collection_name in sorted(set(INDEXES) | set(db.list_collection_names())):
+        collection = db[collection_name]
+        existing = _existing_indexes(collection)
+        declared = {tuple(keys) for keys, _ in INDEXES.get(collection_name, [])}
+
+        usage = {}
+        try:
+            for stats in collection.aggregate([{'$indexStats': {}}]):
+                usage[stats['name']] = stats['accesses']['ops']
+        except OperationFailure as e:
+            print(f"⚠️ Index usage unavailable for {collection_name}: {e}")
+
+        entry = {
+            'missing': [_index_name(keys) for keys in declared if keys not in existing],
+            'undeclared': [info['name'] for keys, info in existing.items()
+                           if keys not in declared and info['name'] != '_id_'],
+            'unused': [name for name, ops in usage.items() if ops == 0 and name != '_id_'],
+            'usage': usage
+        }
+        if entry['missing'] or entry['undeclared'] or entry['unused']:
+            report[collection_name] = entry
+
+    return report
+
+def print_index_report(db):
+    """Print index_report in a readable form"""
+    report = index_report(db)
+    if not report:
+        print("✅ Indexes match their declarations and all have been used")
+        return
+
+    for collection_name, entry in report.items():
+        print(f"📋 {collection_name}")
+        for name in entry['missing']:
+            print(f"   ❌ missing: {name}")
+        for name in entry['undeclared']:
+            print(f"   ❔ undeclared: {name} ({entry['usage'].get(name, '?')} ops)")
+        for name in entry['unused']:
+            print(f"   💤 unused since server start: {name}")
+
+def _existing_indexes(collection) -> Dict[Tuple[Tuple[str, int], ...], Dict[str, Any]]:
+    """Live indexes keyed by their key pattern"""
+    existing = {}
+    for name, info in collection.index_information().items():
+        # Directions can come back as floats (1.0)
+        keys = tuple((field, int(direction) if isinstance(direction, float) else direction) for field, direction in info['key'])
+        existing[keys] = {**info, 'name': name}
+    return existing
+
+def _index_name(keys) -> str:
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+if __name__ == '__main__':
+    # Usage: python -m mcp_server.indexes [ensure|report]
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
+    db = client.personalized_tutor
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'ensure'
+    if command == 'ensure':
+        ensure_indexes(db)
+        print_index_report(db)
+    elif command == 'report':
+        print_index_report(db)
+    else:
+        print(f"Unknown command {command!r}; use 'ensure' or 'report'")
+        sys.exit(2)
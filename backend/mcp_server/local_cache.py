@@ -0,0 +1,116 @@
+# backend/mcp_server/local_cache.py
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+# In-process L1 in front of the hottest MongoMCP lookups
+L1_CACHE_ENABLED = os.getenv('MCP_L1_CACHE', 'true').lower() == 'true'
+# Upper bound on how long another worker's write can go unseen here
+L1_CACHE_TTL_SECONDS = float(os.getenv('MCP_L1_TTL_SECONDS', '300'))
+L1_CACHE_MAX_ENTRIES = int(os.getenv('MCP_L1_MAX_ENTRIES', '5000'))
+L1_CACHE_MAX_BYTES = int(os.getenv('MCP_L1_MAX_BYTES', str(16 * 1024 * 1024)))
+
+class LocalCache:
+    """TTL + LRU cache bounded by entry count and approximate bytes, with per-namespace hit/miss counters.
+
+    Values are deep-copied on the way in and out, so callers can't mutate what other requests get.
+    """
+
+    def __init__(self, max_entries: int = L1_CACHE_MAX_ENTRIES, max_bytes: int = L1_CACHE_MAX_BYTES,
+                 ttl_seconds: float = L1_CACHE_TTL_SECONDS, enabled: bool = L1_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()  # (namespace, key) -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    def get(self, namespace: str, key: str, accept: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """Return the live value for key, or None. A value `accept` rejects counts as a miss."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[2] <= time.monotonic():
+                self._drop((namespace, key))
+                entry = None
+
+            if entry is None or (accept and not accept(entry[0])):
+                self._misses[namespace] = self._misses.get(namespace, 0) + 1
+                return None
+
+            self._entries.move_to_end((namespace, key))
+            self._hits[namespace] = self._hits.get(namespace, 0) + 1
+            value = entry[0]
+
+        return copy.deepcopy(value)
+
+    def put(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value for at most the cache TTL (less if ttl_seconds says so)"""
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._drop((namespace, key))
+            self._entries[(namespace, key)] = (value, size, time.monotonic() + ttl)
+            self._bytes += size
+
+            # Evict least recently used entries until back under both bounds
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def invalidate(self, namespace: str, key: str):
+        """Forget an entry, e.g. because it was just rewritten"""
+        with self._lock:
+            self._drop((namespace, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, entry_key: Tuple[str, str]):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counts per namespace and current size"""
+        with self._lock:
+            namespaces = {}
+            for namespace in sorted(set(self._hits) | set(self._misses)):
+                hits = self._hits.get(namespace, 0)
+                misses = self._misses.get(namespace, 0)
+                namespaces[namespace] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0.0
+                }
+
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'namespaces': namespaces
+            }
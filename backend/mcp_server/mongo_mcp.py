@@ -1,52 +1,117 @@
 # backend/mcp_server/mongo_mcp.py
 import json
+import time
+import hashlib
 import asyncio
-from typing import Dict, Any, List, Optional
-from pymongo import MongoClient
+from typing import Dict, Any, List, Optional, Callable
 from datetime import datetime, timedelta
 import os
 import uuid
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from mcp_server.local_cache import LocalCache
+from mcp_server.usage_counters import UsageCounterBuffer, USAGE_COUNTER_MODE
+from mcp_server.cache_stats import CacheStats
+from mcp_server.cache_metrics import CacheMetrics
+from mcp_server.cache_quotas import CacheQuotaEnforcer
+from mcp_server.storage import CacheStorage, create_storage
 
 load_dotenv()
 
+# How long one worker holds the right to regenerate a cache entry before others may take over
+CACHE_LEASE_SECONDS = int(os.getenv('CACHE_LEASE_SECONDS', '90'))
+# How long a worker that lost the lease polls the cache for the holder's result before generating itself
+CACHE_LEASE_WAIT_SECONDS = float(os.getenv('CACHE_LEASE_WAIT_SECONDS', '45'))
+CACHE_LEASE_POLL_SECONDS = 0.5
+
+# (soft TTL, hard TTL) in hours per cache. Between the two an entry is still served while a
+# background refresh regenerates it; past the hard TTL it is a miss, and MongoDB's TTL monitor
+# deletes it via the entry's expires_at (see mcp_server/indexes.py; other backends rely on clear_expired_cache)
+CACHE_TTLS = {
+    'quiz_cache': (72, 168),
+    'resource_quizzes': (168, 336),
+    'feedback_cache': (168, 336),
+    'focus_areas_cache': (720, 1440),
+    'topic_sequences_cache': (336, 672),
+    'content_cache': (168, 336),
+    'llm_response_cache': (24, 72)
+}
+
+# Version of the cache-key digest scheme; migrate_cache_keys rewrites documents keyed by an older one
+CACHE_KEY_SCHEME = 1
+
+# Bump a cache's version when the prompt that fills it changes, so entries from the old prompt stop matching
+PROMPT_VERSIONS = {
+    'quiz_cache': 1,
+    'resource_quizzes': 1,
+    'feedback_cache': 1,
+    'focus_areas_cache': 1,
+    'topic_sequences_cache': 1,
+    'content_cache': 1
+}
+
+# Background refreshes of stale entries run here, off the request that found them
+CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', '2'))
+
 class MongoMCP:
-    """MongoDB MCP Server for caching educational content with AI pre-generation"""
+    """MCP Server for caching educational content with AI pre-generation.
     
-    def __init__(self):
-        self.client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
-        self.db = self.client.personalized_tutor
+    Caches live in a pluggable storage backend (MongoDB by default, see MCP_STORAGE_BACKEND):
+    quiz_cache, resource_quizzes, feedback_cache, focus_areas_cache, topic_sequences_cache,
+    content_cache and llm_response_cache, plus cache_leases (who is regenerating which entry,
+    across worker processes) and cache_meta (bookkeeping such as the key scheme).
+    """
+    
+    def __init__(self, storage: Optional[CacheStorage] = None):
+        # Nothing connects until the first cache operation
+        self.storage = storage or create_storage()
+        
+        # In-process L1 for the hottest lookups; entries live until they would go stale
+        self.local_cache = LocalCache()
+        
+        # Hit counters are buffered and written in bulk rather than one update per hit
+        self.usage_counters = UsageCounterBuffer(self.storage)
+        # Hit/miss/fill counts and latencies per cache, for the admin and Prometheus endpoints
+        self.metrics = CacheMetrics()
+        self.cache_stats = CacheStats(self.storage, {name: soft for name, (soft, _) in CACHE_TTLS.items()}, self.metrics)
+        # Size limits for the caches that would otherwise grow without bound
+        self.cache_quotas = CacheQuotaEnforcer(self.storage, on_evict=self.local_cache.invalidate)
+        # Set while a lease holder or waiter re-checks an entry whose lookup was already counted
+        self._rechecking = threading.local()
         
-        # Collections for caching
-        self.quiz_cache = self.db.quiz_cache
-        self.feedback_cache = self.db.feedback_cache
-        self.content_cache = self.db.content_cache
-        self.topic_sequences_cache = self.db.topic_sequences_cache
-        self.focus_areas_cache = self.db.focus_areas_cache
-        self.resource_quizzes = self.db.resource_quizzes  # New collection for resource-specific quizzes
+        self._refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix='cache-refresh')
         
-        print("✅ MongoDB MCP Server initialized")
+        print(f"✅ MCP Server initialized ({self.storage.name} storage)")
     
-    def get_quiz_for_resource(self, resource_id: str, count: int = 3) -> Optional[List[Dict]]:
-        """Get pre-generated quiz questions for a specific resource"""
+    def get_quiz_for_resource(self, resource_id: str, count: int = 3, allow_stale: bool = False,
+                              refresh: Optional[Callable[[], Any]] = None) -> Optional[List[Dict]]:
+        """Get pre-generated quiz questions for a specific resource (expired ones too with allow_stale)"""
         try:
-            quiz_doc = self.resource_quizzes.find_one({
-                'resource_id': resource_id,
-                'question_count': {'$gte': count}
-            })
-            
-            if quiz_doc and self._is_cache_fresh(quiz_doc['created_at'], hours=168):  # 1 week cache
+            started = time.perf_counter()
+            key = self.cache_key('resource_quizzes', resource_id)
+            if not allow_stale:
+                questions = self.local_cache.get('resource_quizzes', key, accept=lambda cached: len(cached) >= count)
+                if questions is not None:
+                    self._record_hit('resource_quizzes', key, started)
+                    return questions[:count]
+            
+            quiz_doc = self._find_cached('resource_quizzes', key)
+            if quiz_doc and quiz_doc.get('question_count', 0) < count:
+                quiz_doc = None
+            
+            lease_key = self._lease_id('resource_quizzes', key)
+            if quiz_doc and (allow_stale or self._is_servable('resource_quizzes', quiz_doc['created_at'], lease_key, refresh)):
+                self._remember_local('resource_quizzes', key, quiz_doc['questions'], quiz_doc['created_at'])
                 questions = quiz_doc['questions'][:count]
                 print(f"✅ Retrieved {len(questions)} cached quiz questions for resource {resource_id}")
                 
-                # Increment usage count
-                self.resource_quizzes.update_one(
-                    {'resource_id': resource_id},
-                    {'$inc': {'usage_count': 1}}
-                )
+                self._record_hit('resource_quizzes', key, started, from_read=True, created_at=quiz_doc['created_at'])
                 
                 return questions
             
+            self._record_miss('resource_quizzes', started)
             return None
             
         except Exception as e:
@@ -56,50 +121,59 @@ class MongoMCP:
     def cache_quiz_for_resource(self, resource_id: str, topic: str, difficulty: int, questions: List[Dict]):
         """Cache quiz questions for a specific resource"""
         try:
+            key = self.cache_key('resource_quizzes', resource_id)
+            now = datetime.utcnow()
             quiz_doc = {
+                'cache_key': key,
                 'resource_id': resource_id,
                 'topic': topic.lower(),
                 'difficulty': difficulty,
                 'question_count': len(questions),
                 'questions': questions,
-                'created_at': datetime.utcnow(),
+                'created_at': now,
+                'expires_at': self._expiry('resource_quizzes', now),
+                'last_used_at': now,
                 'usage_count': 0,
                 'quiz_id': str(uuid.uuid4())
             }
             
             # Update or insert
-            self.resource_quizzes.update_one(
-                {'resource_id': resource_id},
-                {'$set': quiz_doc},
-                upsert=True
-            )
+            self.storage.put('resource_quizzes', key, quiz_doc)
+            self.local_cache.invalidate('resource_quizzes', key)
+            self.cache_quotas.note_write('resource_quizzes')
             
             print(f"✅ Cached {len(questions)} quiz questions for resource {resource_id}")
             
         except Exception as e:
             print(f"❌ Error caching quiz for resource: {e}")
     
-    def get_cached_quiz_questions(self, topic: str, difficulty: int, count: int = 5) -> Optional[List[Dict]]:
-        """Get cached quiz questions by topic and difficulty"""
+    def get_cached_quiz_questions(self, topic: str, difficulty: int, count: int = 5, allow_stale: bool = False,
+                                  refresh: Optional[Callable[[], Any]] = None) -> Optional[List[Dict]]:
+        """Get cached quiz questions by topic and difficulty (expired ones too with allow_stale)"""
         try:
-            cached = self.quiz_cache.find_one({
-                'topic': topic.lower(),
-                'difficulty': difficulty,
-                'count': {'$gte': count}
-            })
-            
-            if cached and self._is_cache_fresh(cached['created_at'], hours=72):  # 3 days cache
+            started = time.perf_counter()
+            key = self.cache_key('quiz_cache', topic, difficulty)
+            if not allow_stale:
+                questions = self.local_cache.get('quiz_cache', key, accept=lambda cached: len(cached) >= count)
+                if questions is not None:
+                    self._record_hit('quiz_cache', key, started)
+                    return questions[:count]
+            
+            cached = self._find_cached('quiz_cache', key)
+            if cached and cached.get('count', 0) < count:
+                cached = None
+            
+            lease_key = self._lease_id('quiz_cache', key)
+            if cached and (allow_stale or self._is_servable('quiz_cache', cached['created_at'], lease_key, refresh)):
+                self._remember_local('quiz_cache', key, cached['questions'], cached['created_at'])
                 questions = cached['questions'][:count]
                 print(f"✅ Retrieved {len(questions)} cached quiz questions for {topic}")
                 
-                # Increment usage count
-                self.quiz_cache.update_one(
-                    {'topic': topic.lower(), 'difficulty': difficulty},
-                    {'$inc': {'usage_count': 1}}
-                )
+                self._record_hit('quiz_cache', key, started, from_read=True, created_at=cached['created_at'])
                 
                 return questions
             
+            self._record_miss('quiz_cache', started)
             return None
             
         except Exception as e:
@@ -109,46 +183,52 @@ class MongoMCP:
     def cache_quiz_questions(self, topic: str, difficulty: int, questions: List[Dict]):
         """Cache quiz questions by topic and difficulty"""
         try:
+            key = self.cache_key('quiz_cache', topic, difficulty)
+            now = datetime.utcnow()
             cache_doc = {
+                'cache_key': key,
                 'topic': topic.lower(),
                 'difficulty': difficulty,
                 'count': len(questions),
                 'questions': questions,
-                'created_at': datetime.utcnow(),
+                'created_at': now,
+                'expires_at': self._expiry('quiz_cache', now),
+                'last_used_at': now,
                 'usage_count': 0
             }
             
-            self.quiz_cache.update_one(
-                {'topic': topic.lower(), 'difficulty': difficulty},
-                {'$set': cache_doc},
-                upsert=True
-            )
+            self.storage.put('quiz_cache', key, cache_doc)
+            self.local_cache.invalidate('quiz_cache', key)
+            self.cache_quotas.note_write('quiz_cache')
             
             print(f"✅ Cached {len(questions)} quiz questions for {topic}")
             
         except Exception as e:
             print(f"❌ Error caching quiz questions: {e}")
     
-    def get_cached_feedback(self, question_text: str, user_answer: str, correct_answer: str) -> Optional[Dict]:
+    def get_cached_feedback(self, question_text: str, user_answer: str, correct_answer: str,
+                            refresh: Optional[Callable[[], Any]] = None) -> Optional[Dict]:
         """Get cached feedback"""
         try:
-            scenario_hash = hash(f"{question_text[:50]}{user_answer}{correct_answer}".lower())
-            
-            cached = self.feedback_cache.find_one({
-                'scenario_hash': scenario_hash
-            })
-            
-            if cached and self._is_cache_fresh(cached['created_at'], hours=168):
+            started = time.perf_counter()
+            key = self.cache_key('feedback_cache', question_text, user_answer, correct_answer)
+            feedback = self.local_cache.get('feedback_cache', key)
+            if feedback is not None:
+                self._record_hit('feedback_cache', key, started)
+                return feedback
+            
+            cached = self._find_cached('feedback_cache', key)
+            
+            lease_key = self._lease_id('feedback_cache', key)
+            if cached and self._is_servable('feedback_cache', cached['created_at'], lease_key, refresh):
+                self._remember_local('feedback_cache', key, cached['feedback'], cached['created_at'])
                 print(f"✅ Retrieved cached feedback")
                 
-                # Increment usage count
-                self.feedback_cache.update_one(
-                    {'scenario_hash': scenario_hash},
-                    {'$inc': {'usage_count': 1}}
-                )
+                self._record_hit('feedback_cache', key, started, from_read=True, created_at=cached['created_at'])
                 
                 return cached['feedback']
             
+            self._record_miss('feedback_cache', started)
             return None
             
         except Exception as e:
@@ -158,47 +238,55 @@ class MongoMCP:
     def cache_feedback(self, question_text: str, user_answer: str, correct_answer: str, feedback: Dict):
         """Cache feedback"""
         try:
-            scenario_hash = hash(f"{question_text[:50]}{user_answer}{correct_answer}".lower())
+            key = self.cache_key('feedback_cache', question_text, user_answer, correct_answer)
             
+            now = datetime.utcnow()
             cache_doc = {
-                'scenario_hash': scenario_hash,
+                'cache_key': key,
+                'question_text': question_text,  # Kept in full so the key can be rebuilt by a migration
                 'question_snippet': question_text[:100],
                 'user_answer': user_answer,
                 'correct_answer': correct_answer,
                 'feedback': feedback,
-                'created_at': datetime.utcnow(),
+                'created_at': now,
+                'expires_at': self._expiry('feedback_cache', now),
+                'last_used_at': now,
                 'usage_count': 0
             }
             
-            self.feedback_cache.update_one(
-                {'scenario_hash': scenario_hash},
-                {'$set': cache_doc},
-                upsert=True
-            )
+            self.storage.put('feedback_cache', key, cache_doc)
+            self.local_cache.invalidate('feedback_cache', key)
+            self.cache_quotas.note_write('feedback_cache')
             
             print(f"✅ Cached feedback")
             
         except Exception as e:
             print(f"❌ Error caching feedback: {e}")
     
-    def get_cached_focus_areas(self, subject: str) -> Optional[List[str]]:
-        """Get cached focus areas"""
+    def get_cached_focus_areas(self, subject: str, allow_stale: bool = False,
+                               refresh: Optional[Callable[[], Any]] = None) -> Optional[List[str]]:
+        """Get cached focus areas (expired ones too with allow_stale)"""
         try:
-            cached = self.focus_areas_cache.find_one({
-                'subject': subject.lower()
-            })
-            
-            if cached and self._is_cache_fresh(cached['created_at'], hours=720):
+            started = time.perf_counter()
+            key = self.cache_key('focus_areas_cache', subject)
+            if not allow_stale:
+                focus_areas = self.local_cache.get('focus_areas_cache', key)
+                if focus_areas is not None:
+                    self._record_hit('focus_areas_cache', key, started)
+                    return focus_areas
+            
+            cached = self._find_cached('focus_areas_cache', key)
+            
+            lease_key = self._lease_id('focus_areas_cache', key)
+            if cached and (allow_stale or self._is_servable('focus_areas_cache', cached['created_at'], lease_key, refresh)):
+                self._remember_local('focus_areas_cache', key, cached['focus_areas'], cached['created_at'])
                 print(f"✅ Retrieved cached focus areas for {subject}")
                 
-                # Increment usage count
-                self.focus_areas_cache.update_one(
-                    {'subject': subject.lower()},
-                    {'$inc': {'usage_count': 1}}
-                )
+                self._record_hit('focus_areas_cache', key, started, from_read=True, created_at=cached['created_at'])
                 
                 return cached['focus_areas']
             
+            self._record_miss('focus_areas_cache', started)
             return None
             
         except Exception as e:
@@ -208,89 +296,485 @@ class MongoMCP:
     def cache_focus_areas(self, subject: str, focus_areas: List[str]):
         """Cache focus areas"""
         try:
+            key = self.cache_key('focus_areas_cache', subject)
+            now = datetime.utcnow()
             cache_doc = {
+                'cache_key': key,
                 'subject': subject.lower(),
                 'focus_areas': focus_areas,
-                'created_at': datetime.utcnow(),
+                'created_at': now,
+                'expires_at': self._expiry('focus_areas_cache', now),
                 'usage_count': 0
             }
             
-            self.focus_areas_cache.update_one(
-                {'subject': subject.lower()},
-                {'$set': cache_doc},
-                upsert=True
-            )
+            self.storage.put('focus_areas_cache', key, cache_doc)
+            self.local_cache.invalidate('focus_areas_cache', key)
             
             print(f"✅ Cached {len(focus_areas)} focus areas for {subject}")
             
         except Exception as e:
             print(f"❌ Error caching focus areas: {e}")
     
-    def get_cache_stats(self) -> Dict[str, Any]:
-        """Get comprehensive cache statistics"""
+    def get_cached_topic_sequence(self, subject: str, knowledge_level: int, weak_areas: List[str], learning_style: str,
+                                  refresh: Optional[Callable[[], Any]] = None) -> Optional[List[str]]:
+        """Get a cached topic sequence for an equivalent learner profile"""
+        try:
+            started = time.perf_counter()
+            fields = self._topic_sequence_key(subject, knowledge_level, weak_areas, learning_style)
+            key = self.cache_key('topic_sequences_cache', *fields.values())
+            cached = self._find_cached('topic_sequences_cache', key)
+            
+            lease_key = self._lease_id('topic_sequences_cache', key)
+            if cached and self._is_servable('topic_sequences_cache', cached['created_at'], lease_key, refresh):
+                print(f"✅ Retrieved cached topic sequence for {subject} (level {knowledge_level})")
+                
+                self._record_hit('topic_sequences_cache', key, started, from_read=True, created_at=cached['created_at'])
+                
+                return cached['topics']
+            
+            self._record_miss('topic_sequences_cache', started)
+            return None
+            
+        except Exception as e:
+            print(f"❌ Error getting cached topic sequence: {e}")
+            return None
+    
+    def cache_topic_sequence(self, subject: str, knowledge_level: int, weak_areas: List[str], learning_style: str, topics: List[str]):
+        """Cache a topic sequence for a learner profile"""
         try:
-            stats = {
-                'quiz_questions': self.quiz_cache.count_documents({}),
-                'resource_quizzes': self.resource_quizzes.count_documents({}),
-                'feedback_entries': self.feedback_cache.count_documents({}),
-                'focus_areas': self.focus_areas_cache.count_documents({}),
-                'topic_sequences': self.topic_sequences_cache.count_documents({}),
-                'total_cache_size': (
-                    self.quiz_cache.count_documents({}) +
-                    self.resource_quizzes.count_documents({}) +
-                    self.feedback_cache.count_documents({}) +
-                    self.focus_areas_cache.count_documents({}) +
-                    self.topic_sequences_cache.count_documents({})
-                ),
-                'cache_utilization': {
-                    'quiz_cache_hits': self._get_total_usage('quiz_cache'),
-                    'resource_quiz_hits': self._get_total_usage('resource_quizzes'),
-                    'feedback_hits': self._get_total_usage('feedback_cache'),
-                    'focus_areas_hits': self._get_total_usage('focus_areas_cache')
-                }
+            fields = self._topic_sequence_key(subject, knowledge_level, weak_areas, learning_style)
+            key = self.cache_key('topic_sequences_cache', *fields.values())
+            now = datetime.utcnow()
+            cache_doc = {
+                'cache_key': key,
+                **fields,
+                'topics': topics,
+                'created_at': now,
+                'expires_at': self._expiry('topic_sequences_cache', now),
+                'usage_count': 0
             }
             
+            self.storage.put('topic_sequences_cache', key, cache_doc)
+            
+            print(f"✅ Cached {len(topics)} topics for {subject} (level {knowledge_level})")
+            
+        except Exception as e:
+            print(f"❌ Error caching topic sequence: {e}")
+    
+    def get_cached_content(self, topic: str, difficulty: int, learning_style: str, resource_type: str, min_variants: int = 1,
+                           refresh: Optional[Callable[[], Any]] = None) -> Optional[Dict]:
+        """Get one variant of cached learning content, once the key's variant pool is full enough"""
+        try:
+            started = time.perf_counter()
+            key = self.cache_key('content_cache', *self._content_key(topic, difficulty, learning_style, resource_type).values())
+            cached = self._find_cached('content_cache', key)
+            
+            if not cached:
+                self._record_miss('content_cache', started)
+                return None
+            
+            # Variants past the hard TTL are never handed out
+            hard_hours = CACHE_TTLS['content_cache'][1]
+            variants = [(index, variant) for index, variant in enumerate(cached.get('variants', []))
+                        if self._is_cache_fresh(variant['created_at'], hours=hard_hours)]
+            
+            # Keep generating until the pool has enough variety to hand out
+            if len(variants) < min_variants:
+                self._record_miss('content_cache', started)
+                return None
+            
+            # The pool goes stale when no variant has been added for the soft TTL
+            lease_key = self._lease_id('content_cache', key)
+            if not self._is_servable('content_cache', cached['created_at'], lease_key, refresh):
+                self._record_miss('content_cache', started)
+                return None
+            
+            index, variant = random.choice(variants)
+            print(f"✅ Retrieved cached content variant {index + 1}/{len(variants)} for {topic}")
+            
+            self._record_hit('content_cache', key, started, from_read=True, created_at=cached['created_at'], increments={f'variants.{index}.usage_count': 1})
+            
+            return variant['content']
+            
+        except Exception as e:
+            print(f"❌ Error getting cached content: {e}")
+            return None
+    
+    def cache_content(self, topic: str, difficulty: int, learning_style: str, resource_type: str, content: Dict, max_variants: int = 3):
+        """Add generated learning content to its key's variant pool"""
+        try:
+            fields = self._content_key(topic, difficulty, learning_style, resource_type)
+            key = self.cache_key('content_cache', *fields.values())
+            now = datetime.utcnow()
+            
+            # Append the new variant, rotating out the oldest; the pool's created_at tracks its newest variant
+            self.storage.push(
+                'content_cache', key, 'variants',
+                {'content': content, 'created_at': now, 'usage_count': 0}, max_variants,
+                set_fields={'created_at': now, 'expires_at': self._expiry('content_cache', now)},
+                insert_fields={**fields, 'usage_count': 0}
+            )
+            
+            print(f"✅ Cached content variant for {topic}")
+            
+        except Exception as e:
+            print(f"❌ Error caching content: {e}")
+    
+    def get_cached_llm_response(self, key: str, refresh: Optional[Callable[[], Any]] = None) -> Optional[str]:
+        """Get a cached Gemini response by request hash"""
+        try:
+            started = time.perf_counter()
+            # The key is already a content address of the whole request (see response_cache_key)
+            cached = self._find_cached('llm_response_cache', key)
+            
+            lease_key = self._lease_id('llm_response_cache', key)
+            if cached and self._is_servable('llm_response_cache', cached['created_at'], lease_key, refresh):
+                self._record_hit('llm_response_cache', key, started, from_read=True, created_at=cached['created_at'])
+                
+                return cached['response']
+            
+            self._record_miss('llm_response_cache', started)
+            return None
+            
+        except Exception as e:
+            print(f"❌ Error getting cached LLM response: {e}")
+            return None
+    
+    def cache_llm_response(self, key: str, model: str, purpose: str, response: str):
+        """Cache a Gemini response by request hash"""
+        try:
+            now = datetime.utcnow()
+            cache_doc = {
+                'cache_key': key,
+                'model': model,
+                'purpose': purpose,
+                'response': response,
+                'created_at': now,
+                'expires_at': self._expiry('llm_response_cache', now),
+                'usage_count': 0
+            }
+            
+            self.storage.put('llm_response_cache', key, cache_doc)
+            
+        except Exception as e:
+            print(f"❌ Error caching LLM response: {e}")
+    
+    def delete_cached_llm_response(self, key: str):
+        """Remove a cached Gemini response"""
+        try:
+            self.storage.delete('llm_response_cache', key)
+        except Exception as e:
+            print(f"❌ Error deleting cached LLM response: {e}")
+    
+    def cache_key(self, cache_name: str, *parts: Any) -> str:
+        """Deterministic digest of a cache's normalized inputs and prompt version.
+        
+        Unlike hash(), it is the same in every process and across restarts. Text is
+        lowercased with whitespace collapsed; lists are treated as sets.
+        """
+        material = json.dumps(
+            [CACHE_KEY_SCHEME, cache_name, PROMPT_VERSIONS[cache_name]] + [self._normalize_key_part(part) for part in parts],
+            ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def fill_lease_key(self, cache_name: str, *parts: Any) -> str:
+        """Lease id for the cache entry that cache_key(cache_name, *parts) addresses"""
+        return self._lease_id(cache_name, self.cache_key(cache_name, *parts))
+    
+    def _lease_id(self, cache_name: str, key: str) -> str:
+        return f"{cache_name}:{key}"
+    
+    def acquire_fill_lease(self, lease_key: str, ttl_seconds: int = CACHE_LEASE_SECONDS) -> Optional[str]:
+        """Take the lease to regenerate a cache entry; returns a token, or None if another worker holds it"""
+        now = datetime.utcnow()
+        token = str(uuid.uuid4())
+        try:
+            if self.storage.acquire_lease(lease_key, token, now, now + timedelta(seconds=ttl_seconds)):
+                return token
+            return None
+        except Exception as e:
+            # Without the lease collection we fall back to every worker filling for itself
+            print(f"⚠️ Could not take cache-fill lease {lease_key}, filling without it: {e}")
+            return token
+    
+    def release_fill_lease(self, lease_key: str, token: str):
+        """Give up a lease, unless it already expired and another worker took it over"""
+        try:
+            self.storage.release_lease(lease_key, token)
+        except Exception as e:
+            print(f"❌ Error releasing cache-fill lease {lease_key}: {e}")
+    
+    def wait_for_fill(self, lease_key: str, lookup: Callable[[], Any], stale_lookup: Optional[Callable[[], Any]] = None,
+                      timeout: float = CACHE_LEASE_WAIT_SECONDS) -> Optional[Any]:
+        """While another worker holds the lease: return a stale value if there is one, else poll the cache for its result.
+        
+        Returns None once the holder gives up or `timeout` passes, so the caller can fill the entry itself.
+        """
+        if stale_lookup:
+            stale = self._recheck(stale_lookup)
+            if stale is not None:
+                print(f"♻️ Serving stale {lease_key} while another worker regenerates it")
+                return stale
+        
+        print(f"⏳ Waiting for another worker to fill {lease_key}")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(CACHE_LEASE_POLL_SECONDS)
+            value = self._recheck(lookup)
+            if value is not None:
+                return value
+            if not self._is_lease_held(lease_key):
+                break
+        
+        print(f"⚠️ Lease holder did not fill {lease_key}, filling it here")
+        return None
+    
+    def fill_with_lease(self, lease_key: str, lookup: Callable[[], Any], fill: Callable[[], Any],
+                        stale_lookup: Optional[Callable[[], Any]] = None) -> Any:
+        """Return lookup(), running fill() on a miss only if this worker holds the entry's lease"""
+        token = self.acquire_fill_lease(lease_key)
+        if not token:
+            value = self.wait_for_fill(lease_key, lookup, stale_lookup)
+            if value is not None:
+                return value
+            token = self.acquire_fill_lease(lease_key)
+        
+        try:
+            # Another worker may have filled the entry between our miss and taking the lease
+            value = self._recheck(lookup)
+            if value is not None:
+                return value
+            return self.timed_fill(lease_key, fill)
+        finally:
+            if token:
+                self.release_fill_lease(lease_key, token)
+    
+    def _recheck(self, lookup: Callable[[], Any]) -> Any:
+        """Run a lookup for an entry already counted as a miss, without counting it in the hit ratios again"""
+        self._rechecking.active = True
+        try:
+            return lookup()
+        finally:
+            self._rechecking.active = False
+    
+    def _is_servable(self, cache_name: str, created_at: datetime, lease_key: str,
+                     refresh: Optional[Callable[[], Any]]) -> bool:
+        """Whether an entry may be served: fresh, or stale with a background refresh queued for it"""
+        soft_hours, hard_hours = CACHE_TTLS[cache_name]
+        if self._is_cache_fresh(created_at, hours=soft_hours):
+            return True
+        if not self._is_cache_fresh(created_at, hours=hard_hours):
+            return False
+        
+        if refresh:
+            self._queue_refresh(lease_key, refresh)
+        return True
+    
+    def _queue_refresh(self, lease_key: str, refresh: Callable[[], Any]):
+        """Run refresh() in the background under the entry's lease, unless a worker is already filling it"""
+        token = self.acquire_fill_lease(lease_key)
+        if not token:
+            return
+        
+        def run():
+            try:
+                print(f"🔄 Refreshing stale {lease_key} in the background")
+                self.timed_fill(lease_key, refresh)
+            except Exception as e:
+                print(f"❌ Background refresh of {lease_key} failed: {e}")
+            finally:
+                self.release_fill_lease(lease_key, token)
+        
+        try:
+            self._refresh_executor.submit(run)
+        except Exception as e:
+            print(f"❌ Could not queue refresh of {lease_key}: {e}")
+            self.release_fill_lease(lease_key, token)
+    
+    def _is_lease_held(self, lease_key: str) -> bool:
+        try:
+            return self.storage.lease_held(lease_key, datetime.utcnow())
+        except Exception:
+            return False
+    
+    def _content_key(self, topic: str, difficulty: int, learning_style: str, resource_type: str) -> Dict[str, Any]:
+        return {
+            'topic': self._normalize_text(topic),
+            'difficulty': int(difficulty),
+            'learning_style': self._normalize_text(learning_style),
+            'resource_type': self._normalize_text(resource_type)
+        }
+    
+    def _topic_sequence_key(self, subject: str, knowledge_level: int, weak_areas: List[str], learning_style: str) -> Dict[str, Any]:
+        """Normalize the profile fields a topic sequence depends on, so equivalent sign-ups share an entry"""
+        return {
+            'subject': self._normalize_text(subject),
+            'knowledge_level': int(knowledge_level),
+            'weak_areas': sorted({self._normalize_text(area) for area in weak_areas or [] if area and area.strip()}),
+            'learning_style': self._normalize_text(learning_style)
+        }
+    
+    def _normalize_key_part(self, value: Any) -> Any:
+        if isinstance(value, (list, tuple, set)):
+            return sorted({self._normalize_text(item) for item in value if item and str(item).strip()})
+        if value is None or isinstance(value, (bool, int)):
+            return value
+        return self._normalize_text(value)
+    
+    def _normalize_text(self, value: str) -> str:
+        """Lowercase and collapse whitespace"""
+        return ' '.join(str(value).lower().split())
+    
+    def migrate_cache_keys(self) -> Dict[str, int]:
+        """One-shot rewrite of every cache document's cache_key to the current scheme; a no-op once done"""
+        try:
+            marker = self.storage.get_meta('cache_key_scheme')
+            if marker and marker.get('version', 0) >= CACHE_KEY_SCHEME:
+                return {}
+            
+            print(f"🔑 Migrating cache keys to scheme v{CACHE_KEY_SCHEME}")
+            
+            # The stored fields each cache's key is rebuilt from
+            key_fields = {
+                'quiz_cache': ['topic', 'difficulty'],
+                'resource_quizzes': ['resource_id'],
+                'feedback_cache': ['question_text', 'user_answer', 'correct_answer'],
+                'focus_areas_cache': ['subject'],
+                'topic_sequences_cache': ['subject', 'knowledge_level', 'weak_areas', 'learning_style'],
+                'content_cache': ['topic', 'difficulty', 'learning_style', 'resource_type']
+            }
+            
+            migrated = {}
+            for collection_name, fields in key_fields.items():
+                # Documents missing a key field can't be re-keyed (e.g. feedback keyed by the old
+                # per-process hash(), which never stored the full question) and could never be hit
+                rekeyed, unkeyable, collapsed = self.storage.rekey(
+                    collection_name, fields, lambda *parts, name=collection_name: self.cache_key(name, *parts)
+                )
+                
+                migrated[collection_name] = rekeyed
+                if unkeyable:
+                    print(f"🗑️ Dropped {unkeyable} {collection_name} entries that can't be re-keyed")
+                if collapsed:
+                    print(f"🗑️ Dropped {collapsed} older {collection_name} entries that now share a key with a newer one")
+            
+            # Gemini responses are already content-addressed; only the field name changes
+            migrated['llm_response_cache'] = self.storage.rename_field('llm_response_cache', 'key', 'cache_key')
+            
+            self.storage.set_meta('cache_key_scheme', {'version': CACHE_KEY_SCHEME, 'migrated_at': datetime.utcnow()})
+            
+            self.local_cache.clear()
+            print(f"✅ Migrated cache keys: {migrated}")
+            return migrated
+            
+        except Exception as e:
+            print(f"❌ Error migrating cache keys: {e}")
+            return {}
+    
+    def get_cache_stats(self, refresh: bool = False) -> Dict[str, Any]:
+        """Get comprehensive cache statistics (collection figures come from a snapshot at most a few seconds old)"""
+        try:
+            stats = self.cache_stats.snapshot(force=refresh)
+            stats['local_cache'] = self.local_cache.get_stats()
+            stats['usage_counters'] = self.usage_counters.get_stats()
+            stats['quotas'] = self.cache_quotas.get_stats()
             return stats
             
         except Exception as e:
             print(f"❌ Error getting cache stats: {e}")
             return {}
     
-    def _get_total_usage(self, collection_name: str) -> int:
-        """Get total usage count for a collection"""
+    def _find_cached(self, collection_name: str, key: str) -> Optional[Dict]:
+        """Read a cache document; in inline counter mode the read also increments its usage_count"""
+        return self.storage.get(collection_name, key, count_usage=USAGE_COUNTER_MODE == 'inline')
+    
+    def _record_hit(self, collection_name: str, key: str, started: float, from_read: bool = False,
+                    created_at: Optional[datetime] = None, increments: Optional[Dict[str, int]] = None):
+        """Count a cache hit (L1 hits included) through the write-behind buffer, and time it"""
+        increments = dict(increments or {})
+        # last_used_at breaks usage_count ties when a bounded cache evicts (see cache_quotas)
+        set_fields = {'last_used_at': datetime.utcnow()}
+        # An inline-mode _find_cached already counted the hit it read
+        if not (from_read and USAGE_COUNTER_MODE == 'inline'):
+            increments['usage_count'] = increments.get('usage_count', 0) + 1
+        self.usage_counters.record(collection_name, key, increments, set_fields)
+        
+        if not getattr(self._rechecking, 'active', False):
+            if not from_read:
+                outcome = 'local_hit'
+            elif created_at and not self._is_cache_fresh(created_at, hours=CACHE_TTLS[collection_name][0]):
+                outcome = 'stale_hit'
+            else:
+                outcome = 'hit'
+            self.metrics.observe(collection_name, outcome, time.perf_counter() - started)
+    
+    def _record_miss(self, collection_name: str, started: float):
+        if not getattr(self._rechecking, 'active', False):
+            self.metrics.observe(collection_name, 'miss', time.perf_counter() - started)
+    
+    def record_fill(self, cache_name: str, started: float, failed: bool = False):
+        """Time a regeneration of a cache entry that started at time.perf_counter() `started`"""
+        self.metrics.observe(cache_name, 'fill_failure' if failed else 'fill', time.perf_counter() - started)
+    
+    def timed_fill(self, lease_key: str, fill: Callable[[], Any]) -> Any:
+        """Run fill() for the entry a lease key names, recording it as a fill or a fill failure"""
+        cache_name = lease_key.split(':', 1)[0]
+        started = time.perf_counter()
         try:
-            collection = getattr(self, collection_name)
-            pipeline = [
-                {'$group': {'_id': None, 'total_usage': {'$sum': '$usage_count'}}}
-            ]
-            result = list(collection.aggregate(pipeline))
-            return result[0]['total_usage'] if result else 0
+            value = fill()
         except Exception:
-            return 0
+            self.record_fill(cache_name, started, failed=True)
+            raise
+        self.record_fill(cache_name, started)
+        return value
+    
+    def _remember_local(self, cache_name: str, key: str, value: Any, created_at: datetime):
+        """Keep a fresh entry in the L1 until it would go stale, so stale entries still reach _is_servable"""
+        fresh_for = (created_at + timedelta(hours=CACHE_TTLS[cache_name][0]) - datetime.utcnow()).total_seconds()
+        self.local_cache.put(cache_name, key, value, ttl_seconds=fresh_for)
+    
+    def _expiry(self, cache_name: str, created_at: datetime) -> datetime:
+        """When the TTL index removes an entry: its hard TTL after creation"""
+        return created_at + timedelta(hours=CACHE_TTLS[cache_name][1])
     
     def _is_cache_fresh(self, created_at: datetime, hours: int) -> bool:
         """Check if cache is fresh"""
         expiry_time = created_at + timedelta(hours=hours)
         return datetime.utcnow() < expiry_time
     
-    def clear_expired_cache(self):
-        """Clear expired cache entries"""
+    def backfill_cache_expiry(self) -> Dict[str, int]:
+        """Give entries written before expires_at existed one, so the TTL indexes can expire them"""
+        backfilled = {}
         try:
-            now = datetime.utcnow()
+            for collection_name, (_, hard_hours) in CACHE_TTLS.items():
+                count = self.storage.backfill_expiry(collection_name, hard_hours)
+                if count:
+                    backfilled[collection_name] = count
             
-            # Clear expired quiz questions (3 days)
-            expired_quiz = now - timedelta(hours=72)
-            deleted_quiz = self.quiz_cache.delete_many({'created_at': {'$lt': expired_quiz}})
+            if backfilled:
+                print(f"⏳ Backfilled cache expiry: {backfilled}")
+            return backfilled
             
-            # Clear expired resource quizzes (1 week)
-            expired_resource_quiz = now - timedelta(hours=168)
-            deleted_resource = self.resource_quizzes.delete_many({'created_at': {'$lt': expired_resource_quiz}})
+        except Exception as e:
+            print(f"❌ Error backfilling cache expiry: {e}")
+            return backfilled
+    
+    def clear_expired_cache(self):
+        """Delete expired cache entries right away.
+        
+        With Mongo storage the TTL monitor does this continuously (about once a minute) and
+        this only forces it, e.g. from the admin endpoint; other backends rely on it being called.
+        """
+        try:
+            now = datetime.utcnow()
             
-            # Clear expired feedback (1 week)
-            expired_feedback = now - timedelta(hours=168)
-            deleted_feedback = self.feedback_cache.delete_many({'created_at': {'$lt': expired_feedback}})
+            # expires_at is the hard TTL; stale entries before it are still served while they refresh
+            deleted = {}
+            for collection_name in list(CACHE_TTLS) + ['cache_leases']:
+                deleted[collection_name] = self.storage.delete_expired(collection_name, now)
             
-            print(f"🧹 Cleared expired cache: {deleted_quiz.deleted_count} quiz, {deleted_resource.deleted_count} resource quiz, {deleted_feedback.deleted_count} feedback entries")
+            print(f"🧹 Cleared expired cache: {deleted['quiz_cache']} quiz, {deleted['resource_quizzes']} resource quiz, {deleted['feedback_cache']} feedback, {deleted['focus_areas_cache']} focus areas, {deleted['topic_sequences_cache']} topic sequence, {deleted['content_cache']} content, {deleted['llm_response_cache']} LLM response entries")
             
         except Exception as e:
             print(f"❌ Error clearing expired cache: {e}")
@@ -0,0 +1,26 @@
+# backend/mcp_server/storage/__init__.py
+import os
+from mcp_server.storage.base import CacheStorage
+
+# Where MongoMCP keeps its caches: 'mongo' (shared by every worker), 'sqlite' (one host, on disk)
+# or 'memory' (one process, for tests and benchmarks)
+STORAGE_BACKEND = os.getenv('MCP_STORAGE_BACKEND', 'mongo').lower()
+
+def create_storage(backend: str = None) -> CacheStorage:
+    """Build the configured cache storage backend; none of them connects until first used"""
+    backend = (backend or STORAGE_BACKEND).lower()
+
+    # Imported here so a backend's driver is only needed when that backend is chosen
+    if backend == 'mongo':
+        from mcp_server.storage.mongo import MongoStorage
+        return MongoStorage()
+    if backend == 'sqlite':
+        from mcp_server.storage.sqlite import SQLiteStorage
+        return SQLiteStorage()
+    if backend == 'memory':
+        from mcp_server.storage.memory import MemoryStorage
+        return MemoryStorage()
+
+    raise ValueError(f"Unknown MCP_STORAGE_BACKEND {backend!r}; use 'mongo', 'sqlite' or 'memory'")
+
+__all__ = ['CacheStorage', 'create_storage', 'STORAGE_BACKEND']
@@ -0,0 +1,164 @@
+# backend/mcp_server/storage/base.py
+import copy
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+# (cache_key, increments, fields to set) for one document, as UsageCounterBuffer flushes them
+CounterUpdate = Tuple[str, Dict[str, int], Dict[str, Any]]
+
+class CacheStorage:
+    """Where MongoMCP keeps its cache documents, fill leases and bookkeeping.
+
+    Every cache document is addressed by (collection, cache_key) and carries
+    created_at, expires_at, usage_count and, once used, last_used_at. Backends
+    must not connect to anything until first used, so importing MongoMCP stays cheap.
+    """
+
+    name = 'base'
+    # Whether the store deletes documents past expires_at by itself; if not, the app calls delete_expired
+    expires_entries = False
+
+    # Cache documents
+    def get(self, collection: str, key: str, count_usage: bool = False) -> Optional[Dict]:
+        """The document for key, or None. With count_usage, atomically increments its usage_count too."""
+        raise NotImplementedError
+
+    def put(self, collection: str, key: str, fields: Dict[str, Any]):
+        """Create the document for key, or overwrite the given fields of the existing one"""
+        raise NotImplementedError
+
+    def push(self, collection: str, key: str, list_field: str, item: Dict[str, Any], max_items: int,
+             set_fields: Dict[str, Any], insert_fields: Dict[str, Any]):
+        """Append item to a list field keeping the last max_items, set set_fields, and insert_fields if new"""
+        raise NotImplementedError
+
+    def delete(self, collection: str, key: str):
+        raise NotImplementedError
+
+    def apply_counters(self, collection: str, updates: List[CounterUpdate]):
+        """Apply buffered increments and sets to existing documents; missing ones are skipped"""
+        raise NotImplementedError
+
+    def delete_expired(self, collection: str, now: datetime) -> int:
+        """Delete documents (or leases) whose expires_at has passed"""
+        raise NotImplementedError
+
+    # Statistics and quotas
+    def estimated_count(self, collection: str) -> int:
+        raise NotImplementedError
+
+    def summarize(self, collection: str, stale_before: datetime) -> Dict[str, int]:
+        """{'total_usage': sum of usage_count, 'stale_entries': documents created before stale_before}"""
+        raise NotImplementedError
+
+    def size(self, collection: str) -> Tuple[int, int]:
+        """(documents, approximate bytes)"""
+        raise NotImplementedError
+
+    def evict(self, collection: str, limit: int, created_before: datetime) -> List[str]:
+        """Delete up to limit documents created before created_before, lowest usage_count then
+        oldest last_used_at first; returns their keys"""
+        raise NotImplementedError
+
+    # Fill leases
+    def acquire_lease(self, lease_id: str, token: str, now: datetime, expires_at: datetime) -> bool:
+        """Take the lease unless a live one (expires_at after now) is held; True if taken"""
+        raise NotImplementedError
+
+    def release_lease(self, lease_id: str, token: str):
+        """Drop the lease if token still holds it"""
+        raise NotImplementedError
+
+    def lease_held(self, lease_id: str, now: datetime) -> bool:
+        raise NotImplementedError
+
+    # Bookkeeping
+    def get_meta(self, name: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def set_meta(self, name: str, fields: Dict[str, Any]):
+        raise NotImplementedError
+
+    def rekey(self, collection: str, fields: List[str], make_key: Callable[..., str]) -> Tuple[int, int, int]:
+        """Recompute every document's cache_key from its stored fields; documents missing one are deleted.
+
+        Documents that now share a key (e.g. 'Python' and 'python' once topics are
+        normalized) collapse into the newest of them. Returns (rekeyed, unkeyable, collapsed).
+        """
+        raise NotImplementedError
+
+    # Upgrades of documents written by older versions; only a store that predates them has any
+    def rename_field(self, collection: str, old: str, new: str) -> int:
+        return 0
+
+    def backfill_expiry(self, collection: str, hard_hours: int) -> int:
+        return 0
+
+# Helpers for the backends that apply updates to documents themselves
+
+def _resolve(doc: Dict[str, Any], path: str) -> Tuple[Any, Any]:
+    """(container, final key) for a dotted path such as 'variants.0.usage_count', creating dicts on the way"""
+    parts = path.split('.')
+    target = doc
+    for part in parts[:-1]:
+        if isinstance(target, list):
+            target = target[int(part)]
+        else:
+            target = target.setdefault(part, {})
+    last = parts[-1]
+    return target, int(last) if isinstance(target, list) else last
+
+def apply_increments(doc: Dict[str, Any], increments: Dict[str, int]):
+    for path, amount in increments.items():
+        try:
+            target, last = _resolve(doc, path)
+        except (IndexError, ValueError, KeyError):
+            continue  # e.g. a variant rotated out since the hit was counted
+        if isinstance(target, list):
+            if last < len(target):
+                target[last] = (target[last] or 0) + amount
+        else:
+            target[last] = (target.get(last) or 0) + amount
+
+def apply_sets(doc: Dict[str, Any], fields: Dict[str, Any]):
+    for path, value in fields.items():
+        target, last = _resolve(doc, path)
+        target[last] = copy.deepcopy(value)
+
+def push_item(doc: Optional[Dict[str, Any]], list_field: str, item: Dict[str, Any], max_items: int,
+              set_fields: Dict[str, Any], insert_fields: Dict[str, Any]) -> Dict[str, Any]:
+    """The document after a push (see CacheStorage.push); doc is None when there is none yet"""
+    doc = copy.deepcopy(doc) if doc is not None else copy.deepcopy(insert_fields)
+    items = doc.get(list_field, []) + [copy.deepcopy(item)]
+    doc[list_field] = items[-max_items:]
+    apply_sets(doc, set_fields)
+    return doc
+
+def group_by_new_key(docs: List[Dict[str, Any]], fields: List[str],
+                     make_key: Callable[..., str]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Plan a rekey: (new key -> newest document, unkeyable documents, older documents colliding on a key)"""
+    newest: Dict[str, Dict[str, Any]] = {}
+    unkeyable = []
+    collapsed = []
+    for doc in docs:
+        if not all(field in doc for field in fields):
+            unkeyable.append(doc)
+            continue
+        key = make_key(*[doc[field] for field in fields])
+        current = newest.get(key)
+        if current is None:
+            newest[key] = doc
+        elif (doc.get('created_at') or datetime.min) > (current.get('created_at') or datetime.min):
+            newest[key] = doc
+            collapsed.append(current)
+        else:
+            collapsed.append(doc)
+    return newest, unkeyable, collapsed
+
+def evictable(doc: Dict[str, Any], created_before: datetime) -> bool:
+    """Whether a document is past the eviction grace window; documents without created_at always are"""
+    return (doc.get('created_at') or datetime.min) < created_before
+
+def eviction_order(doc: Dict[str, Any]) -> Tuple[int, datetime]:
+    """Sort key matching the Mongo index order: never-used (None) last_used_at sorts first"""
+    return (doc.get('usage_count') or 0, doc.get('last_used_at') or datetime.min)
@@ -0,0 +1,126 @@
+# backend/mcp_server/storage/memory.py
+import copy
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from mcp_server.storage.base import CacheStorage, CounterUpdate, apply_increments, apply_sets, push_item, evictable, eviction_order, group_by_new_key
+
+class MemoryStorage(CacheStorage):
+    """Cache documents in this process's memory: nothing to run, nothing shared, gone on restart.
+
+    For tests, benchmarks and single-worker deployments; leases only coordinate threads of this process.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._leases: Dict[str, Dict[str, Any]] = {}
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _documents(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self._collections.setdefault(collection, {})
+
+    def get(self, collection: str, key: str, count_usage: bool = False) -> Optional[Dict]:
+        with self._lock:
+            doc = self._documents(collection).get(key)
+            if doc is None:
+                return None
+            if count_usage:
+                apply_increments(doc, {'usage_count': 1})
+            return copy.deepcopy(doc)
+
+    def put(self, collection: str, key: str, fields: Dict[str, Any]):
+        with self._lock:
+            doc = self._documents(collection).setdefault(key, {'cache_key': key})
+            apply_sets(doc, fields)
+
+    def push(self, collection: str, key: str, list_field: str, item: Dict[str, Any], max_items: int,
+             set_fields: Dict[str, Any], insert_fields: Dict[str, Any]):
+        with self._lock:
+            documents = self._documents(collection)
+            documents[key] = push_item(documents.get(key), list_field, item, max_items, set_fields,
+                                       {**insert_fields, 'cache_key': key})
+
+    def delete(self, collection: str, key: str):
+        with self._lock:
+            self._documents(collection).pop(key, None)
+
+    def apply_counters(self, collection: str, updates: List[CounterUpdate]):
+        with self._lock:
+            documents = self._documents(collection)
+            for key, increments, set_fields in updates:
+                doc = documents.get(key)
+                if doc is not None:
+                    apply_increments(doc, increments)
+                    apply_sets(doc, set_fields)
+
+    def delete_expired(self, collection: str, now: datetime) -> int:
+        with self._lock:
+            documents = self._leases if collection == 'cache_leases' else self._documents(collection)
+            expired = [key for key, doc in documents.items() if doc.get('expires_at') and doc['expires_at'] < now]
+            for key in expired:
+                del documents[key]
+            return len(expired)
+
+    def estimated_count(self, collection: str) -> int:
+        with self._lock:
+            return len(self._documents(collection))
+
+    def summarize(self, collection: str, stale_before: datetime) -> Dict[str, int]:
+        with self._lock:
+            documents = list(self._documents(collection).values())
+            return {
+                'total_usage': sum(doc.get('usage_count') or 0 for doc in documents),
+                'stale_entries': sum(1 for doc in documents if doc.get('created_at') and doc['created_at'] < stale_before)
+            }
+
+    def size(self, collection: str) -> Tuple[int, int]:
+        with self._lock:
+            documents = list(self._documents(collection).values())
+            return len(documents), sum(len(json.dumps(doc, default=str)) for doc in documents)
+
+    def evict(self, collection: str, limit: int, created_before: datetime) -> List[str]:
+        with self._lock:
+            documents = self._documents(collection)
+            candidates = [key for key, doc in documents.items() if evictable(doc, created_before)]
+            victims = sorted(candidates, key=lambda key: eviction_order(documents[key]))[:limit]
+            for key in victims:
+                del documents[key]
+            return victims
+
+    def acquire_lease(self, lease_id: str, token: str, now: datetime, expires_at: datetime) -> bool:
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is not None and lease['expires_at'] > now:
+                return False
+            self._leases[lease_id] = {'token': token, 'acquired_at': now, 'expires_at': expires_at}
+            return True
+
+    def release_lease(self, lease_id: str, token: str):
+        with self._lock:
+            if self._leases.get(lease_id, {}).get('token') == token:
+                del self._leases[lease_id]
+
+    def lease_held(self, lease_id: str, now: datetime) -> bool:
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            return lease is not None and lease['expires_at'] > now
+
+    def get_meta(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            return copy.deepcopy(self._meta.get(name))
+
+    def set_meta(self, name: str, fields: Dict[str, Any]):
+        with self._lock:
+            self._meta.setdefault(name, {'_id': name}).update(copy.deepcopy(fields))
+
+    def rekey(self, collection: str, fields: List[str], make_key: Callable[..., str]) -> Tuple[int, int, int]:
+        with self._lock:
+            newest, unkeyable, collapsed = group_by_new_key(list(self._documents(collection).values()), fields, make_key)
+            for key, doc in newest.items():
+                doc['cache_key'] = key
+            self._collections[collection] = newest
+            return len(newest), len(unkeyable), len(collapsed)
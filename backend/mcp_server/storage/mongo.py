@@ -0,0 +1,167 @@
+# backend/mcp_server/storage/mongo.py
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from pymongo import MongoClient, UpdateOne, ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError
+from pymongo.write_concern import WriteConcern
+from mcp_server.storage.base import CacheStorage, CounterUpdate, group_by_new_key
+
+# Eviction order for bounded caches; mcp_server/indexes.py declares the matching index
+EVICTION_SORT = [('usage_count', ASCENDING), ('last_used_at', ASCENDING)]
+
+# Documents deleted or re-keyed per round trip during a cache key migration
+REKEY_BATCH_SIZE = 1000
+
+# Counters are telemetry: acknowledged by the primary, without waiting for the journal
+_COUNTER_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+class MongoStorage(CacheStorage):
+    """Cache documents in MongoDB, one collection per cache (indexes declared in mcp_server/indexes.py)"""
+
+    name = 'mongo'
+    expires_entries = True  # TTL indexes on expires_at
+
+    def __init__(self, uri: Optional[str] = None, database: str = 'personalized_tutor'):
+        self.uri = uri or os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+        self.database = database
+        self._db = None
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        """The database, connecting on first use"""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = MongoClient(self.uri)[self.database]
+        return self._db
+
+    def get(self, collection: str, key: str, count_usage: bool = False) -> Optional[Dict]:
+        if count_usage:
+            return self.db[collection].find_one_and_update({'cache_key': key}, {'$inc': {'usage_count': 1}},
+                                                           return_document=ReturnDocument.AFTER)
+        return self.db[collection].find_one({'cache_key': key})
+
+    def put(self, collection: str, key: str, fields: Dict[str, Any]):
+        self.db[collection].update_one({'cache_key': key}, {'$set': {**fields, 'cache_key': key}}, upsert=True)
+
+    def push(self, collection: str, key: str, list_field: str, item: Dict[str, Any], max_items: int,
+             set_fields: Dict[str, Any], insert_fields: Dict[str, Any]):
+        self.db[collection].update_one(
+            {'cache_key': key},
+            {
+                '$push': {list_field: {'$each': [item], '$slice': -max_items}},
+                '$set': set_fields,
+                '$setOnInsert': insert_fields
+            },
+            upsert=True
+        )
+
+    def delete(self, collection: str, key: str):
+        self.db[collection].delete_one({'cache_key': key})
+
+    def apply_counters(self, collection: str, updates: List[CounterUpdate]):
+        operations = []
+        for key, increments, set_fields in updates:
+            update = {}
+            if increments:
+                update['$inc'] = increments
+            if set_fields:
+                update['$set'] = set_fields
+            if update:
+                operations.append(UpdateOne({'cache_key': key}, update))
+        if operations:
+            self.db[collection].with_options(write_concern=_COUNTER_WRITE_CONCERN).bulk_write(operations, ordered=False)
+
+    def delete_expired(self, collection: str, now: datetime) -> int:
+        # Served by the expires_at TTL index
+        return self.db[collection].delete_many({'expires_at': {'$lt': now}}).deleted_count
+
+    def estimated_count(self, collection: str) -> int:
+        # Metadata only; can drift briefly after an unclean shutdown, which is fine for stats
+        return self.db[collection].estimated_document_count()
+
+    def summarize(self, collection: str, stale_before: datetime) -> Dict[str, int]:
+        result = list(self.db[collection].aggregate([
+            {'$facet': {
+                'usage': [{'$group': {'_id': None, 'total': {'$sum': '$usage_count'}}}],
+                'stale': [{'$match': {'created_at': {'$lt': stale_before}}}, {'$count': 'count'}]
+            }}
+        ]))
+        facets = result[0] if result else {}
+        return {
+            'total_usage': facets['usage'][0]['total'] if facets.get('usage') else 0,
+            'stale_entries': facets['stale'][0]['count'] if facets.get('stale') else 0
+        }
+
+    def size(self, collection: str) -> Tuple[int, int]:
+        # Collection metadata, not a scan
+        stats = self.db.command('collStats', collection)
+        return stats.get('count', 0), stats.get('size', 0)
+
+    def evict(self, collection: str, limit: int, created_before: datetime) -> List[str]:
+        victims = list(
+            self.db[collection].find({'created_at': {'$not': {'$gte': created_before}}}, {'_id': 1, 'cache_key': 1})
+            .sort(EVICTION_SORT).limit(limit)
+        )
+        if not victims:
+            return []
+        self.db[collection].delete_many({'_id': {'$in': [victim['_id'] for victim in victims]}})
+        return [victim['cache_key'] for victim in victims if victim.get('cache_key')]
+
+    def acquire_lease(self, lease_id: str, token: str, now: datetime, expires_at: datetime) -> bool:
+        try:
+            # Matches only an expired lease; with none at all the upsert creates ours, and with a
+            # live one the upsert collides on _id
+            self.db.cache_leases.update_one(
+                {'_id': lease_id, 'expires_at': {'$lte': now}},
+                {'$set': {'token': token, 'acquired_at': now, 'expires_at': expires_at}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def release_lease(self, lease_id: str, token: str):
+        self.db.cache_leases.delete_one({'_id': lease_id, 'token': token})
+
+    def lease_held(self, lease_id: str, now: datetime) -> bool:
+        return self.db.cache_leases.count_documents({'_id': lease_id, 'expires_at': {'$gt': now}}, limit=1) > 0
+
+    def get_meta(self, name: str) -> Optional[Dict]:
+        return self.db.cache_meta.find_one({'_id': name})
+
+    def set_meta(self, name: str, fields: Dict[str, Any]):
+        self.db.cache_meta.update_one({'_id': name}, {'$set': fields}, upsert=True)
+
+    def rekey(self, collection: str, fields: List[str], make_key: Callable[..., str]) -> Tuple[int, int, int]:
+        documents = self.db[collection]
+        newest, unkeyable, collapsed = group_by_new_key(
+            list(documents.find({}, {**{field: 1 for field in fields}, 'created_at': 1})), fields, make_key
+        )
+
+        # Documents missing a key field can't be re-keyed (e.g. feedback keyed by the old
+        # per-process hash(), which never stored the full question) and could never be hit.
+        # They and the colliding documents go first, so no two documents ever hold the same key
+        # under the unique index
+        doomed = [doc['_id'] for doc in unkeyable + collapsed]
+        for start in range(0, len(doomed), REKEY_BATCH_SIZE):
+            documents.delete_many({'_id': {'$in': doomed[start:start + REKEY_BATCH_SIZE]}})
+
+        operations = [UpdateOne({'_id': doc['_id']}, {'$set': {'cache_key': key}}) for key, doc in newest.items()]
+        for start in range(0, len(operations), REKEY_BATCH_SIZE):
+            documents.bulk_write(operations[start:start + REKEY_BATCH_SIZE], ordered=False)
+        return len(operations), len(unkeyable), len(collapsed)
+
+    def rename_field(self, collection: str, old: str, new: str) -> int:
+        return self.db[collection].update_many({old: {'$exists': True}}, {'$rename': {old: new}}).modified_count
+
+    def backfill_expiry(self, collection: str, hard_hours: int) -> int:
+        # Missing fields are indexed as null, so this is an index lookup once the TTL index exists
+        result = self.db[collection].update_many(
+            {'expires_at': None},
+            [{'$set': {'expires_at': {'$add': ['$created_at', hard_hours * 3600 * 1000]}}}]
+        )
+        return result.modified_count
@@ -0,0 +1,249 @@
+# backend/mcp_server/storage/sqlite.py
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from mcp_server.storage.base import CacheStorage, CounterUpdate, apply_increments, apply_sets, push_item, group_by_new_key
+
+# Database file for the sqlite backend; defaults to backend/, wherever the process was started from
+SQLITE_PATH = os.getenv(
+    'MCP_SQLITE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'mcp_cache.sqlite3')
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    collection TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TEXT,
+    created_at TEXT,
+    expires_at TEXT,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (collection, cache_key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_expiry ON cache_entries (collection, expires_at);
+CREATE INDEX IF NOT EXISTS cache_entries_eviction ON cache_entries (collection, usage_count, last_used_at);
+CREATE TABLE IF NOT EXISTS cache_leases (
+    id TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    acquired_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_leases_expiry ON cache_leases (expires_at);
+CREATE TABLE IF NOT EXISTS cache_meta (
+    id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+"""
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Fixed-width UTC timestamp, so text order is time order"""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.%f') if value else None
+
+class _DocumentEncoder(json.JSONEncoder):
+    def default(self, value):
+        if isinstance(value, datetime):
+            return {'$date': _timestamp(value)}
+        return super().default(value)
+
+def _decode_object(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and '$date' in value:
+        return datetime.strptime(value['$date'], '%Y-%m-%dT%H:%M:%S.%f')
+    return value
+
+def _dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, cls=_DocumentEncoder, ensure_ascii=False, separators=(',', ':'))
+
+def _loads(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_decode_object)
+
+class SQLiteStorage(CacheStorage):
+    """Cache documents as JSON in one SQLite file: persistent, no server, shared by the processes on one host.
+
+    The columns the store filters and sorts on (usage, last use, creation, expiry, size)
+    are copied out of each document whenever it is written.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database, opened and migrated on first use"""
+        with self._lock:
+            if self._connection is None:
+                connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+                # Readers don't block the writer; other worker processes wait their turn instead of failing
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                connection.executescript(_SCHEMA)
+                self._connection = connection
+                print(f"🗄️ SQLite cache storage at {self.path}")
+            return self._connection
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run work(connection) in one write transaction, taken up front so processes serialize on it"""
+        with self._lock:
+            connection = self.connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(connection)
+                connection.execute('COMMIT')
+                return result
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+    def _read(self, connection: sqlite3.Connection, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        row = connection.execute('SELECT doc FROM cache_entries WHERE collection = ? AND cache_key = ?',
+                                 (collection, key)).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _write(self, connection: sqlite3.Connection, collection: str, key: str, doc: Dict[str, Any]):
+        text = _dumps(doc)
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries '
+            '(collection, cache_key, doc, usage_count, last_used_at, created_at, expires_at, size) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (collection, key, text, doc.get('usage_count') or 0, _timestamp(doc.get('last_used_at')),
+             _timestamp(doc.get('created_at')), _timestamp(doc.get('expires_at')), len(text))
+        )
+
+    def get(self, collection: str, key: str, count_usage: bool = False) -> Optional[Dict]:
+        if not count_usage:
+            with self._lock:
+                return self._read(self.connection, collection, key)
+
+        def increment(connection):
+            doc = self._read(connection, collection, key)
+            if doc is not None:
+                apply_increments(doc, {'usage_count': 1})
+                self._write(connection, collection, key, doc)
+            return doc
+        return self._transaction(increment)
+
+    def put(self, collection: str, key: str, fields: Dict[str, Any]):
+        def write(connection):
+            doc = self._read(connection, collection, key) or {'cache_key': key}
+            apply_sets(doc, fields)
+            self._write(connection, collection, key, doc)
+        self._transaction(write)
+
+    def push(self, collection: str, key: str, list_field: str, item: Dict[str, Any], max_items: int,
+             set_fields: Dict[str, Any], insert_fields: Dict[str, Any]):
+        def write(connection):
+            doc = push_item(self._read(connection, collection, key), list_field, item, max_items, set_fields,
+                            {**insert_fields, 'cache_key': key})
+            self._write(connection, collection, key, doc)
+        self._transaction(write)
+
+    def delete(self, collection: str, key: str):
+        with self._lock:
+            self.connection.execute('DELETE FROM cache_entries WHERE collection = ? AND cache_key = ?', (collection, key))
+
+    def apply_counters(self, collection: str, updates: List[CounterUpdate]):
+        def write(connection):
+            for key, increments, set_fields in updates:
+                doc = self._read(connection, collection, key)
+                if doc is not None:
+                    apply_increments(doc, increments)
+                    apply_sets(doc, set_fields)
+                    self._write(connection, collection, key, doc)
+        self._transaction(write)
+
+    def delete_expired(self, collection: str, now: datetime) -> int:
+        with self._lock:
+            if collection == 'cache_leases':
+                cursor = self.connection.execute('DELETE FROM cache_leases WHERE expires_at < ?', (_timestamp(now),))
+            else:
+                cursor = self.connection.execute('DELETE FROM cache_entries WHERE collection = ? AND expires_at < ?',
+                                                 (collection, _timestamp(now)))
+            return cursor.rowcount
+
+    def estimated_count(self, collection: str) -> int:
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM cache_entries WHERE collection = ?',
+                                           (collection,)).fetchone()[0]
+
+    def summarize(self, collection: str, stale_before: datetime) -> Dict[str, int]:
+        with self._lock:
+            total_usage, stale_entries = self.connection.execute(
+                'SELECT SUM(usage_count), SUM(created_at < ?) FROM cache_entries WHERE collection = ?',
+                (_timestamp(stale_before), collection)
+            ).fetchone()
+            return {'total_usage': total_usage or 0, 'stale_entries': stale_entries or 0}
+
+    def size(self, collection: str) -> Tuple[int, int]:
+        with self._lock:
+            entries, size = self.connection.execute(
+                'SELECT COUNT(*), SUM(size) FROM cache_entries WHERE collection = ?', (collection,)
+            ).fetchone()
+            return entries, size or 0
+
+    def evict(self, collection: str, limit: int, created_before: datetime) -> List[str]:
+        def evict_batch(connection):
+            # Never-used entries (NULL last_used_at) sort first, as in the Mongo index
+            keys = [row[0] for row in connection.execute(
+                'SELECT cache_key FROM cache_entries WHERE collection = ? AND (created_at IS NULL OR created_at < ?) '
+                'ORDER BY usage_count, last_used_at LIMIT ?',
+                (collection, _timestamp(created_before), limit)
+            )]
+            connection.executemany('DELETE FROM cache_entries WHERE collection = ? AND cache_key = ?',
+                                   [(collection, key) for key in keys])
+            return keys
+        return self._transaction(evict_batch)
+
+    def acquire_lease(self, lease_id: str, token: str, now: datetime, expires_at: datetime) -> bool:
+        with self._lock:
+            # Inserts a new lease, or takes over an expired one; a live lease is left alone (no row changes)
+            cursor = self.connection.execute(
+                'INSERT INTO cache_leases (id, token, acquired_at, expires_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET token = excluded.token, acquired_at = excluded.acquired_at, '
+                'expires_at = excluded.expires_at WHERE cache_leases.expires_at <= ?',
+                (lease_id, token, _timestamp(now), _timestamp(expires_at), _timestamp(now))
+            )
+            return cursor.rowcount > 0
+
+    def release_lease(self, lease_id: str, token: str):
+        with self._lock:
+            self.connection.execute('DELETE FROM cache_leases WHERE id = ? AND token = ?', (lease_id, token))
+
+    def lease_held(self, lease_id: str, now: datetime) -> bool:
+        with self._lock:
+            return self.connection.execute('SELECT 1 FROM cache_leases WHERE id = ? AND expires_at > ?',
+                                           (lease_id, _timestamp(now))).fetchone() is not None
+
+    def get_meta(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.connection.execute('SELECT doc FROM cache_meta WHERE id = ?', (name,)).fetchone()
+            return _loads(row[0]) if row else None
+
+    def set_meta(self, name: str, fields: Dict[str, Any]):
+        def write(connection):
+            row = connection.execute('SELECT doc FROM cache_meta WHERE id = ?', (name,)).fetchone()
+            doc = _loads(row[0]) if row else {'_id': name}
+            doc.update(fields)
+            connection.execute('INSERT OR REPLACE INTO cache_meta (id, doc) VALUES (?, ?)', (name, _dumps(doc)))
+        self._transaction(write)
+
+    def rekey(self, collection: str, fields: List[str], make_key: Callable[..., str]) -> Tuple[int, int, int]:
+        def rewrite(connection):
+            docs = [_loads(row[0]) for row in connection.execute(
+                'SELECT doc FROM cache_entries WHERE collection = ?', (collection,)
+            )]
+            newest, unkeyable, collapsed = group_by_new_key(docs, fields, make_key)
+            connection.execute('DELETE FROM cache_entries WHERE collection = ?', (collection,))
+
+            for key, doc in newest.items():
+                doc['cache_key'] = key
+                self._write(connection, collection, key, doc)
+            return len(newest), len(unkeyable), len(collapsed)
+        return self._transaction(rewrite)
@@ -0,0 +1,116 @@
+# backend/mcp_server/usage_counters.py
+import os
+import atexit
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Optional, Tuple
+from mcp_server.storage import CacheStorage
+
+# 'batched': cache hits are buffered and flushed in bulk in the background.
+# 'inline': the read and the usage_count increment are one find_one_and_update.
+USAGE_COUNTER_MODE = os.getenv('MCP_USAGE_COUNTER_MODE', 'batched').lower()
+# How often buffered hits are written, and how many distinct keys force an early flush
+USAGE_FLUSH_SECONDS = float(os.getenv('MCP_USAGE_FLUSH_SECONDS', '10'))
+USAGE_FLUSH_MAX_KEYS = int(os.getenv('MCP_USAGE_FLUSH_MAX_KEYS', '1000'))
+
+class UsageCounterBuffer:
+    """Write-behind buffer of cache hit counters, flushed as one batch per collection (an unordered bulk_write on Mongo).
+
+    Counts from every worker are $inc'ed into the same documents, so usage_count
+    totals stay accurate across processes once each buffer has flushed.
+    """
+
+    def __init__(self, storage: CacheStorage, flush_seconds: float = USAGE_FLUSH_SECONDS,
+                 max_keys: int = USAGE_FLUSH_MAX_KEYS):
+        self.storage = storage
+        self.flush_seconds = flush_seconds
+        self.max_keys = max_keys
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._flushed_hits = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+
+    def record(self, collection_name: str, cache_key: str, increments: Dict[str, int],
+               set_fields: Optional[Dict[str, Any]] = None):
+        """Buffer increments (and latest-wins $set fields) for one cache document"""
+        with self._lock:
+            entry = self._pending.get((collection_name, cache_key))
+            if entry is None:
+                entry = self._pending[(collection_name, cache_key)] = {'inc': defaultdict(int), 'set': {}}
+            for field, amount in increments.items():
+                entry['inc'][field] += amount
+            if set_fields:
+                entry['set'].update(set_fields)
+            pending_keys = len(self._pending)
+
+        self._ensure_started()
+        if pending_keys >= self.max_keys:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write every buffered counter now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return
+
+        updates = defaultdict(list)
+        hits = defaultdict(int)
+        for (collection_name, cache_key), entry in pending.items():
+            updates[collection_name].append((cache_key, dict(entry['inc']), entry['set']))
+            hits[collection_name] += entry['inc'].get('usage_count', 0)
+
+        for collection_name, batch in updates.items():
+            try:
+                self.storage.apply_counters(collection_name, batch)
+                with self._lock:
+                    self._flushes += 1
+                    self._flushed_hits += hits[collection_name]
+            except Exception as e:
+                print(f"❌ Error flushing {len(batch)} {collection_name} usage counters, keeping them for the next flush: {e}")
+                with self._lock:
+                    self._failed_flushes += 1
+                self._restore(collection_name, pending)
+
+    def _restore(self, collection_name: str, pending: Dict[Tuple[str, str], Dict[str, Any]]):
+        for (name, cache_key), entry in pending.items():
+            if name == collection_name:
+                self.record(name, cache_key, entry['inc'], entry['set'])
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='usage-counter-flush', daemon=True)
+            self._thread.start()
+        # Don't lose the last few seconds of hits on a clean shutdown
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Usage counter flush error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get how much is buffered and how much has been written"""
+        with self._lock:
+            return {
+                'mode': USAGE_COUNTER_MODE,
+                'pending_keys': len(self._pending),
+                'pending_hits': sum(entry['inc'].get('usage_count', 0) for entry in self._pending.values()),
+                'flushed_hits': self._flushed_hits,
+                'flushes': self._flushes,
+                'failed_flushes': self._failed_flushes,
+                'flush_seconds': self.flush_seconds
+            }
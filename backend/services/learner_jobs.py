@@ -0,0 +1,321 @@
+# backend/services/learner_jobs.py
+import os
+import time
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Callable, Iterator, Tuple
+from pymongo import ReturnDocument
+
+# Worker threads per process; several processes can drain the same queue safely
+JOB_WORKERS = int(os.getenv('LEARNER_JOB_WORKERS', '2'))
+# How often idle workers look for jobs enqueued by other processes
+JOB_POLL_SECONDS = float(os.getenv('LEARNER_JOB_POLL_SECONDS', '2'))
+# A running job without a heartbeat for this long is assumed orphaned and re-queued
+JOB_STALE_SECONDS = int(os.getenv('LEARNER_JOB_STALE_SECONDS', '600'))
+# Running jobs refresh their heartbeat this often, well inside the stale window
+JOB_HEARTBEAT_SECONDS = max(1.0, JOB_STALE_SECONDS / 4)
+JOB_MAX_ATTEMPTS = 2
+# Streams wake immediately for jobs run in this process; this bounds latency for jobs run elsewhere
+STREAM_POLL_SECONDS = 1.0
+STREAM_KEEPALIVE_SECONDS = 15
+
+class LearnerJobQueue:
+    """Mongo-backed job queue that runs learner creation outside the HTTP request"""
+
+    def __init__(self, db, orchestrator, workers: int = JOB_WORKERS):
+        self.db = db
+        self.jobs = db.learner_jobs
+        self.orchestrator = orchestrator
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = threading.Event()
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._progress_changed = threading.Condition()
+
+    def enqueue(self, profile_data: Dict[str, Any]) -> str:
+        """Queue a learner-creation job and return its id immediately"""
+        now = datetime.utcnow()
+        job_id = str(uuid.uuid4())
+
+        self.jobs.insert_one({
+            'id': job_id,
+            'type': 'create_learner',
+            'status': 'queued',
+            'profile_data': profile_data,
+            'attempts': 0,
+            'progress': {
+                'stage': 'queued',
+                'profile_id': None,
+                'topics': [],
+                'resources_total': 0,
+                'resources_skeleton': 0,
+                'resources_completed': 0,
+                'resources': []
+            },
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        })
+
+        print(f"📥 Queued learner creation job {job_id}")
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status, progress and result"""
+        return self.jobs.find_one({'id': job_id}, {'_id': 0, 'profile_data': 0})
+
+    def iter_job_events(self, job_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (event, data) pairs for a job until it finishes.
+
+        Every resource is pushed in full as soon as it is stored, so clients can
+        show the first lesson while the rest of the path is still generating.
+        A ('keepalive', {}) pair is yielded periodically while nothing changes.
+        """
+        last_status = None
+        sent_resources = 0
+        last_event_at = time.monotonic()
+
+        while True:
+            job = self.get_job(job_id)
+            if not job:
+                yield 'failed', {'error': 'Job not found'}
+                return
+
+            progress = job.get('progress', {})
+            status = {
+                'job_id': job_id,
+                'status': job['status'],
+                'stage': progress.get('stage'),
+                'profile_id': progress.get('profile_id'),
+                'topics': progress.get('topics', []),
+                'resources_total': progress.get('resources_total', 0),
+                'resources_skeleton': progress.get('resources_skeleton', 0),
+                'resources_completed': progress.get('resources_completed', 0)
+            }
+            if status != last_status:
+                last_status = status
+                last_event_at = time.monotonic()
+                yield 'status', status
+
+            resources = progress.get('resources', [])
+            if len(resources) < sent_resources:
+                sent_resources = 0  # A retried job starts its resources over
+            for entry in resources[sent_resources:]:
+                resource = self.db.learning_resources.find_one({'id': entry['resource_id']}, {'_id': 0})
+                sent_resources += 1
+                if resource:
+                    last_event_at = time.monotonic()
+                    yield 'resource', {**resource, 'position': entry.get('position')}
+
+            if job['status'] == 'completed':
+                yield 'completed', job.get('result') or {}
+                return
+            if job['status'] == 'failed':
+                yield 'failed', {'error': job.get('error')}
+                return
+
+            if time.monotonic() - last_event_at >= STREAM_KEEPALIVE_SECONDS:
+                last_event_at = time.monotonic()
+                yield 'keepalive', {}
+
+            with self._progress_changed:
+                self._progress_changed.wait(STREAM_POLL_SECONDS)
+
+    def start(self):
+        """Start the worker threads for this process (idempotent)"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"learner-job-worker-{i}")
+            thread.daemon = True
+            thread.start()
+
+        print(f"✅ Started {self.workers} learner job worker(s) on {self.worker_id}")
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self._claim_next_job()
+                if job:
+                    self._run_job(job)
+                    continue
+            except Exception as e:
+                print(f"❌ Learner job worker error: {e}")
+
+            # Sleep until a local enqueue or the next poll for jobs from other processes
+            self._wakeup.wait(JOB_POLL_SECONDS)
+            self._wakeup.clear()
+
+    def _claim_next_job(self) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest queued (or orphaned) job"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=JOB_STALE_SECONDS)
+        self._fail_exhausted_jobs(now, stale_before)
+
+        return self.jobs.find_one_and_update(
+            {
+                '$or': [
+                    {'status': 'queued'},
+                    {'status': 'running', 'heartbeat_at': {'$lt': stale_before}}
+                ],
+                'attempts': {'$lt': JOB_MAX_ATTEMPTS}
+            },
+            {
+                '$set': {
+                    'status': 'running',
+                    'progress.stage': 'starting',
+                    'worker': self.worker_id,
+                    'started_at': now,
+                    'heartbeat_at': now,
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _fail_exhausted_jobs(self, now: datetime, stale_before: datetime):
+        """Fail orphaned jobs that have used every attempt, so their clients stop waiting"""
+        result = self.jobs.update_many(
+            {
+                'status': 'running',
+                'heartbeat_at': {'$lt': stale_before},
+                'attempts': {'$gte': JOB_MAX_ATTEMPTS}
+            },
+            {
+                '$set': {
+                    'status': 'failed',
+                    'progress.stage': 'failed',
+                    'error': f"Learner creation was interrupted {JOB_MAX_ATTEMPTS} times; please try again",
+                    'completed_at': now,
+                    'updated_at': now
+                }
+            }
+        )
+        if result.modified_count:
+            print(f"⚠️ Failed {result.modified_count} orphaned learner job(s) after {JOB_MAX_ATTEMPTS} attempts")
+            self._notify_progress()
+
+    def _run_job(self, job: Dict[str, Any]):
+        job_id = job['id']
+        # Every write is scoped to this claim, so a superseded attempt cannot touch the job
+        claim = {'id': job_id, 'attempts': job['attempts']}
+        print(f"🏗️ Running learner creation job {job_id} (attempt {job['attempts']})")
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(claim, stop_heartbeat),
+            name=f"learner-job-heartbeat-{job_id}"
+        )
+        heartbeat.daemon = True
+        heartbeat.start()
+
+        try:
+            # A re-claimed job continues with the learner its interrupted attempt created
+            profile_id = job.get('progress', {}).get('profile_id')
+            if profile_id:
+                self._update(claim, {'progress.resources': [], 'progress.resources_completed': 0})
+
+            try:
+                result = self.orchestrator.process_new_learner(
+                    job['profile_data'], self.db, progress_callback=self._progress_callback(claim),
+                    profile_id=profile_id
+                )
+            except Exception as e:
+                print(f"❌ Learner creation job {job_id} failed: {e}")
+                self._finish(claim, {
+                    'status': 'failed',
+                    'progress.stage': 'failed',
+                    'error': str(e),
+                    'completed_at': datetime.utcnow()
+                })
+                return
+
+            self._finish(claim, {
+                'status': 'completed',
+                'progress.stage': 'completed',
+                'result': result,
+                'completed_at': datetime.utcnow()
+            })
+            print(f"✅ Learner creation job {job_id} completed")
+
+        finally:
+            stop_heartbeat.set()
+
+    def _heartbeat_loop(self, claim: Dict[str, Any], stop: threading.Event):
+        """Keep a claimed job's heartbeat fresh until its attempt finishes"""
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                result = self.jobs.update_one(
+                    {**claim, 'status': 'running'},
+                    {'$set': {'heartbeat_at': datetime.utcnow()}}
+                )
+                if not result.matched_count:
+                    print(f"⚠️ Learner job {claim['id']} attempt {claim['attempts']} was superseded")
+                    return
+            except Exception as e:
+                print(f"⚠️ Failed to refresh heartbeat for learner job {claim['id']}: {e}")
+
+    def _finish(self, claim: Dict[str, Any], fields: Dict[str, Any]):
+        """Record a terminal status, unless another attempt has since claimed the job"""
+        if not self._update({**claim, 'status': 'running'}, fields):
+            print(f"⚠️ Dropped result of superseded attempt {claim['attempts']} for learner job {claim['id']}")
+
+    def _progress_callback(self, claim: Dict[str, Any]) -> Callable[[str, Dict[str, Any]], None]:
+        """Translate orchestrator progress events into job document updates"""
+        job_id = claim['id']
+
+        def report(event: str, data: Dict[str, Any]):
+            try:
+                if event == 'profile':
+                    self._update(claim, {
+                        'progress.stage': 'generating_topics',
+                        'progress.profile_id': data['profile_id']
+                    })
+                elif event == 'topics':
+                    self._update(claim, {
+                        'progress.stage': 'generating_resources',
+                        'progress.topics': data['topics'],
+                        'progress.resources_total': data['resources_total'],
+                        'progress.resources_skeleton': data.get('resources_skeleton', 0)
+                    })
+                elif event == 'resource':
+                    now = datetime.utcnow()
+                    self.jobs.update_one(
+                        claim,
+                        {
+                            '$push': {'progress.resources': data},
+                            '$inc': {'progress.resources_completed': 1},
+                            '$set': {'heartbeat_at': now, 'updated_at': now}
+                        }
+                    )
+                    self._notify_progress()
+            except Exception as e:
+                # Progress reporting must never fail the job itself
+                print(f"⚠️ Failed to record job progress for {job_id}: {e}")
+
+        return report
+
+    def _update(self, claim: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+        """Apply fields to the job matching claim; returns whether it still matched"""
+        now = datetime.utcnow()
+        result = self.jobs.update_one(
+            claim,
+            {'$set': {**fields, 'heartbeat_at': now, 'updated_at': now}}
+        )
+        self._notify_progress()
+        return bool(result.matched_count)
+
+    def _notify_progress(self):
+        """Wake any event streams in this process so they re-read job progress"""
+        with self._progress_changed:
+            self._progress_changed.notify_all()
@@ -7,6 +7,7 @@ import Button from '../../components/ui/Button';
 import Input from '../../components/ui/Input';
 import Card, { CardContent, CardHeader } from '../../components/ui/Card';
 import ProfileCreationLoader from '../../components/ui/ProfileCreationLoader';
+import ContentGenerationProgress from '../../components/ui/ContentGenerationProgress';
 import { validateRequired } from '../../lib/utils';
 import toast from 'react-hot-toast';
 
@@ -15,6 +16,7 @@ export default function CreateProfilePage() {
   const [isLoading, setIsLoading] = useState(false);
   const [isGeneratingFocusAreas, setIsGeneratingFocusAreas] = useState(false);
   const [profileId, setProfileId] = useState(null);
+  const [jobId, setJobId] = useState(null);
   const [showLoader, setShowLoader] = useState(false); 
   const [currentStep, setCurrentStep] = useState(1);
   const [formData, setFormData] = useState({
@@ -185,7 +187,8 @@ export default function CreateProfilePage() {
       };
       
       // Step 2: Create the profile
-      const response = await apiClient.createLearner(submissionData);
+      // The job id arrives with the first poll; it drives the live progress stream
+      const response = await apiClient.createLearner(submissionData, (job) => setJobId(job.id));
       console.log('📝 Create learner response:', response);
       
       if (response.success && response.data.profile_id) {
@@ -232,6 +235,12 @@ export default function CreateProfilePage() {
         profileId={profileId}
       />
       
+      {isLoading && jobId && (
+        <div className="max-w-4xl mx-auto mb-8">
+          <ContentGenerationProgress jobId={jobId} />
+        </div>
+      )}
+      
       <div className="max-w-4xl mx-auto px-4 sm:px-6 lg:px-8 py-12">
         <div className="text-center mb-12">
           <div className="inline-flex items-center justify-center w-16 h-16 bg-gradient-to-br from-primary-600 to-primary-700 rounded-2xl mb-6">
@@ -8,6 +8,7 @@ import Card, { CardContent, CardHeader } from '../../../components/ui/Card';
 import Button from '../../../components/ui/Button';
 import Input from '../../../components/ui/Input';
 import ProfileCreationLoader from '../../../components/ui/ProfileCreationLoader';
+import ContentGenerationProgress from '../../../components/ui/ContentGenerationProgress';
 import { apiClient } from '../../../lib/api';
 import { validateRequired } from '../../../lib/utils';
 import toast from 'react-hot-toast';
@@ -18,6 +19,7 @@ export default function CreateProfilePage() {
   const [isLoading, setIsLoading] = useState(false);
   const [isGeneratingFocusAreas, setIsGeneratingFocusAreas] = useState(false);
   const [profileId, setProfileId] = useState(null);
+  const [jobId, setJobId] = useState(null);
   const [showLoader, setShowLoader] = useState(false); 
   const [currentStep, setCurrentStep] = useState(1);
   const [formData, setFormData] = useState({
@@ -191,7 +193,8 @@ export default function CreateProfilePage() {
         name: user?.name || 'User' // Use Google auth name automatically
       };
       
-      const response = await apiClient.createLearner(submissionData);
+      // The job id arrives with the first poll; it drives the live progress stream
+      const response = await apiClient.createLearner(submissionData, (job) => setJobId(job.id));
       console.log('Create learner response:', response);
       
       if (response.success) {
@@ -273,6 +276,12 @@ export default function CreateProfilePage() {
         profileId={profileId}
       />
       
+      {isLoading && jobId && (
+        <div className="max-w-4xl mx-auto mb-8">
+          <ContentGenerationProgress jobId={jobId} />
+        </div>
+      )}
+      
       <div className="max-w-4xl mx-auto">
         <div className="text-center mb-12">
           <div className="inline-flex items-center justify-center w-16 h-16 bg-gradient-to-br from-primary-600 to-primary-700 rounded-2xl mb-6">
@@ -1,5 +1,5 @@
 'use client';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useRouter } from 'next/navigation';
 import { apiClient } from '../../../lib/api';
 import Button from '../../../components/ui/Button';
@@ -15,37 +15,58 @@ export default function PretestPage({ params }) {
   const [pretest, setPretest] = useState(null);
   const [answers, setAnswers] = useState({});
   const [currentQuestion, setCurrentQuestion] = useState(0);
+  const [streamError, setStreamError] = useState(null);
+  const [streamAttempt, setStreamAttempt] = useState(0);
+  const questionIds = useRef([]);
 
   useEffect(() => {
-    if (learnerId) {
-      conductPretest();
-    }
-  }, [learnerId]);
+    if (!learnerId) return;
 
-  const conductPretest = async () => {
-    try {
-      setIsLoading(true);
-      const response = await apiClient.conductPretest(learnerId, 'algebra');
-      
-      if (response.success) {
-        console.log('Pretest response:', response);
-        setPretest(response);
-        // Initialize answers object to track completion
-        const initialAnswers = {};
-        response.questions.forEach(q => {
-          initialAnswers[q.id] = '';
+    // Questions arrive one at a time, so the first one can be answered while the rest are generated
+    setIsLoading(true);
+    setStreamError(null);
+    const source = apiClient.streamPretest(learnerId, {
+      onQuestion: (question) => {
+        // A different question at a known index means the pretest was regenerated, so earlier answers no longer apply
+        const previousId = questionIds.current[question.index];
+        if (previousId && previousId !== question.id) {
+          questionIds.current = [];
+          setAnswers({});
+          setCurrentQuestion(0);
+        }
+        questionIds.current[question.index] = question.id;
+
+        setPretest((current) => {
+          const questions = [...(current?.questions || [])];
+          questions[question.index] = question;
+          return { pretest_id: current?.pretest_id || null, questions };
         });
-        setAnswers(initialAnswers);
-      } else {
-        throw new Error(response.error || 'Failed to load pretest');
+        // Track completion for each question as it arrives
+        setAnswers((current) => ({ [question.id]: '', ...current }));
+        setIsLoading(false);
+      },
+      onComplete: ({ pretest_id }) => {
+        setPretest((current) => ({ questions: [], ...current, pretest_id }));
+        setIsLoading(false);
+      },
+      onError: (error) => {
+        console.error('Error streaming pretest:', error);
+        toast.error('Failed to load pretest');
+        setStreamError(error || 'Failed to load pretest');
+        setIsLoading(false);
       }
-    } catch (error) {
-      console.error('Error conducting pretest:', error);
-      toast.error('Failed to load pretest');
-      router.push('/');
-    } finally {
-      setIsLoading(false);
-    }
+    });
+
+    return () => source.close();
+  }, [learnerId, streamAttempt]);
+
+  const handleRetry = () => {
+    // A retry generates a fresh pretest, so start over
+    questionIds.current = [];
+    setPretest(null);
+    setAnswers({});
+    setCurrentQuestion(0);
+    setStreamAttempt((attempt) => attempt + 1);
   };
 
   const handleAnswerChange = (questionId, answer) => {
@@ -89,7 +110,7 @@ export default function PretestPage({ params }) {
     }
 
     // Check if all questions have been answered
-    const answeredCount = Object.values(answers).filter(answer => answer !== '').length;
+    const answeredCount = pretest.questions.filter(q => answers[q.id]).length;
     const totalQuestions = pretest.questions.length;
 
     if (answeredCount < totalQuestions) {
@@ -101,12 +122,17 @@ export default function PretestPage({ params }) {
       return;
     }
 
+    if (!pretest.pretest_id) {
+      toast.error('Your pretest is still being prepared, please try again in a moment');
+      return;
+    }
+
     setIsSubmitting(true);
 
     try {
-      // Filter out empty answers
+      // Only submit answers to the questions of this pretest
       const finalAnswers = Object.fromEntries(
-        Object.entries(answers).filter(([_, answer]) => answer !== '')
+        pretest.questions.map(q => [q.id, answers[q.id]])
       );
 
       console.log('Submitting answers:', finalAnswers);
@@ -138,6 +164,24 @@ export default function PretestPage({ params }) {
     );
   }
 
+  if (streamError && !pretest?.pretest_id) {
+    return (
+      <div className="min-h-screen bg-gray-50 flex items-center justify-center">
+        <div className="text-center">
+          <p className="text-gray-600">We couldn't finish loading your pretest.</p>
+          <div className="mt-4 space-x-3">
+            <Button onClick={handleRetry}>
+              Try Again
+            </Button>
+            <Button variant="outline" onClick={() => router.push('/')}>
+              Go Home
+            </Button>
+          </div>
+        </div>
+      </div>
+    );
+  }
+
   if (!pretest || !pretest.questions || pretest.questions.length === 0) {
     return (
       <div className="min-h-screen bg-gray-50 flex items-center justify-center">
@@ -153,7 +197,7 @@ export default function PretestPage({ params }) {
 
   const question = pretest.questions[currentQuestion];
   const progress = ((currentQuestion + 1) / pretest.questions.length) * 100;
-  const answeredCount = Object.values(answers).filter(answer => answer !== '').length;
+  const answeredCount = pretest.questions.filter(q => answers[q.id]).length;
   const currentAnswer = answers[question.id] || '';
 
   return (
@@ -180,6 +224,9 @@ export default function PretestPage({ params }) {
             <p className="text-xs text-gray-400">
               Answered: {answeredCount}/{pretest.questions.length}
             </p>
+            {!pretest.pretest_id && (
+              <p className="text-xs text-gray-400">Generating more questions...</p>
+            )}
           </div>
         </div>
 
@@ -251,11 +298,11 @@ export default function PretestPage({ params }) {
       <Button
         onClick={handleSubmit}
         loading={isSubmitting}
-        disabled={answeredCount < pretest.questions.length || isSubmitting}
+        disabled={answeredCount < pretest.questions.length || isSubmitting || !pretest.pretest_id}
         className={`px-8 py-3 rounded-lg font-medium transition-all duration-200 ${
           isSubmitting 
             ? 'bg-green-400 text-white cursor-not-allowed' 
-            : answeredCount < pretest.questions.length
+            : answeredCount < pretest.questions.length || !pretest.pretest_id
             ? 'bg-gray-300 text-gray-500 cursor-not-allowed'
             : 'bg-green-600 text-white hover:bg-green-700'
         }`}
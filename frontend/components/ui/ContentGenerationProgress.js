@@ -1,50 +1,64 @@
 'use client';
 import { useState, useEffect } from 'react';
+import Link from 'next/link';
 import { apiClient } from '../../lib/api';
 import Card, { CardContent } from './Card';
 import LoadingSpinner from './LoadingSpinner';
 
-export default function ContentGenerationProgress({ learnerId, onComplete }) {
+const STAGE_LABELS = {
+  queued: 'Waiting for an available generator...',
+  starting: 'Setting up your profile...',
+  generating_topics: 'Planning your learning path...',
+  generating_resources: 'Writing your lessons...',
+  completed: 'All done!',
+  failed: 'Generation failed'
+};
+
+export default function ContentGenerationProgress({ jobId, onComplete }) {
   const [status, setStatus] = useState(null);
-  const [isLoading, setIsLoading] = useState(true);
+  const [resources, setResources] = useState([]);
+  const [error, setError] = useState(null);
 
   useEffect(() => {
-    if (!learnerId) return;
-
-    const checkStatus = async () => {
-      try {
-        const response = await apiClient.getContentStatus(learnerId);
-        if (response.success) {
-          setStatus(response.data);
-          if (response.data.is_complete && onComplete) {
-            onComplete();
-          }
-        }
-      } catch (error) {
-        console.error('Error checking content status:', error);
-      } finally {
-        setIsLoading(false);
-      }
-    };
+    if (!jobId) return;
 
-    checkStatus();
-    const interval = setInterval(checkStatus, 3000); // Check every 3 seconds
+    const source = apiClient.streamLearnerJob(jobId, {
+      onStatus: setStatus,
+      onResource: (resource) => {
+        // The stream replays from the start if the connection drops, so de-duplicate
+        setResources((current) =>
+          current.some((r) => r.id === resource.id)
+            ? current
+            : [...current, resource].sort((a, b) => (a.position ?? 0) - (b.position ?? 0))
+        );
+      },
+      onComplete: (result) => {
+        if (onComplete) onComplete(result);
+      },
+      onError: setError
+    });
 
-    return () => clearInterval(interval);
-  }, [learnerId, onComplete]);
+    return () => source.close();
+  }, [jobId, onComplete]);
 
-  if (isLoading) {
+  if (!status) {
     return (
       <Card className="shadow-xl border-0 bg-white/80 backdrop-blur-sm">
         <CardContent className="text-center py-8">
           <LoadingSpinner size="lg" />
-          <p className="mt-4 text-gray-600">Checking content generation status...</p>
+          <p className="mt-4 text-gray-600">Connecting to the content generator...</p>
         </CardContent>
       </Card>
     );
   }
 
-  if (!status) return null;
+  const total = status.resources_total || 0;
+  // Skeleton resources are generated later, as the learner reaches them, so they don't count towards this job
+  const skeleton = status.resources_skeleton || 0;
+  const generating = total - skeleton;
+  const ready = resources.length;
+  const progressPercentage = generating > 0 ? Math.min((ready / generating) * 100, 100) : 0;
+  const isComplete = status.status === 'completed';
 
   return (
     <Card className="shadow-xl border-0 bg-white/80 backdrop-blur-sm">
@@ -55,34 +69,66 @@ export default function ContentGenerationProgress({ learnerId, onComplete }) {
             AI is Creating Your Personalized Content
           </h3>
           <p className="text-gray-600 mb-6">
-            Our AI is generating customized learning materials based on your profile...
+            {STAGE_LABELS[status.stage] || 'Our AI is generating customized learning materials based on your profile...'}
           </p>
           
           <div className="mb-6">
             <div className="flex justify-between text-sm text-gray-600 mb-2">
               <span>Progress</span>
-              <span>{Math.round(status.progress_percentage)}% Complete</span>
+              <span>{Math.round(progressPercentage)}% Complete</span>
             </div>
             <div className="w-full bg-gray-200 rounded-full h-4">
               <div 
                 className="bg-gradient-to-r from-purple-500 to-purple-600 h-4 rounded-full transition-all duration-1000"
-                style={{ width: `${status.progress_percentage}%` }}
+                style={{ width: `${progressPercentage}%` }}
               ></div>
             </div>
           </div>
           
           <div className="text-sm text-gray-500">
-            {status.ready_resources} of {status.total_resources} resources ready
+            {ready} of {total || '?'} resources ready
           </div>
-          
-          {status.is_complete && (
-            <div className="mt-4 p-3 bg-green-50 border border-green-200 rounded-lg">
-              <p className="text-green-700 font-medium">
-                ✅ Content generation complete! You can now start learning.
-              </p>
+          {skeleton > 0 && (
+            <div className="text-xs text-gray-400 mt-1">
+              {skeleton} more will be generated as you progress through your path
             </div>
           )}
         </div>
+
+        {resources.length > 0 && (
+          <ul className="mt-6 space-y-3 text-left">
+            {resources.map((resource) => (
+              <li key={resource.id} className="p-3 bg-purple-50 border border-purple-100 rounded-lg">
+                <div className="flex items-center justify-between">
+                  <div>
+                    <p className="font-medium text-gray-900">✅ {resource.title}</p>
+                    <p className="text-xs text-gray-500">{resource.topic}</p>
+                  </div>
+                  <Link href={`/resource/${resource.id}`} className="text-sm font-medium text-purple-600 hover:text-purple-800">
+                    Start reading →
+                  </Link>
+                </div>
+                {resource.summary && (
+                  <p className="mt-2 text-sm text-gray-600">{resource.summary}</p>
+                )}
+              </li>
+            ))}
+          </ul>
+        )}
+          
+        {isComplete && (
+          <div className="mt-4 p-3 bg-green-50 border border-green-200 rounded-lg text-center">
+            <p className="text-green-700 font-medium">
+              ✅ Content generation complete! You can now start learning.
+            </p>
+          </div>
+        )}
+
+        {error && (
+          <div className="mt-4 p-3 bg-red-50 border border-red-200 rounded-lg text-center">
+            <p className="text-red-700 font-medium">❌ {error}</p>
+          </div>
+        )}
       </CardContent>
     </Card>
   );
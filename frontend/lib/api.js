@@ -42,16 +42,87 @@ export const apiClient = {
   },
 
   // Learner management
-  createLearner: async (profileData) => {
+  // Creation runs as a background job; poll it so callers still get { success, data: { profile_id, ... } }
+  createLearner: async (profileData, onProgress) => {
     const response = await api.post('/api/learner/create', profileData);
+    if (!response.data.success || !response.data.job_id) {
+      return response.data;
+    }
+    return apiClient.waitForLearnerJob(response.data.job_id, onProgress);
+  },
+
+  getLearnerJob: async (jobId) => {
+    const response = await api.get(`/api/learner/jobs/${jobId}`);
     return response.data;
   },
 
+  // Server-Sent Events: each generated resource arrives as soon as it is ready
+  streamLearnerJob: (jobId, { onStatus, onResource, onComplete, onError } = {}) => {
+    const source = new EventSource(`${API_BASE_URL}/api/learner/jobs/${jobId}/stream`);
+    const parse = (event) => JSON.parse(event.data);
+
+    source.addEventListener('status', (event) => onStatus && onStatus(parse(event)));
+    source.addEventListener('resource', (event) => onResource && onResource(parse(event)));
+    source.addEventListener('completed', (event) => {
+      source.close();
+      if (onComplete) onComplete(parse(event));
+    });
+    source.addEventListener('failed', (event) => {
+      source.close();
+      if (onError) onError(parse(event).error);
+    });
+
+    return source;
+  },
+
+  // Gives up after timeoutMs in case the job is never picked up or finished
+  waitForLearnerJob: async (jobId, onProgress, intervalMs = 2000, timeoutMs = 30 * 60 * 1000) => {
+    const deadline = Date.now() + timeoutMs;
+    while (true) {
+      const response = await apiClient.getLearnerJob(jobId);
+      const job = response.job;
+      if (onProgress && job) onProgress(job);
+
+      if (job?.status === 'completed') {
+        return { success: true, data: job.result };
+      }
+      if (!response.success || job?.status === 'failed') {
+        return { success: false, error: job?.error || response.error };
+      }
+      if (Date.now() >= deadline) {
+        return { success: false, error: 'Timed out waiting for your learning path; please try again' };
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  },
+
   conductPretest: async (learnerId, subject) => {
     const response = await api.post(`/api/learner/${learnerId}/pretest`, { subject });
     return response.data;
   },
 
+  streamPretest: (learnerId, { onQuestion, onComplete, onError } = {}) => {
+    const source = new EventSource(`${API_BASE_URL}/api/learner/${learnerId}/pretest/stream`);
+    const parse = (event) => JSON.parse(event.data);
+
+    source.addEventListener('question', (event) => onQuestion && onQuestion(parse(event)));
+    source.addEventListener('completed', (event) => {
+      source.close();
+      if (onComplete) onComplete(parse(event));
+    });
+    source.addEventListener('failed', (event) => {
+      source.close();
+      if (onError) onError(parse(event).error);
+    });
+    // A reconnect would generate a different pretest, so a dropped connection ends the stream
+    source.addEventListener('error', () => {
+      source.close();
+      if (onError) onError('Lost connection while loading the pretest');
+    });
+
+    return source;
+  },
+
   submitPretest: async (pretestId, answers) => {
     const response = await api.post(`/api/pretest/${pretestId}/submit`, { answers });
     return response.data;
@@ -62,9 +133,16 @@ export const apiClient = {
     return response.data;
   },
 
-  getResource: async (resourceId) => {
-    const response = await api.get(`/api/resource/${resourceId}`);
-    return response.data;
+  // A resource another worker is still generating answers 202 { pending, retry_after }; keep asking until it is ready
+  getResource: async (resourceId, timeoutMs = 5 * 60 * 1000) => {
+    const deadline = Date.now() + timeoutMs;
+    while (true) {
+      const response = await api.get(`/api/resource/${resourceId}`);
+      if (!response.data.pending || Date.now() >= deadline) {
+        return response.data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, (response.data.retry_after || 5) * 1000));
+    }
   },
 
   getResourceQuiz: async (resourceId) => {